@@ -17,6 +17,25 @@ app.config_from_object(settings, namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+app.conf.beat_schedule = {
+    'relay-outbox': {
+        'task': 'quiz.tasks.relay_outbox',
+        'schedule': timedelta(seconds=5),
+    },
+    'dispatch-due-reports': {
+        'task': 'quiz.tasks.dispatch_due_reports',
+        'schedule': timedelta(minutes=1),
+    },
+    'delete-fired-schedules': {
+        'task': 'quiz.tasks.delete_fired_schedules',
+        'schedule': crontab(minute=0),
+    },
+    'purge-expired-tokens': {
+        'task': 'account.tasks.purge_expired_tokens',
+        'schedule': crontab(minute=30),
+    },
+}
+
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
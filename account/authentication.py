@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from account.models import AuthToken, hash_token
+
+AUTH_TOKEN_CACHE_TIMEOUT = 60 * 5
+# Lifetime of the tombstone left by a revocation, longer than any request that read the token before it.
+AUTH_TOKEN_REVOKED_TIMEOUT = 60
+REVOKED = 'revoked'
+# The user fields left out of the cache, loaded on first access. Every other concrete field is cached.
+UNCACHED_USER_FIELDS = ('password',)
+
+
+def _token_cache_key(key_hash):
+    return f'auth-token:{key_hash}'
+
+
+def get_cached_user_fields():
+    return [
+        field.attname for field in get_user_model()._meta.concrete_fields if field.attname not in UNCACHED_USER_FIELDS
+    ]
+
+
+def _from_fields(model, values):
+    # An instance with only the given fields loaded, like one read by .only().
+    names = [field.attname for field in model._meta.concrete_fields if field.attname in values]
+    return model.from_db(None, names, [values[name] for name in names])
+
+
+def cache_token(token):
+    """
+    Cache the id and expiry of a token with its user, but for the UNCACHED_USER_FIELDS, never past its expiry.
+    Does nothing while the token lookup is tombstoned by invalidate_cached_tokens.
+    """
+    timeout = min(AUTH_TOKEN_CACHE_TIMEOUT, (token.expires_at - timezone.now()).total_seconds())
+    cache.add(_token_cache_key(token.key_hash), {
+        'id': token.id,
+        'expires_at': token.expires_at,
+        'user': {name: getattr(token.user, name) for name in get_cached_user_fields()},
+    }, timeout)
+
+
+def _load_cached_token(entry):
+    user = _from_fields(get_user_model(), entry['user'])
+    token = _from_fields(AuthToken, {'id': entry['id'], 'user_id': user.id, 'expires_at': entry['expires_at']})
+    token.user = user
+    return token
+
+
+def invalidate_cached_tokens(key_hashes):
+    """
+    Replace the cached lookups of the given token hashes with a tombstone once the current transaction commits.
+    cache_token doesn't overwrite it, so a request that read a token before the change cannot cache it again.
+    """
+    cache_keys = [_token_cache_key(key_hash) for key_hash in key_hashes]
+    if cache_keys:
+        transaction.on_commit(
+            lambda: cache.set_many(dict.fromkeys(cache_keys, REVOKED), AUTH_TOKEN_REVOKED_TIMEOUT))
+
+
+def invalidate_user_tokens(user_id):
+    invalidate_cached_tokens(AuthToken.objects.filter(user_id=user_id).values_list('key_hash', flat=True))
+
+
+def revoke_auth_tokens(tokens):
+    """Delete a queryset of auth tokens along with their cached lookups."""
+    key_hashes = list(tokens.values_list('key_hash', flat=True))
+    tokens.delete()
+    invalidate_cached_tokens(key_hashes)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Authentication with the hashed, expiring AuthToken, keeping each token and its user, without the password hash,
+    in the shared cache for up to AUTH_TOKEN_CACHE_TIMEOUT, so an authenticated request does not query the database.
+    Entries are invalidated when tokens are revoked (logout) and whenever their user is saved (password reset,
+    deactivation, profile updates).
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        entry = cache.get(_token_cache_key(hash_token(key)))
+        if entry is None or entry == REVOKED:
+            token = AuthToken.objects.get_for_key(key)
+            if token is None:
+                raise exceptions.AuthenticationFailed(_('Invalid or expired token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            cache_token(token)
+
+        else:
+            token = _load_cached_token(entry)
+            if token.is_expired:
+                raise exceptions.AuthenticationFailed(_('Invalid or expired token.'))
+
+        return token.user, token
@@ -0,0 +1,40 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations, models
+from django.db.models.functions import Cast, Upper
+
+
+def get_postgres_indexes():
+    # On the expression the icontains lookups of the user search compare, UPPER("field"::text).
+    return [
+        GinIndex(OpClass(Upper(Cast(field, models.TextField())), name='gin_trgm_ops'), name=f'user_{field}_trgm_idx')
+        for field in ('username', 'email')
+    ]
+
+
+def add_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Left installed on the way back, other trigram indexes may use it.
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    UserProfile = apps.get_model('account', 'UserProfile')
+    for index in get_postgres_indexes():
+        schema_editor.add_index(UserProfile, index)
+
+
+def remove_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    UserProfile = apps.get_model('account', 'UserProfile')
+    for index in get_postgres_indexes():
+        schema_editor.remove_index(UserProfile, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0002_hashed_tokens'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_postgres_indexes, remove_postgres_indexes),
+    ]
@@ -1,17 +1,20 @@
+import hashlib
+import secrets
+from datetime import timedelta
+
 from django.conf import settings
 from django.db import models
 
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from rest_framework.authtoken.models import Token
+
+AUTH_TOKEN_LIFETIME = timedelta(days=7)
+PASSWORD_RESET_TOKEN_LIFETIME = timedelta(hours=1)
 
 
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_auth_token(sender, instance=None, created=False, **kwargs):
-    if created:
-        Token.objects.create(user=instance)
+def hash_token(key):
+    return hashlib.sha256(key.encode()).hexdigest()
 
 
 class UserProfile(AbstractUser):
@@ -27,3 +30,70 @@ class UserProfile(AbstractUser):
     email = models.EmailField(_("email address"), unique=True, null=False, blank=False, error_messages={
         "unique": _("A user with that email already exists."),
     }, )
+
+
+class HashedTokenQuerySet(models.QuerySet):
+    def unexpired(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+    def get_for_key(self, key):
+        """
+        Return the unexpired token matching a raw key, with its user, in one lookup on the unique key hash,
+        or None.
+        """
+        return self.unexpired().select_related('user').filter(key_hash=hash_token(key)).first()
+
+
+class HashedToken(models.Model):
+    """
+    Represents a bearer secret handed to a user, stored only as its SHA-256 hash and valid until it expires.
+    Use Case: The base of the login and password reset tokens, a leaked table does not leak usable secrets.
+    """
+
+    key_hash = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    lifetime = None
+
+    objects = HashedTokenQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def issue(cls, user):
+        """Create a token for a user, return it with its raw key, which is never stored."""
+        key = secrets.token_urlsafe(32)
+        token = cls.objects.create(user=user, key_hash=hash_token(key), expires_at=timezone.now() + cls.lifetime)
+        return token, key
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class AuthToken(HashedToken):
+    """
+    Represents a login session of a user, sent in the Authorization header.
+    Use Case: Authenticating API requests, a user holds one token per login until it expires or is logged out.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='auth_tokens')
+
+    lifetime = AUTH_TOKEN_LIFETIME
+
+
+class PasswordResetToken(HashedToken):
+    """
+    Represents a one-time password reset link emailed to a user.
+    Use Case: Proving ownership of the email address when resetting a forgotten password.
+    """
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                             related_name='password_reset_tokens')
+
+    lifetime = PASSWORD_RESET_TOKEN_LIFETIME
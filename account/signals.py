@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+
+from account.authentication import invalidate_user_tokens
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_auth_tokens(sender, instance, created=False, **kwargs):
+    # Password resets and deactivations go through save, the cached user must not outlive them.
+    if not created:
+        invalidate_user_tokens(instance.id)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_deleted_user_tokens(sender, instance, **kwargs):
+    invalidate_user_tokens(instance.id)
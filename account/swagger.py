@@ -42,13 +42,14 @@ def user_destroy_swagger_schema():
 
 def user_log_in_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Authenticate user and obtain authentication token.",
+        operation_description="Authenticate user and obtain an authentication token, valid for seven days.",
         responses={
             200: openapi.Response(
                 description="Authentication successful.",
                 examples={
                     'application/json': {
-                        'token': 'token'
+                        'token': 'token',
+                        'expires_at': '2023-07-11T11:43:00Z'
                     },
                 }
             ),
@@ -124,15 +125,14 @@ def forgot_password_swagger_schema():
                     },
                 }
             ),
-            400: openapi.Response(description="Bad request"),
-            500: openapi.Response(description="Internal server error")
+            400: openapi.Response(description="Bad request")
         }
     )
 
 
 def forgot_password_confirm_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Confirm password reset.",
+        operation_description="Confirm password reset with the emailed token, valid for one hour and usable once.",
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             required=['password', 'confirm_password'],
@@ -0,0 +1,40 @@
+from smtplib import SMTPException
+
+from celery import shared_task
+from django.db import transaction
+
+from account.models import AuthToken, PasswordResetToken, UserProfile
+from account.utils import build_reset_email
+
+
+@shared_task(autoretry_for=(SMTPException, OSError), retry_backoff=True, retry_backoff_max=600, max_retries=5)
+def send_reset_email_task(user_id):
+    """
+    Issue a password reset link for a user and email it from a worker, so the request does not wait on the mail
+    server. The raw key only exists here and in the email, the task arguments carry the user id alone.
+    Connection and SMTP errors are retried with an exponential backoff, up to ten minutes apart, each retry with a
+    new link.
+    """
+    user = UserProfile.objects.filter(id=user_id).first()
+    if user is None:
+        return "Invalid user"
+
+    with transaction.atomic():
+        # Only the latest reset link works.
+        user.password_reset_tokens.all().delete()
+        token, key = PasswordResetToken.issue(user)
+    build_reset_email(user.email, key, user.username).send()
+    return "Done"
+
+
+@shared_task
+def purge_expired_tokens():
+    """
+    Delete the expired login and password reset tokens, a range scan on the expires_at index. Runs periodically
+    from beat, expired tokens are already rejected by the lookups.
+    """
+    deleted = 0
+    for model in (AuthToken, PasswordResetToken):
+        count, _ = model.objects.expired().delete()
+        deleted += count
+    return deleted
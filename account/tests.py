@@ -1,3 +1,239 @@
-from django.test import TestCase
+import re
+from datetime import timedelta
+from smtplib import SMTPServerDisconnected
 
-# Create your tests here.
+from celery.signals import task_prerun
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from QuizAPI.celery import app
+from account.authentication import CachedTokenAuthentication, cache_token, get_cached_user_fields
+from account.models import AuthToken, PasswordResetToken, UserProfile, hash_token
+from account.tasks import purge_expired_tokens
+
+
+class FlakyEmailBackend(EmailBackend):
+    """Locmem backend whose first send fails like a dropped SMTP connection."""
+    failures = 0
+
+    def send_messages(self, messages):
+        if FlakyEmailBackend.failures == 0:
+            FlakyEmailBackend.failures += 1
+            raise SMTPServerDisconnected('Connection unexpectedly closed')
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class ForgotPasswordViewTest(APITestCase):
+    def setUp(self):
+        self.user = UserProfile.objects.create_user(username='testuser', email='test@example.com',
+                                                    password='testpassword')
+        self.url = reverse('account:forgot-password')
+
+        eager = app.conf.task_always_eager, app.conf.task_eager_propagates
+        app.conf.task_always_eager = app.conf.task_eager_propagates = True
+        self.addCleanup(lambda: app.conf.update(task_always_eager=eager[0], task_eager_propagates=eager[1]))
+
+    def test_reset_key_stays_out_of_the_task_arguments(self):
+        calls = []
+
+        def record_call(task, args, kwargs, **extra):
+            calls.append((task.name, args, kwargs))
+
+        task_prerun.connect(record_call)
+        self.addCleanup(task_prerun.disconnect, record_call)
+        response = self.client.post(self.url, {'email': 'test@example.com'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(calls, [('account.tasks.send_reset_email_task', [self.user.id], {})])
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['test@example.com'])
+        self.assertIn('testuser', mail.outbox[0].body)
+
+        key = re.search(r'forgot-password-confirm/([\w-]+)/', mail.outbox[0].body).group(1)
+        self.assertEqual(PasswordResetToken.objects.get().key_hash, hash_token(key))
+
+    def test_unknown_email(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'email': 'unknown@example.com'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_BACKEND='account.tests.FlakyEmailBackend')
+    def test_failed_send_is_retried(self):
+        FlakyEmailBackend.failures = 0
+        # An eager retry runs the task again inline, then raises Retry from the first run unless told not to.
+        app.conf.task_eager_propagates = False
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'email': 'test@example.com'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(FlakyEmailBackend.failures, 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create_user(username='testuser', email='test@example.com',
+                                                    password='testpassword')
+        self.token, self.key = AuthToken.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.key}')
+        self.url = reverse('account:verify-token')
+
+    def verify(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(self.url)
+
+    def test_cached_token_skips_the_database(self):
+        self.assertEqual(self.verify().status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.verify()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['id'], self.user.id)
+        self.assertEqual(len(context.captured_queries), 0)
+
+    def test_logout_invalidates_token(self):
+        self.verify()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('account:logout'))
+
+        self.assertEqual(self.verify().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_read_before_logout_is_not_cached_again(self):
+        # A request that looked the token up before the logout committed caches it afterwards.
+        stale = AuthToken.objects.get_for_key(self.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('account:logout'))
+        cache_token(stale)
+
+        self.assertEqual(self.verify().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cached_user_has_no_password_hash(self):
+        self.verify()
+
+        entry = cache.get(f'auth-token:{hash_token(self.key)}')
+        self.assertEqual(set(entry['user']), set(get_cached_user_fields()))
+        self.assertNotIn('password', entry['user'])
+        self.assertNotIn(self.user.password, str(entry))
+
+    def test_cached_user_fields_need_no_query(self):
+        self.verify()
+
+        with self.assertNumQueries(0):
+            user, _ = CachedTokenAuthentication().authenticate_credentials(self.key)
+            self.assertEqual((user.email, user.date_joined, user.first_name, user.last_login),
+                             (self.user.email, self.user.date_joined, '', None))
+        self.assertTrue(user.check_password('testpassword'))
+
+    def test_deactivation_invalidates_token(self):
+        self.verify()
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        self.assertEqual(self.verify().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_reset_refreshes_cached_user(self):
+        self.verify()
+        self.user.set_password('newpassword')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.verify().status_code, status.HTTP_200_OK)
+        self.assertEqual(len(context.captured_queries), 1)
+
+    def test_expired_token_is_rejected(self):
+        self.verify()
+        AuthToken.objects.filter(id=self.token.id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        cache.clear()
+
+        self.assertEqual(self.verify().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_updates_only_last_login(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(reverse('account:login'), {'username': 'testuser', 'password': 'testpassword'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(AuthToken.objects.get_for_key(response.data['token']).user, self.user)
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('SET "last_login"', updates[0])
+        self.assertNotIn('"password"', updates[0])
+
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class PasswordResetTokenTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create_user(username='testuser', email='test@example.com',
+                                                    password='testpassword')
+        self.new_password = {'password': 'newpassword123', 'confirm_password': 'newpassword123'}
+
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        self.addCleanup(app.conf.update, task_always_eager=eager)
+
+    def request_reset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('account:forgot-password'), {'email': 'test@example.com'})
+        # The raw key only exists in the email.
+        return re.search(r'forgot-password-confirm/([\w-]+)/', mail.outbox[-1].body).group(1)
+
+    def confirm(self, key):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('account:forgot-password-confirm', args=[key]), self.new_password)
+
+    def test_reset_token_is_hashed_and_single_use(self):
+        key = self.request_reset()
+        self.assertEqual(PasswordResetToken.objects.get().key_hash, hash_token(key))
+
+        session, _ = AuthToken.issue(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.confirm(key)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('JOIN', context.captured_queries[0]['sql'])
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpassword123'))
+        self.assertFalse(AuthToken.objects.filter(id=session.id).exists())
+        self.assertEqual(self.confirm(key).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_new_request_replaces_reset_token(self):
+        first_key = self.request_reset()
+        second_key = self.request_reset()
+
+        self.assertEqual(self.confirm(first_key).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.confirm(second_key).status_code, status.HTTP_200_OK)
+
+    def test_expired_reset_token(self):
+        key = self.request_reset()
+        PasswordResetToken.objects.update(expires_at=timezone.now())
+
+        self.assertEqual(self.confirm(key).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.confirm('not-a-token').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_purge_expired_tokens(self):
+        AuthToken.issue(self.user)
+        PasswordResetToken.issue(self.user)
+        expired, _ = AuthToken.issue(self.user)
+        AuthToken.objects.filter(id=expired.id).update(expires_at=timezone.now() - timedelta(days=1))
+        PasswordResetToken.objects.update(expires_at=timezone.now() - timedelta(days=1))
+
+        self.assertEqual(purge_expired_tokens(), 2)
+        self.assertEqual(AuthToken.objects.count(), 1)
+        self.assertFalse(PasswordResetToken.objects.exists())
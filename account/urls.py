@@ -14,6 +14,7 @@ urlpatterns = [
     path('verify-token/', views.VerifyTokenView.as_view(), name='verify-token'),
 
     path('forgot-password/', views.ForgotPasswordView.as_view(), name='forgot-password'),
-    path('forgot-password-confirm/<str:token>/', views.ForgotPasswordConfirmView.as_view(), name='forgot-password')
+    path('forgot-password-confirm/<str:token>/', views.ForgotPasswordConfirmView.as_view(),
+         name='forgot-password-confirm')
 
 ]
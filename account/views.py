@@ -1,6 +1,4 @@
 from rest_framework import viewsets, filters, status
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.settings import api_settings
 from rest_framework.response import Response
@@ -8,11 +6,11 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 from account import models, serializers, permissions
+from account.authentication import CachedTokenAuthentication, revoke_auth_tokens
+from django.db import transaction
 from django.utils import timezone
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
 
-from account.utils import send_reset_email
+from account.tasks import send_reset_email_task
 
 from django.utils.decorators import method_decorator
 
@@ -28,7 +26,7 @@ class UserViewSets(viewsets.ModelViewSet):
     queryset = models.UserProfile.objects.all()
     serializer_class = serializers.UserSerializer
     permission_classes = (permissions.UpdateOwnProfile,)
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     filter_backends = (filters.SearchFilter, filters.OrderingFilter,)
     ordering_fields = ('id',)
     search_fields = ('username', 'email',)
@@ -45,32 +43,31 @@ class UserLoginApiView(ObtainAuthToken):
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        token, key = models.AuthToken.issue(user)
 
-        if response.status_code == 200:
-            user = Token.objects.get(key=response.data['token']).user
-            user.last_login = timezone.now()
-            user.save()
+        # A single column update, without the post_save handlers of a full save.
+        models.UserProfile.objects.filter(id=user.id).update(last_login=timezone.now())
 
-        return response
+        return Response({'token': key, 'expires_at': token.expires_at})
 
 
 @method_decorator(name='post', decorator=user_log_out_swagger_schema())
 class LogoutView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user = request.user
-        token = Token.objects.get(user=user)
-        token.delete()
+        revoke_auth_tokens(models.AuthToken.objects.filter(id=request.auth.id))
 
         return Response({'detail': 'Logged out successfully.'})
 
 
 @method_decorator(name='get', decorator=verify_token_swagger_schema())
 class VerifyTokenView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
@@ -90,40 +87,32 @@ class ForgotPasswordView(APIView):
         if serializer.is_valid():
             email = serializer.validated_data.get("email")
             user = models.UserProfile.objects.get(email=email)
-            token, created = Token.objects.get_or_create(user=user)
-            encoded_token = urlsafe_base64_encode(force_bytes(token.key))
-            data = send_reset_email(email, encoded_token, user.username)
-            if data.get('is_sent'):
-                return Response({'message': "Reset link is sent to your email"}, status=status.HTTP_200_OK)
-            else:
-                return Response({'message': data.get('message')}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            # The task issues the reset link, so its raw key never goes through the broker.
+            send_reset_email_task.delay(user.id)
+            return Response({'message': "Reset link is sent to your email"}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @method_decorator(name='post', decorator=forgot_password_confirm_swagger_schema())
 class ForgotPasswordConfirmView(APIView):
-    @staticmethod
-    def get_user_from_encoded_token(token):
-        try:
-            decoded_token = force_str(urlsafe_base64_decode(token))
-            token_obj = Token.objects.get(key=decoded_token)
-            user = token_obj.user
-            return user
-        except Exception:
-            return None
 
     def post(self, request, token):
         serializer = serializers.ForgotPasswordConfirmSerializers(data=request.data)
 
         if serializer.is_valid():
 
-            user = self.get_user_from_encoded_token(token)
+            reset_token = models.PasswordResetToken.objects.get_for_key(token)
 
-            if user is not None:
-                user.set_password(serializer.validated_data.get('password'))
-                user.save()
+            if reset_token is not None:
+                user = reset_token.user
+                with transaction.atomic():
+                    user.set_password(serializer.validated_data.get('password'))
+                    user.save()
+                    # The link is single use, and the sessions opened with the old password end with it.
+                    user.password_reset_tokens.all().delete()
+                    revoke_auth_tokens(user.auth_tokens.all())
                 return Response({'detail': 'Password reset successful.'}, status=status.HTTP_200_OK)
             else:
-                return Response({'detail': 'Invalid token'}, status=status.HTTP_400_BAD_REQUEST)
+                return Response({'detail': 'Invalid or expired token'}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
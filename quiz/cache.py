@@ -0,0 +1,130 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+CATALOG_CACHE_TIMEOUT = 60 * 15
+
+# Names of the views using CachedResponseMixin, for the metrics endpoint.
+CACHED_VIEWS = set()
+
+
+def _version_key(group):
+    return f'cache-version:{group}'
+
+
+def get_cache_versions(groups):
+    """
+    Return the current version of each cache group, e.g. 'quizzes' or 'quiz:<id>'.
+    Data cached under a group stays valid until the group version is bumped.
+    """
+    keys = {_version_key(group): group for group in groups}
+    versions = cache.get_many(keys)
+
+    for key in keys.keys() - versions.keys():
+        # Seed with a timestamp so a version lost to eviction never matches data cached under the old one.
+        cache.add(key, time.time_ns(), timeout=None)
+        versions[key] = cache.get(key)
+
+    return [versions[_version_key(group)] for group in groups]
+
+
+def get_cache_version(group):
+    return get_cache_versions([group])[0]
+
+
+def _increment_cache_versions(groups):
+    for group in groups:
+        try:
+            cache.incr(_version_key(group))
+        except ValueError:
+            # No version yet, the next read starts a fresh one.
+            pass
+
+
+def bump_cache_versions(*groups):
+    """
+    Invalidate the data cached under the given groups.
+    Within a transaction the versions are bumped again once it commits: until then concurrent readers still see
+    the previous rows, and may have cached them under the first bump.
+    """
+    _increment_cache_versions(groups)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _increment_cache_versions(groups))
+
+
+def record_cache_access(view_name, hit):
+    key = f'cache-metrics:{view_name}:{"hits" if hit else "misses"}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_cache_metrics():
+    metrics = {}
+    for view_name in sorted(CACHED_VIEWS):
+        hits = cache.get(f'cache-metrics:{view_name}:hits', 0)
+        misses = cache.get(f'cache-metrics:{view_name}:misses', 0)
+        total = hits + misses
+        metrics[view_name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 2) if total else 0,
+        }
+    return metrics
+
+
+def get_etag(data):
+    """A strong ETag of response data, stable across processes as it only depends on the content."""
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(',', ':'))
+    return f'"{hashlib.md5(content.encode()).hexdigest()}"'
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for the GET responses of a view.
+    Responses are cached per URL (path, filters and pagination parameters) under the versions of the groups
+    returned by get_cache_groups(), so bumping one of them invalidates every response that depends on it.
+    Cached responses carry an ETag, a request whose If-None-Match matches it gets a 304 Not Modified.
+    A response cached from rows that a concurrent transaction is replacing is dropped when it commits, see
+    bump_cache_versions.
+    """
+
+    cache_timeout = CATALOG_CACHE_TIMEOUT
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        CACHED_VIEWS.add(cls.__name__)
+
+    def get_cache_groups(self):
+        raise NotImplementedError
+
+    def get_cache_key(self, request):
+        versions = get_cache_versions(self.get_cache_groups())
+        url = request.build_absolute_uri()
+        digest = hashlib.md5(f'{url}|{versions}'.encode()).hexdigest()
+        return f'response:{self.__class__.__name__}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        cache_key = self.get_cache_key(request)
+        cached = cache.get(cache_key)
+        record_cache_access(self.__class__.__name__, hit=cached is not None)
+        if cached is None:
+            response = super().get(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            cached = (response.data, get_etag(response.data))
+            cache.set(cache_key, cached, self.cache_timeout)
+
+        data, etag = cached
+        response = get_conditional_response(request, etag=etag) or Response(data)
+        response['ETag'] = etag
+        # Clients keep their copy but revalidate it on every use.
+        patch_cache_control(response, no_cache=True)
+        return response
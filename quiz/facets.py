@@ -0,0 +1,39 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F
+
+from quiz.labels import LABEL_RELATIONS
+
+
+def adjust_quiz_counts(model, label_ids, delta):
+    """
+    Apply delta to the quiz_count of a Category or Tag once per occurrence of its id in label_ids, in one UPDATE
+    per distinct number of occurrences.
+    """
+    ids_by_occurrences = defaultdict(list)
+    for label_id, occurrences in Counter(label_ids).items():
+        ids_by_occurrences[occurrences].append(label_id)
+
+    for occurrences, ids in ids_by_occurrences.items():
+        model.objects.filter(id__in=ids).update(quiz_count=F('quiz_count') + delta * occurrences)
+
+
+def get_quiz_facets(quizzes=None):
+    """
+    Return the categories and tags with their number of quizzes, most common first.
+    Without a quiz queryset the maintained counts are read, one row per label. Otherwise the labels of the given
+    quizzes are counted.
+    """
+    facets = {}
+    for model, (through, field, name) in LABEL_RELATIONS.items():
+        if quizzes is None:
+            rows = model.objects.filter(quiz_count__gt=0).values_list('id', 'name', 'quiz_count')
+        else:
+            rows = through.objects.filter(quiz_id__in=quizzes.order_by().values('id')) \
+                .values_list(f'{field}_id', f'{field}__name').annotate(count=Count('quiz_id'))
+
+        facets[name] = [
+            {'id': label_id, 'name': label_name, 'count': count}
+            for label_id, label_name, count in sorted(rows, key=lambda row: (-row[2], row[1]))
+        ]
+    return facets
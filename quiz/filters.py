@@ -1,54 +1,65 @@
 from django_filters import rest_framework as filters
-from .models import Participant, Quiz
+from .labels import MATCH_ALL, MATCH_ANY, filter_labelled_quizzes, parse_label_names
+from .models import Category, Participant, Quiz, Tag
+from .search import search_quizzes
 
+MATCH_CHOICES = (
+    (MATCH_ALL, 'Quizzes with all of the categories and tags'),
+    (MATCH_ANY, 'Quizzes with any of the categories and tags'),
+)
 
-class ParticipantFilter(filters.FilterSet):
-    categories = filters.CharFilter(method='filter_by_categories', field_name='quiz__categories__name')
-    tags = filters.CharFilter(method='filter_by_tags', field_name='quiz__tags__name')
 
-    class Meta:
-        model = Participant
-        fields = ['categories', 'tags']
+class LabelFilterMixin:
+    """
+    Filters on comma separated category and tag names, matching all of them, or any of them with match=any.
+    quiz_path is the lookup path to the quiz.
+    """
+    quiz_path = ''
 
-    def filter_by_categories(self, queryset, name, value):
-        categories = value.split(',')
-        for category in categories:
-            category = category.strip()
-            if category:
-                queryset = queryset.filter(quiz__categories__name__iexact=category)
+    def filter_by_match(self, queryset, name, value):
+        # Read by the category and tag filters.
         return queryset
 
+    def filter_by_labels(self, queryset, model, value):
+        names = parse_label_names(value)
+        if not names:
+            return queryset
+
+        match = self.form.cleaned_data.get('match') or MATCH_ALL
+        return filter_labelled_quizzes(queryset, model, names, match, self.quiz_path)
+
+    def filter_by_categories(self, queryset, name, value):
+        return self.filter_by_labels(queryset, Category, value)
+
     def filter_by_tags(self, queryset, name, value):
-        tags = value.split(',')
-        for tag in tags:
-            tag = tag.strip()
-            if tag:
-                queryset = queryset.filter(quiz__tags__name__iexact=tag)
-        return queryset
+        return self.filter_by_labels(queryset, Tag, value)
 
 
-class QuizFilter(filters.FilterSet):
+class ParticipantFilter(LabelFilterMixin, filters.FilterSet):
+    quiz = filters.NumberFilter(field_name='quiz_id')
+    categories = filters.CharFilter(method='filter_by_categories', field_name='quiz__categories__name')
+    tags = filters.CharFilter(method='filter_by_tags', field_name='quiz__tags__name')
+    match = filters.ChoiceFilter(choices=MATCH_CHOICES, method='filter_by_match')
+
+    quiz_path = 'quiz__'
+
+    class Meta:
+        model = Participant
+        fields = ['quiz', 'categories', 'tags', 'match']
+
+
+class QuizFilter(LabelFilterMixin, filters.FilterSet):
     categories = filters.CharFilter(method='filter_by_categories', field_name='categories__name')
     tags = filters.CharFilter(method='filter_by_tags', field_name='tags__name')
+    match = filters.ChoiceFilter(choices=MATCH_CHOICES, method='filter_by_match')
+    search = filters.CharFilter(method='filter_by_search')
+    # Case-insensitive substring of the title, served on PostgreSQL by the trigram index of migration 0021.
     title = filters.CharFilter(field_name='title', lookup_expr='icontains')
     time_limit = filters.NumberFilter(field_name='time_limit', lookup_expr='lte')
 
     class Meta:
         model = Quiz
-        fields = ['categories', 'tags', 'title', 'time_limit']
+        fields = ['categories', 'tags', 'match', 'search', 'title', 'time_limit']
 
-    def filter_by_categories(self, queryset, name, value):
-        categories = value.split(',')
-        for category in categories:
-            category = category.strip()
-            if category:
-                queryset = queryset.filter(categories__name__iexact=category)
-        return queryset
-
-    def filter_by_tags(self, queryset, name, value):
-        tags = value.split(',')
-        for tag in tags:
-            tag = tag.strip()
-            if tag:
-                queryset = queryset.filter(tags__name__iexact=tag)
-        return queryset
+    def filter_by_search(self, queryset, name, value):
+        return search_quizzes(queryset, value)
@@ -0,0 +1,94 @@
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import Lower
+
+from quiz.cache import CATALOG_CACHE_TIMEOUT, bump_cache_versions, get_cache_version
+from quiz.models import Category, Tag, Quiz
+
+MATCH_ALL = 'all'
+MATCH_ANY = 'any'
+# Up to this many names, 'all' joins the links once per name rather than grouping every link of the names.
+MATCH_ALL_JOIN_LIMIT = 5
+
+# Label model: (quiz m2m through model, label field of the through model, cache group named after the Quiz m2m field).
+LABEL_RELATIONS = {
+    Category: (Quiz.categories.through, 'category', 'categories'),
+    Tag: (Quiz.tags.through, 'tag', 'tags'),
+}
+
+
+def parse_label_names(value):
+    """Split a comma separated filter value into its distinct, case-insensitive names."""
+    return list(dict.fromkeys(name.strip().lower() for name in value.split(',') if name.strip()))
+
+
+def get_label_id_map(model):
+    """
+    Return the lowercase name to id map of all categories or tags. It is cached until the 'categories' or 'tags'
+    cache group is bumped, so names resolve without a query.
+    """
+    through, field, group = LABEL_RELATIONS[model]
+    cache_key = f'label-ids:{group}:{get_cache_version(group)}'
+    id_map = cache.get(cache_key)
+    if id_map is None:
+        id_map = {name.lower(): label_id for label_id, name in model.objects.values_list('id', 'name')}
+        cache.set(cache_key, id_map, CATALOG_CACHE_TIMEOUT)
+    return id_map
+
+
+def get_label_ids(model, names):
+    """Resolve lowercase names to the ids of the labels carrying them, None for unknown names."""
+    id_map = get_label_id_map(model)
+    return [id_map.get(name) for name in names]
+
+
+def ensure_labels(model, names):
+    """
+    Return the lowercase name to id map of the categories or tags with the given names, creating the missing ones
+    in a single INSERT. Names are matched case-insensitively, a created label keeps the case it was first given
+    with. Safe against concurrent creation, the unique lower(name) constraint settles the race.
+    """
+    names = [name.strip() for name in names if name.strip()]
+    if not names:
+        return {}
+
+    def fetch(names):
+        # Exact names too, as SQLite only lowercases ASCII letters.
+        labels = model.objects.annotate(lower_name=Lower('name')) \
+            .filter(Q(lower_name__in={name.lower() for name in names}) | Q(name__in=names))
+        return {name.lower(): label_id for label_id, name in labels.values_list('id', 'name')}
+
+    ids = fetch(names)
+    missing = list({name.lower(): name for name in reversed(names) if name.lower() not in ids}.values())
+    if missing:
+        # Conflicting rows were created concurrently, the ids of all the missing names are read back either way.
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        ids.update(fetch(missing))
+        bump_cache_versions(LABEL_RELATIONS[model][2])
+    return ids
+
+
+def filter_labelled_quizzes(queryset, model, names, match=MATCH_ALL, quiz_path=''):
+    """
+    Filter a queryset of quizzes, or of rows reaching a quiz through quiz_path, to the quizzes labelled with all,
+    or any, of the given names. 'all' of up to MATCH_ALL_JOIN_LIMIT names joins the links once per name, so the
+    planner can start from the quizzes in page order or from the rarest name. Above that, a single grouped query
+    keeps the quizzes whose links cover every name, and 'any' is a single IN lookup.
+    """
+    through, field, group = LABEL_RELATIONS[model]
+    label_ids = get_label_ids(model, names)
+    known_ids = [label_id for label_id in label_ids if label_id is not None]
+    if not known_ids or (match == MATCH_ALL and len(known_ids) < len(label_ids)):
+        return queryset.none()
+
+    if len(known_ids) == 1 or (match == MATCH_ALL and len(known_ids) <= MATCH_ALL_JOIN_LIMIT):
+        # A quiz links each label once, so the joins don't repeat rows.
+        for label_id in known_ids:
+            queryset = queryset.filter(**{f'{quiz_path}{group}': label_id})
+        return queryset
+
+    quiz_ids = through.objects.filter(**{f'{field}_id__in': known_ids}).values('quiz_id')
+    if match == MATCH_ALL:
+        quiz_ids = quiz_ids.annotate(covered_names=Count(f'{field}_id')) \
+            .filter(covered_names=len(known_ids)).values('quiz_id')
+    return queryset.filter(**{f'{quiz_path}id__in': quiz_ids})
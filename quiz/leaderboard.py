@@ -0,0 +1,156 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+from quiz.models import Quiz, Participant, LeaderboardEntry, LeaderboardScope
+
+REBUILD_BATCH_SIZE = 1000
+# Leaderboards are ordered by -score, end_time and the participant id as a tie breaker.
+LEADERBOARD_ORDERING = ('-score', 'end_time', 'participant_id')
+# Key of the PostgreSQL advisory lock serializing leaderboard writes.
+LEADERBOARD_LOCK_ID = 0x4c424f415244
+
+_refreshes = threading.local()
+
+
+def get_leaderboard_scopes(quiz_id):
+    """Return every (scope, scope_id) leaderboard a participant of the given quiz appears on."""
+    scopes = [(LeaderboardScope.GLOBAL, 0), (LeaderboardScope.QUIZ, quiz_id)]
+    category_ids = Quiz.categories.through.objects.filter(quiz_id=quiz_id).values_list('category_id', flat=True)
+    tag_ids = Quiz.tags.through.objects.filter(quiz_id=quiz_id).values_list('tag_id', flat=True)
+    scopes += [(LeaderboardScope.CATEGORY, category_id) for category_id in sorted(category_ids)]
+    scopes += [(LeaderboardScope.TAG, tag_id) for tag_id in sorted(tag_ids)]
+    return scopes
+
+
+def _lock_leaderboards():
+    # Stored ranks make every score a write to the global leaderboard, so leaderboard writers are serialized.
+    # SQLite serializes writers on its own, PostgreSQL needs an explicit lock.
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [LEADERBOARD_LOCK_ID])
+
+
+def _renumber(scope, scope_id):
+    table = connection.ops.quote_name(LeaderboardEntry._meta.db_table)
+    rank = connection.ops.quote_name('rank')
+    with connection.cursor() as cursor:
+        # Only the entries whose position changed are written.
+        cursor.execute(
+            f'UPDATE {table} SET {rank} = ranked.position FROM ('
+            f'  SELECT id, ROW_NUMBER() OVER (ORDER BY score DESC, end_time, participant_id) AS position'
+            f'  FROM {table} WHERE scope = %s AND scope_id = %s'
+            f') AS ranked WHERE {table}.id = ranked.id AND {table}.{rank} <> ranked.position',
+            [scope, scope_id],
+        )
+
+
+def refresh_leaderboard_ranks(scopes):
+    """
+    Renumber the given (scope, scope_id) leaderboards in LEADERBOARD_ORDERING. Within batched_rank_refreshes, each
+    leaderboard is renumbered once when the block exits.
+    """
+    batch = getattr(_refreshes, 'batch', None)
+    if batch is not None:
+        batch.update(scopes)
+        return
+
+    with transaction.atomic():
+        _lock_leaderboards()
+        for scope, scope_id in sorted(set(scopes)):
+            _renumber(scope, scope_id)
+
+
+@contextmanager
+def batched_rank_refreshes():
+    """Defer the rank refreshes of the leaderboard writes within the block, to renumber each leaderboard once."""
+    if getattr(_refreshes, 'batch', None) is not None:
+        yield
+        return
+
+    _refreshes.batch = set()
+    try:
+        yield
+        scopes = _refreshes.batch
+    finally:
+        _refreshes.batch = None
+    refresh_leaderboard_ranks(scopes)
+
+
+def _refresh_pending_ranks():
+    scopes, _refreshes.pending = getattr(_refreshes, 'pending', set()), set()
+    refresh_leaderboard_ranks(scopes)
+
+
+def refresh_leaderboard_ranks_on_commit(scopes):
+    """
+    Renumber the given leaderboards once the current transaction commits, for entries deleted by cascade.
+    The leaderboards of every such deletion in the transaction are renumbered together.
+    """
+    pending = getattr(_refreshes, 'pending', None)
+    if pending is None:
+        pending = _refreshes.pending = set()
+    pending.update(scopes)
+    transaction.on_commit(_refresh_pending_ranks)
+
+
+def drop_leaderboard(scope, scope_id):
+    """Delete every entry of a leaderboard, for a category or tag that is being deleted."""
+    with transaction.atomic():
+        _lock_leaderboards()
+        LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id).delete()
+
+
+def record_leaderboard_score(participant):
+    """
+    Move a participant to its current position on every leaderboard it belongs to, with a single upsert, then
+    renumber these leaderboards. Participants that have not passed, or have no score, are taken off them.
+    """
+    scopes = get_leaderboard_scopes(participant.quiz_id)
+
+    with transaction.atomic():
+        _lock_leaderboards()
+
+        if participant.has_passed and participant.score is not None:
+            LeaderboardEntry.objects.bulk_create(
+                [
+                    LeaderboardEntry(scope=scope, scope_id=scope_id, participant_id=participant.id,
+                                     user_id=participant.user_id, score=participant.score,
+                                     end_time=participant.end_time)
+                    for scope, scope_id in scopes
+                ],
+                update_conflicts=True,
+                unique_fields=['scope', 'scope_id', 'participant'],
+                update_fields=['user', 'score', 'end_time'],
+            )
+        else:
+            scopes = list(participant.leaderboard_entries.values_list('scope', 'scope_id'))
+            LeaderboardEntry.objects.filter(participant_id=participant.id).delete()
+        refresh_leaderboard_ranks(scopes)
+
+
+def rebuild_leaderboard(scope, scope_id=0):
+    """Recompute one leaderboard from the participants table."""
+    participants = Participant.objects.filter(has_passed=True, score__isnull=False)
+    if scope == LeaderboardScope.QUIZ:
+        participants = participants.filter(quiz_id=scope_id)
+    elif scope == LeaderboardScope.CATEGORY:
+        participants = participants.filter(quiz__categories=scope_id)
+    elif scope == LeaderboardScope.TAG:
+        participants = participants.filter(quiz__tags=scope_id)
+
+    rows = participants.order_by('-score', 'end_time', 'id').values_list('id', 'user_id', 'score', 'end_time')
+
+    with transaction.atomic():
+        _lock_leaderboards()
+        LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id).delete()
+
+        batch = []
+        for rank, (participant_id, user_id, score, end_time) in enumerate(rows.iterator(), start=1):
+            batch.append(LeaderboardEntry(scope=scope, scope_id=scope_id, participant_id=participant_id,
+                                          user_id=user_id, score=score, end_time=end_time, rank=rank))
+            if len(batch) == REBUILD_BATCH_SIZE:
+                LeaderboardEntry.objects.bulk_create(batch)
+                batch = []
+        LeaderboardEntry.objects.bulk_create(batch)
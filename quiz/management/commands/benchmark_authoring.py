@@ -0,0 +1,63 @@
+import time
+
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from account.models import UserProfile
+from quiz.serializers import QuizSerializer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark nested quiz creation through QuizSerializer, all changes are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=200, help='Number of questions per quiz')
+        parser.add_argument('--answers', type=int, default=4, help='Number of answers per question')
+        parser.add_argument('--runs', type=int, default=5, help='Number of quizzes to create')
+
+    def handle(self, *args, **options):
+        num_questions = options['questions']
+        num_answers = options['answers']
+        runs = options['runs']
+
+        data = {
+            'title': 'Benchmark quiz',
+            'description': 'Benchmark quiz',
+            'time_limit': 30,
+            'tags': [],
+            'categories': [],
+            'questions': [
+                {
+                    'text': f'Question {question}',
+                    'type': 'MC',
+                    'points': 1,
+                    'answers': [
+                        {'text': f'Answer {answer}', 'is_correct': answer == 0} for answer in range(num_answers)
+                    ],
+                }
+                for question in range(num_questions)
+            ],
+        }
+
+        with transaction.atomic():
+            user = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+
+            durations = []
+            queries = 0
+            for _ in range(runs):
+                serializer = QuizSerializer(data=data)
+                serializer.is_valid(raise_exception=True)
+
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    serializer.save(created_by=user)
+                    durations.append(time.perf_counter() - start)
+                queries = len(context.captured_queries)
+
+            transaction.set_rollback(True)
+
+        best = min(durations)
+        self.stdout.write(f'{connection.vendor}: quiz with {num_questions} questions x {num_answers} answers')
+        self.stdout.write(f'  queries per quiz: {queries}')
+        self.stdout.write(f'  best of {runs}: {best * 1000:.1f} ms ({num_questions / best:.0f} questions/s)')
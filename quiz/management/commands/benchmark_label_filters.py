@@ -0,0 +1,93 @@
+import random
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from account.models import UserProfile
+from quiz.filters import QuizFilter
+from quiz.models import Tag, Quiz
+
+SEED_BATCH_SIZE = 5000
+NUM_TAGS = 200
+TAGS_PER_QUIZ = 5
+PAGE_SIZE = 10
+VALUE_COUNTS = (1, 2, 5, 10, 20)
+
+
+class Command(BaseCommand):
+    help = ('Seed tagged quizzes, then compare the latency of the former chained tag filters with the label filter '
+            'engine for 1 to 20 tags, all changes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=100000, help='Number of quizzes to seed')
+        parser.add_argument('--queries', type=int, default=50, help='Number of filter queries to time per case')
+
+    def seed(self, rng, num_quizzes):
+        author = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+        tags = Tag.objects.bulk_create([Tag(name=f'Benchmark tag {index}') for index in range(NUM_TAGS)])
+        # Tag popularity follows a Zipf distribution, so that "all of" filters on popular tags still match.
+        frequencies = [1 / rank for rank in range(1, NUM_TAGS + 1)]
+
+        for start in range(0, num_quizzes, SEED_BATCH_SIZE):
+            quizzes = Quiz.objects.bulk_create([
+                Quiz(title=f'Benchmark quiz {index}', description='', time_limit=30, created_by=author)
+                for index in range(start, min(start + SEED_BATCH_SIZE, num_quizzes))
+            ])
+            Quiz.tags.through.objects.bulk_create([
+                Quiz.tags.through(quiz_id=quiz.id, tag_id=tag.id)
+                for quiz in quizzes for tag in set(rng.choices(tags, weights=frequencies, k=TAGS_PER_QUIZ))
+            ])
+        return [tag.name for tag in tags]
+
+    def chained_filter(self, queryset, names, match):
+        # The filters before the label engine, one join per tag, "all of" only.
+        for name in names:
+            queryset = queryset.filter(tags__name__iexact=name)
+        return queryset
+
+    def label_filter(self, queryset, names, match):
+        return QuizFilter({'tags': ','.join(names), 'match': match}, queryset=queryset).qs
+
+    def measure(self, queryset, queries, match, function):
+        durations = []
+        matched = 0
+        for names in queries:
+            start = time.perf_counter()
+            matched += len(list(function(queryset, names, match)[:PAGE_SIZE]))
+            durations.append(time.perf_counter() - start)
+        durations.sort()
+        return statistics.median(durations), durations[int(len(durations) * 0.95)], matched / len(queries)
+
+    def handle(self, *args, **options):
+        num_quizzes = options['quizzes']
+        num_queries = options['queries']
+        if num_quizzes < 1 or num_queries < 1:
+            raise CommandError('--quizzes and --queries must be positive')
+
+        rng = random.Random(0)
+        with transaction.atomic():
+            start = time.perf_counter()
+            names = self.seed(rng, num_quizzes)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(f'{connection.vendor}: seeded {num_quizzes} quizzes in '
+                              f'{time.perf_counter() - start:.1f} s')
+
+            quizzes = Quiz.objects.order_by('-id')
+            results = []
+            for count in VALUE_COUNTS:
+                # "All of" picks among the most popular tags, "any of" among all of them.
+                all_queries = [rng.sample(names[:max(count * 2, 10)], count) for _ in range(num_queries)]
+                any_queries = [rng.sample(names, count) for _ in range(num_queries)]
+                results += [
+                    (count, 'all', 'chained filters', self.measure(quizzes, all_queries, 'all', self.chained_filter)),
+                    (count, 'all', 'label filter', self.measure(quizzes, all_queries, 'all', self.label_filter)),
+                    (count, 'any', 'label filter', self.measure(quizzes, any_queries, 'any', self.label_filter)),
+                ]
+            transaction.set_rollback(True)
+
+        for count, match, name, (median, p95, matched) in results:
+            self.stdout.write(f'  {count} tags, {match}, {name}: median {median * 1000:.1f} ms, '
+                              f'p95 {p95 * 1000:.1f} ms, {matched:.1f} results per page')
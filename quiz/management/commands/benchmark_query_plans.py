@@ -0,0 +1,116 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from account.models import UserProfile
+from quiz.models import Quiz, Participant, Feedback
+
+SEED_BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = ('Seed participants and feedback, then EXPLAIN the hot participant and feedback queries and check '
+            'that each one is an index scan, all changes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participants', type=int, default=1000000, help='Number of participants to seed')
+        parser.add_argument('--quizzes', type=int, default=1000, help='Number of quizzes to seed')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full query plans')
+
+    def seed(self, num_participants, num_quizzes):
+        rng = random.Random(0)
+        num_users = -(-num_participants // num_quizzes)
+
+        author = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'Quiz {index}', description='', time_limit=30, created_by=author)
+            for index in range(num_quizzes)
+        ])
+        users = []
+        for start in range(0, num_users, SEED_BATCH_SIZE):
+            users += UserProfile.objects.bulk_create([
+                UserProfile(username=f'benchmark-{index}', email=f'benchmark-{index}@example.com')
+                for index in range(start, min(start + SEED_BATCH_SIZE, num_users))
+            ])
+
+        now = timezone.now()
+        batch = []
+        for index in range(num_participants):
+            score = rng.randint(0, 100) if rng.random() < 0.9 else None
+            end_time = now - timedelta(minutes=rng.randint(0, 525600))
+            batch.append(Participant(
+                user_id=users[index // num_quizzes].id, quiz_id=quizzes[index % num_quizzes].id,
+                start_time=end_time - timedelta(minutes=30), end_time=end_time,
+                score=score, has_passed=score is not None and score >= 33,
+            ))
+            if len(batch) == SEED_BATCH_SIZE or index == num_participants - 1:
+                participants = Participant.objects.bulk_create(batch)
+                Feedback.objects.bulk_create([
+                    Feedback(participant_id=participant.id, quiz_id=participant.quiz_id, rating=4, comment='')
+                    for participant in participants[::10]
+                ])
+                batch = []
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+        return users[len(users) // 2], quizzes[len(quizzes) // 2]
+
+    def get_queries(self, user, quiz):
+        # The lookups behind the start/submit/feedback, leaderboard, statistics and feedback list endpoints.
+        scored = Participant.objects.filter(has_passed=True, score__isnull=False)
+        return [
+            ('participant by user and quiz', Participant.objects.filter(user=user, quiz=quiz)),
+            ('leaderboard', scored.order_by('-score', 'end_time', 'id')[:10]),
+            ('quiz leaderboard rebuild', scored.filter(quiz=quiz).order_by('-score', 'end_time', 'id')),
+            ('user statistics', Participant.objects.filter(user=user, score__isnull=False).order_by('end_time')[:15]),
+            ('feedback list', Feedback.objects.filter(quiz=quiz).order_by('-id')[:10]),
+        ]
+
+    def is_index_scan(self, plan):
+        """Whether a plan reads its rows, in order, from an index: no full table scan and no sort step."""
+        if connection.vendor == 'postgresql':
+            return 'Index' in plan and 'Seq Scan' not in plan and 'Sort' not in plan
+        if connection.vendor == 'sqlite':
+            scans = [line for line in plan.splitlines() if 'SCAN' in line or 'SEARCH' in line]
+            return bool(scans) and all('USING' in line and 'INDEX' in line for line in scans) and \
+                'TEMP B-TREE' not in plan
+        return None
+
+    def handle(self, *args, **options):
+        num_participants = options['participants']
+        num_quizzes = options['quizzes']
+        if num_participants < 1 or num_quizzes < 1:
+            raise CommandError('--participants and --quizzes must be positive')
+
+        missing = []
+        with transaction.atomic():
+            start = time.perf_counter()
+            user, quiz = self.seed(num_participants, num_quizzes)
+            self.stdout.write(f'{connection.vendor}: seeded {num_participants} participants over {num_quizzes} '
+                              f'quizzes in {time.perf_counter() - start:.1f} s')
+
+            for name, queryset in self.get_queries(user, quiz):
+                plan = queryset.explain()
+                start = time.perf_counter()
+                list(queryset)
+                duration = time.perf_counter() - start
+
+                index_scan = self.is_index_scan(plan)
+                if index_scan is False:
+                    missing.append(name)
+                status = {True: 'index scan', False: 'NO INDEX SCAN', None: 'unchecked'}[index_scan]
+                self.stdout.write(f'  {name}: {status}, {duration * 1000:.1f} ms')
+                if options['verbose_plans'] or not index_scan:
+                    for line in plan.splitlines():
+                        self.stdout.write(f'      {line}')
+
+            transaction.set_rollback(True)
+
+        if missing:
+            raise CommandError(f'Queries without an index scan: {", ".join(missing)}')
+        self.stdout.write(self.style.SUCCESS('Every query is an index scan...'))
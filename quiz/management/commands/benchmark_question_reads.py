@@ -0,0 +1,75 @@
+import statistics
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from account.models import UserProfile
+from quiz.models import Quiz, Question
+from quiz.pagination import QuestionsSetPagination
+from quiz.serializers import QuestionSerializer
+from quiz.utils import PARTICIPANT_QUESTION_FIELDS, add_participant_answers, create_questions
+
+
+class Command(BaseCommand):
+    help = ('Compare the staff question list, built by QuestionSerializer, with the participant one, built from '
+            'plain rows, for a page and for a whole quiz, all changes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--questions', type=int, default=200, help='Number of questions of the quiz')
+        parser.add_argument('--answers', type=int, default=4, help='Number of answers per question')
+        parser.add_argument('--runs', type=int, default=50, help='Number of reads to time per case')
+
+    def staff_questions(self, quiz_id, size):
+        questions = Question.objects.filter(quiz_id=quiz_id).prefetch_related('answers').order_by('id')[:size]
+        return QuestionSerializer(questions, many=True).data
+
+    def participant_questions(self, quiz_id, size):
+        questions = Question.objects.filter(quiz_id=quiz_id).order_by('id')
+        return add_participant_answers(list(questions.values(*PARTICIPANT_QUESTION_FIELDS)[:size]))
+
+    def measure(self, runs, function, *args):
+        durations = []
+        for _ in range(runs):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                function(*args)
+                durations.append(time.perf_counter() - start)
+        return statistics.median(durations), len(context.captured_queries)
+
+    def handle(self, *args, **options):
+        num_questions = options['questions']
+        num_answers = options['answers']
+        runs = options['runs']
+        if num_questions < 1 or num_answers < 0 or runs < 1:
+            raise CommandError('--questions and --runs must be positive, --answers not negative')
+
+        with transaction.atomic():
+            author = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+            quiz = Quiz.objects.create(title='Benchmark quiz', description='', time_limit=30, created_by=author)
+            create_questions(quiz.id, [
+                {
+                    'text': f'Question {question}',
+                    'type': 'MC',
+                    'points': 1,
+                    'answers': [
+                        {'text': f'Answer {answer}', 'is_correct': answer == 0} for answer in range(num_answers)
+                    ],
+                }
+                for question in range(num_questions)
+            ])
+
+            results = [
+                (label, name, self.measure(runs, function, quiz.id, size))
+                for label, size in ((f'page of {QuestionsSetPagination.max_page_size}',
+                                     QuestionsSetPagination.max_page_size),
+                                    (f'{num_questions} questions', num_questions))
+                for name, function in (('staff serializer', self.staff_questions),
+                                       ('participant rows', self.participant_questions))
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{connection.vendor}: quiz with {num_questions} questions x {num_answers} answers')
+        for label, name, (median, queries) in results:
+            self.stdout.write(f'  {label}, {name}: median {median * 1000:.2f} ms, {queries} queries')
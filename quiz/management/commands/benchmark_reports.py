@@ -0,0 +1,81 @@
+import time
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from account.models import UserProfile
+from quiz.models import Quiz, Participant, Attempt, ScheduledReport
+from quiz.tasks import dispatch_due_reports
+from quiz.utils import generate_participant_report, send_participant_report_email
+
+
+class Command(BaseCommand):
+    help = ('Benchmark participant report emails, one by one against the batched dispatcher, over the locmem '
+            'email backend, all changes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reports', type=int, default=1000, help='Number of due reports')
+        parser.add_argument('--history', type=int, default=7, help='Number of attempts in each user history')
+
+    def seed(self, num_reports, history):
+        now = timezone.now()
+        author = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+        quizzes = Quiz.objects.bulk_create([
+            Quiz(title=f'Quiz {index}', description='', time_limit=30, created_by=author, total_points=10)
+            for index in range(max(history, 1))
+        ])
+        users = UserProfile.objects.bulk_create([
+            UserProfile(username=f'benchmark-{index}', email=f'benchmark-{index}@example.com')
+            for index in range(num_reports)
+        ])
+        participants = Participant.objects.bulk_create([
+            Participant(user_id=user.id, quiz_id=quizzes[0].id, start_time=now, end_time=now, score=5,
+                        has_passed=True)
+            for user in users
+        ])
+        Attempt.objects.bulk_create([
+            Attempt(participant_id=participant.id, user_id=participant.user_id, quiz_id=quizzes[index].id,
+                    started_at=now, ends_at=now, submitted_at=now - timedelta(hours=index), score=5, has_passed=True)
+            for participant in participants for index in range(history)
+        ])
+        return participants
+
+    def measure(self, function):
+        mail.outbox = []
+        with CaptureQueriesContext(connection) as context:
+            start = time.perf_counter()
+            function()
+            duration = time.perf_counter() - start
+        return duration, len(context.captured_queries), len(mail.outbox)
+
+    def handle(self, *args, **options):
+        num_reports = options['reports']
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'), transaction.atomic():
+            participants = self.seed(num_reports, options['history'])
+            participant_ids = [participant.id for participant in participants]
+
+            def send_one_by_one():
+                for participant in Participant.objects.filter(id__in=participant_ids).select_related('user', 'quiz'):
+                    report_content = generate_participant_report(participant)
+                    send_participant_report_email(report_content, participant.user.email)
+
+            ScheduledReport.objects.bulk_create([
+                ScheduledReport(participant_id=participant_id, due_at=timezone.now())
+                for participant_id in participant_ids
+            ])
+
+            results = [
+                ('one by one', self.measure(send_one_by_one)),
+                ('batched', self.measure(dispatch_due_reports)),
+            ]
+            transaction.set_rollback(True)
+
+        self.stdout.write(f'{connection.vendor}: {num_reports} reports with {options["history"]} attempts each')
+        for name, (duration, queries, sent) in results:
+            self.stdout.write(f'  {name}: {sent} emails, {queries} queries, {duration * 1000:.0f} ms '
+                              f'({sent / duration:.0f} emails/s)')
@@ -0,0 +1,105 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from account.models import UserProfile
+from quiz.models import Category, Tag, Quiz
+from quiz.search import rebuild_search_index, search_quizzes
+
+SEED_BATCH_SIZE = 5000
+VOCABULARY_SIZE = 5000
+PAGE_SIZE = 10
+
+
+class Command(BaseCommand):
+    help = ('Seed a quiz catalog, then compare the latency of the title icontains filter with the search index on '
+            'a first page of results, all changes are rolled back')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quizzes', type=int, default=100000, help='Number of quizzes to seed')
+        parser.add_argument('--queries', type=int, default=200, help='Number of search queries to time')
+
+    def seed(self, rng, num_quizzes):
+        vocabulary = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(VOCABULARY_SIZE)
+        ]
+        # Word frequencies follow a Zipf distribution, like natural text.
+        frequencies = [1 / rank for rank in range(1, VOCABULARY_SIZE + 1)]
+
+        def words(count):
+            return ' '.join(rng.choices(vocabulary, weights=frequencies, k=count))
+
+        author = UserProfile.objects.create(username='benchmark-author', email='benchmark-author@example.com')
+        # Label names are unique, drawn from the more common words.
+        label_names = list(dict.fromkeys(vocabulary))
+        categories = Category.objects.bulk_create([Category(name=name) for name in rng.sample(label_names[:1000], 50)])
+        tags = Tag.objects.bulk_create([Tag(name=name) for name in rng.sample(label_names[:2000], 500)])
+
+        for start in range(0, num_quizzes, SEED_BATCH_SIZE):
+            quizzes = Quiz.objects.bulk_create([
+                Quiz(title=words(rng.randint(2, 6)), description=words(rng.randint(10, 40)), time_limit=30,
+                     created_by=author)
+                for _ in range(start, min(start + SEED_BATCH_SIZE, num_quizzes))
+            ])
+            Quiz.categories.through.objects.bulk_create([
+                Quiz.categories.through(quiz_id=quiz.id, category_id=rng.choice(categories).id) for quiz in quizzes
+            ])
+            Quiz.tags.through.objects.bulk_create([
+                Quiz.tags.through(quiz_id=quiz.id, tag_id=tag.id)
+                for quiz in quizzes for tag in rng.sample(tags, 3)
+            ])
+
+        return vocabulary
+
+    def measure(self, queries, function):
+        durations = []
+        matched = 0
+        for query in queries:
+            start = time.perf_counter()
+            matched += len(list(function(query)[:PAGE_SIZE]))
+            durations.append(time.perf_counter() - start)
+        durations.sort()
+        return statistics.median(durations), durations[int(len(durations) * 0.95)], matched / len(queries)
+
+    def handle(self, *args, **options):
+        num_quizzes = options['quizzes']
+        num_queries = options['queries']
+        if num_quizzes < 1 or num_queries < 1:
+            raise CommandError('--quizzes and --queries must be positive')
+
+        rng = random.Random(0)
+        with transaction.atomic():
+            start = time.perf_counter()
+            vocabulary = self.seed(rng, num_quizzes)
+            self.stdout.write(f'{connection.vendor}: seeded {num_quizzes} quizzes in '
+                              f'{time.perf_counter() - start:.1f} s')
+
+            start = time.perf_counter()
+            rebuild_search_index()
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(f'  search index built in {time.perf_counter() - start:.1f} s')
+
+            quizzes = Quiz.objects.order_by('-id')
+            workloads = [
+                ('common word', [rng.choice(vocabulary[:20]) for _ in range(num_queries)]),
+                ('rare word', [rng.choice(vocabulary[500:]) for _ in range(num_queries)]),
+                ('two words', [' '.join(rng.sample(vocabulary[:200], 2)) for _ in range(num_queries)]),
+            ]
+            results = [
+                (workload, name, self.measure(queries, function))
+                for workload, queries in workloads
+                for name, function in (
+                    ('title icontains', lambda query: quizzes.filter(title__icontains=query)),
+                    ('search index', lambda query: search_quizzes(quizzes, query)),
+                )
+            ]
+            transaction.set_rollback(True)
+
+        for workload, name, (median, p95, matched) in results:
+            self.stdout.write(f'  {workload}, {name}: median {median * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms, '
+                              f'{matched:.1f} results per page')
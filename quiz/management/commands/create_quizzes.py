@@ -1,6 +1,7 @@
 from django.core.management import BaseCommand, call_command
 from faker import Faker
 from quiz.models import Category, Tag, Quiz, QuestionType, Question, Answer
+from quiz.cache import bump_cache_versions
 import random
 
 from account.models import UserProfile
@@ -79,5 +80,8 @@ class Command(BaseCommand):
                 random.shuffle(answers)
                 Answer.objects.bulk_create(answers)
 
+            # bulk_create skips the model signals that invalidate the cached quiz data
+            bump_cache_versions(f'quiz:{quiz.id}')
+
         self.stdout.write(
             f"Sample data populated successfully. Created {num_quizzes} quizzes with {num_questions_per_quiz} questions each.")
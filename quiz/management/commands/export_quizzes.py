@@ -0,0 +1,24 @@
+from django.core.management import BaseCommand
+
+from quiz.transfer import export_quizzes
+
+
+class Command(BaseCommand):
+    help = 'Export every quiz, with its questions and answers, as JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='File to write to, stdout by default')
+
+    def handle(self, *args, **options):
+        if not options['output']:
+            for line in export_quizzes():
+                self.stdout.write(line, ending='')
+            return
+
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in export_quizzes():
+                output.write(line)
+                count += 1
+
+        self.stdout.write(self.style.SUCCESS(f'{count} quizzes have been exported...'))
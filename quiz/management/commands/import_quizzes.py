@@ -0,0 +1,27 @@
+from django.core.management import BaseCommand, CommandError
+
+from account.models import UserProfile
+from quiz.transfer import QuizImportError, import_quizzes
+
+
+class Command(BaseCommand):
+    help = 'Import quizzes, with their questions and answers, from a JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='JSON Lines file, one quiz per line')
+        parser.add_argument('--created-by', required=True, help='Username of the quizzes author')
+
+    def handle(self, *args, **options):
+        try:
+            user = UserProfile.objects.get(username=options['created_by'])
+        except UserProfile.DoesNotExist:
+            raise CommandError(f'User "{options["created_by"]}" does not exist')
+
+        try:
+            with open(options['file'], encoding='utf-8') as lines:
+                imported = import_quizzes(lines, user.id)
+        except QuizImportError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{imported["quizzes"]} quizzes with {imported["questions"]} questions have been imported...'))
@@ -0,0 +1,20 @@
+from django.core.management import BaseCommand
+
+from quiz.leaderboard import rebuild_leaderboard
+from quiz.models import Category, Tag, Quiz, LeaderboardScope
+
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed leaderboards from the participants table'
+
+    def handle(self, *args, **options):
+        rebuild_leaderboard(LeaderboardScope.GLOBAL)
+
+        for quiz_id in Quiz.objects.values_list('id', flat=True).iterator():
+            rebuild_leaderboard(LeaderboardScope.QUIZ, quiz_id)
+        for category_id in Category.objects.values_list('id', flat=True).iterator():
+            rebuild_leaderboard(LeaderboardScope.CATEGORY, category_id)
+        for tag_id in Tag.objects.values_list('id', flat=True).iterator():
+            rebuild_leaderboard(LeaderboardScope.TAG, tag_id)
+
+        self.stdout.write(self.style.SUCCESS('Leaderboards have been rebuilt...'))
@@ -0,0 +1,12 @@
+from django.core.management import BaseCommand
+
+from quiz.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the quiz search index from the quizzes, their tags and their categories'
+
+    def handle(self, *args, **options):
+        indexed = rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(f'{indexed} quizzes have been indexed...'))
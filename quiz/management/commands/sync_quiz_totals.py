@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, Sum
+
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    help = 'Backfill or check the stored total_points and question_count of quizzes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report mismatches, do not fix them')
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        quizzes = Quiz.objects.annotate(
+            points_sum=Sum('questions__points'), questions_num=Count('questions')
+        ).only('id', 'total_points', 'question_count')
+
+        mismatched = 0
+        for quiz in quizzes.iterator():
+            total_points = quiz.points_sum or 0
+            if quiz.total_points == total_points and quiz.question_count == quiz.questions_num:
+                continue
+
+            mismatched += 1
+            self.stdout.write(
+                f"Quiz {quiz.id}: stored {quiz.total_points} points / {quiz.question_count} questions, "
+                f"actual {total_points} points / {quiz.questions_num} questions")
+            if not check_only:
+                Quiz.objects.filter(id=quiz.id).update(total_points=total_points, question_count=quiz.questions_num)
+
+        if check_only and mismatched:
+            self.stdout.write(self.style.ERROR(f'{mismatched} quizzes have stale totals'))
+        elif mismatched:
+            self.stdout.write(self.style.SUCCESS(f'Fixed totals of {mismatched} quizzes'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All quiz totals are up to date'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:11
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_quiz_totals(apps, schema_editor):
+    Quiz = apps.get_model('quiz', 'Quiz')
+    quizzes = Quiz.objects.annotate(points_sum=Sum('questions__points'), questions_num=Count('questions'))
+    for quiz in quizzes.iterator():
+        quiz.total_points = quiz.points_sum or 0
+        quiz.question_count = quiz.questions_num
+        quiz.save(update_fields=['total_points', 'question_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0002_participant_has_passed_quiz_passing_marks_percentage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='question_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='total_points',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_quiz_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0003_quiz_total_points_question_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('G', 'Global'), ('Q', 'Quiz'), ('C', 'Category'), ('T', 'Tag')], max_length=1)),
+                ('scope_id', models.BigIntegerField(default=0)),
+                ('score', models.IntegerField()),
+                ('end_time', models.DateTimeField()),
+                ('rank', models.PositiveIntegerField()),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='quiz.participant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'scope_id', 'rank'], name='leaderboard_rank_idx'), models.Index(fields=['scope', 'scope_id', 'user', 'rank'], name='leaderboard_user_rank_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='leaderboardentry',
+            constraint=models.UniqueConstraint(fields=('scope', 'scope_id', 'participant'), name='unique_leaderboard_participant'),
+        ),
+    ]
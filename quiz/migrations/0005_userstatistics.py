@@ -0,0 +1,24 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:17
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0001_initial'),
+        ('quiz', '0004_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatistics',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='quiz_statistics', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_attempted', models.PositiveIntegerField(default=0)),
+                ('total_passed', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
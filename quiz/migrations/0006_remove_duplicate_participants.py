@@ -0,0 +1,41 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:02
+
+from django.db import migrations
+from django.db.models import Count, Max
+
+
+def remove_duplicate_participants(apps, schema_editor):
+    """Keep the latest participant of every (user, quiz) pair so the unique constraint can be added."""
+    Participant = apps.get_model('quiz', 'Participant')
+    LeaderboardEntry = apps.get_model('quiz', 'LeaderboardEntry')
+    UserStatistics = apps.get_model('quiz', 'UserStatistics')
+
+    duplicates = Participant.objects.values('user_id', 'quiz_id').annotate(
+        participants=Count('id'), latest_id=Max('id')).filter(participants__gt=1)
+
+    for duplicate in duplicates.iterator():
+        stale = Participant.objects.filter(user_id=duplicate['user_id'], quiz_id=duplicate['quiz_id']).exclude(
+            id=duplicate['latest_id'])
+        scopes = set(LeaderboardEntry.objects.filter(participant__in=stale).values_list('scope', 'scope_id'))
+        stale.delete()
+
+        # The rollup is rebuilt on the next read.
+        UserStatistics.objects.filter(user_id=duplicate['user_id']).delete()
+
+        for scope, scope_id in scopes:
+            entries = list(LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id).order_by('rank'))
+            for rank, entry in enumerate(entries, start=1):
+                entry.rank = rank
+            LeaderboardEntry.objects.bulk_update(entries, ['rank'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0005_userstatistics'),
+    ]
+
+    operations = [
+        # Separate from the constraint, PostgreSQL can't alter a table with pending deferred foreign key checks.
+        migrations.RunPython(remove_duplicate_participants, migrations.RunPython.noop),
+    ]
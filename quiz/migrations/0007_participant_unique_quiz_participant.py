@@ -0,0 +1,20 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0006_participant_unique_quiz_participant')]
+
+    dependencies = [
+        ('quiz', '0006_remove_duplicate_participants'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='participant',
+            constraint=models.UniqueConstraint(fields=('user', 'quiz'), name='unique_quiz_participant'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_attempts(apps, schema_editor):
+    """Record the current state of every participant as its first attempt."""
+    Participant = apps.get_model('quiz', 'Participant')
+    Attempt = apps.get_model('quiz', 'Attempt')
+
+    def create_attempts(participants):
+        attempts = Attempt.objects.bulk_create([
+            Attempt(participant_id=participant.id, user_id=participant.user_id, quiz_id=participant.quiz_id,
+                    started_at=participant.start_time, ends_at=participant.end_time,
+                    submitted_at=participant.end_time if participant.score is not None else None,
+                    score=participant.score, has_passed=participant.has_passed)
+            for participant in participants
+        ])
+        scored = []
+        for participant, attempt in zip(participants, attempts):
+            if participant.score is not None:
+                participant.best_attempt_id = attempt.id
+                scored.append(participant)
+        Participant.objects.bulk_update(scored, ['best_attempt'])
+
+    batch = []
+    for participant in Participant.objects.order_by('id').iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        batch.append(participant)
+        if len(batch) == BACKFILL_BATCH_SIZE:
+            create_attempts(batch)
+            batch = []
+    create_attempts(batch)
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0007_attempt')]
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('quiz', '0007_participant_unique_quiz_participant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('submitted_at', models.DateTimeField(blank=True, null=True)),
+                ('score', models.IntegerField(blank=True, null=True)),
+                ('has_passed', models.BooleanField(default=False)),
+                ('participant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempts', to='quiz.participant')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='quiz.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='participant',
+            name='best_attempt',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='quiz.attempt'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['user', 'quiz', 'started_at'], name='attempt_user_quiz_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attempt',
+            index=models.Index(fields=['user', 'submitted_at'], name='attempt_user_submitted_idx'),
+        ),
+        migrations.RunPython(backfill_attempts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:28
+
+from django.db import migrations, models
+
+import quiz.operations
+
+
+class Migration(migrations.Migration):
+    # Building the indexes concurrently keeps participants and feedback writable on PostgreSQL.
+    atomic = False
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0008_participant_feedback_indexes')]
+
+    dependencies = [
+        ('quiz', '0008_attempt'),
+    ]
+
+    operations = [
+        quiz.operations.AddIndexConcurrently(
+            model_name='feedback',
+            index=models.Index(fields=['quiz', '-id'], name='feedback_quiz_idx'),
+        ),
+        quiz.operations.AddIndexConcurrently(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('has_passed', True), ('score__isnull', False)), fields=['-score', 'end_time', 'id'], name='participant_leaderboard_idx'),
+        ),
+        quiz.operations.AddIndexConcurrently(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('has_passed', True), ('score__isnull', False)), fields=['quiz', '-score', 'end_time', 'id'], name='participant_quiz_board_idx'),
+        ),
+        quiz.operations.AddIndexConcurrently(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('score__isnull', False)), fields=['user', 'end_time'], name='participant_user_scored_idx'),
+        ),
+    ]
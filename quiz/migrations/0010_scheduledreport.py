@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0009_scheduledreport')]
+
+    dependencies = [
+        ('quiz', '0009_participant_feedback_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduledReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField(db_index=True)),
+                ('participant', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scheduled_report', to='quiz.participant')),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0010_outboxevent')]
+
+    dependencies = [
+        ('quiz', '0010_scheduledreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('topic', models.CharField(max_length=64)),
+                ('payload', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+
+
+def get_postgres_indexes():
+    # The vector must stay the expression of quiz.search.get_search_vector for the index to be used.
+    vector = (
+        SearchVector('title', weight='A', config='english') +
+        SearchVector('labels', weight='B', config='english') +
+        SearchVector('body', weight='C', config='english')
+    )
+    return [
+        GinIndex(vector, name='quiz_search_vector_idx'),
+        GinIndex(OpClass('title', name='gin_trgm_ops'), name='quiz_search_title_trgm_idx'),
+    ]
+
+
+def add_postgres_indexes(apps, schema_editor):
+    # Other databases search the inverted index instead.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    # Left installed on the way back, other trigram indexes may use it.
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    QuizSearchDocument = apps.get_model('quiz', 'QuizSearchDocument')
+    for index in get_postgres_indexes():
+        schema_editor.add_index(QuizSearchDocument, index)
+
+
+def remove_postgres_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    QuizSearchDocument = apps.get_model('quiz', 'QuizSearchDocument')
+    for index in get_postgres_indexes():
+        schema_editor.remove_index(QuizSearchDocument, index)
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0011_search_index')]
+
+    dependencies = [
+        ('quiz', '0011_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizSearchDocument',
+            fields=[
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='quiz.quiz')),
+                ('title', models.CharField(max_length=255)),
+                ('labels', models.TextField()),
+                ('body', models.TextField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='quiz.quiz')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'quiz', 'weight'], name='quiz_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(add_postgres_indexes, remove_postgres_indexes),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_quiz_counts(apps, schema_editor):
+    Quiz = apps.get_model('quiz', 'Quiz')
+    for model_name, field in (('Category', 'categories'), ('Tag', 'tags')):
+        model = apps.get_model('quiz', model_name)
+        through = getattr(Quiz, field).through
+        column = f'{model_name.lower()}_id'
+        counts = through.objects.filter(**{column: OuterRef('id')}).values(column).annotate(count=Count('id'))
+        model.objects.update(quiz_count=Coalesce(Subquery(counts.values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0012_quiz_counts')]
+
+    dependencies = [
+        ('quiz', '0012_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='quiz_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='quiz_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_quiz_counts, migrations.RunPython.noop),
+    ]
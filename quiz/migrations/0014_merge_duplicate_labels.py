@@ -0,0 +1,51 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:52
+
+from django.db import migrations
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Lower
+
+
+def merge_duplicate_labels(apps, schema_editor):
+    """
+    Merge the categories and tags whose names only differ by case into the oldest of them, so that the unique
+    constraints can be created. The leaderboards of merged labels are rebuilt by rebuild_leaderboards.
+    """
+    Quiz = apps.get_model('quiz', 'Quiz')
+    LeaderboardEntry = apps.get_model('quiz', 'LeaderboardEntry')
+    for model_name, field, scope in (('Category', 'categories', 'C'), ('Tag', 'tags', 'T')):
+        model = apps.get_model('quiz', model_name)
+        through = getattr(Quiz, field).through
+        column = f'{model_name.lower()}_id'
+
+        duplicated_names = model.objects.annotate(lower_name=Lower('name')).values('lower_name') \
+            .annotate(keeper_id=Min('id'), labels=Count('id')).filter(labels__gt=1)
+        for duplicate in duplicated_names:
+            duplicate_ids = list(model.objects.annotate(lower_name=Lower('name'))
+                                 .filter(lower_name=duplicate['lower_name'])
+                                 .exclude(id=duplicate['keeper_id']).values_list('id', flat=True))
+            linked_quiz_ids = through.objects.filter(**{column: duplicate['keeper_id']}).values('quiz_id')
+            quiz_ids = set(through.objects.filter(**{f'{column}__in': duplicate_ids})
+                           .exclude(quiz_id__in=linked_quiz_ids).values_list('quiz_id', flat=True))
+            through.objects.bulk_create([
+                through(quiz_id=quiz_id, **{column: duplicate['keeper_id']}) for quiz_id in quiz_ids
+            ])
+            LeaderboardEntry.objects.filter(scope=scope, scope_id__in=duplicate_ids).delete()
+            model.objects.filter(id__in=duplicate_ids).delete()
+
+        counts = through.objects.filter(**{column: OuterRef('id')}).values(column).annotate(count=Count('id'))
+        model.objects.update(quiz_count=Coalesce(Subquery(counts.values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0013_merge_duplicate_labels')]
+
+    dependencies = [
+        ('quiz', '0013_quiz_counts'),
+    ]
+
+    operations = [
+        # Separate from the constraints, PostgreSQL can't alter a table with pending deferred foreign key checks.
+        migrations.RunPython(merge_duplicate_labels, migrations.RunPython.noop),
+    ]
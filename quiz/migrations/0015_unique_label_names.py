@@ -0,0 +1,25 @@
+# Generated by Django 4.2.2 on 2026-10-17 06:52
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0014_unique_label_names')]
+
+    dependencies = [
+        ('quiz', '0014_merge_duplicate_labels'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_category_lower_name'),
+        ),
+        migrations.AddConstraint(
+            model_name='tag',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), name='unique_tag_lower_name'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0015_alter_answer_text')]
+
+    dependencies = [
+        ('quiz', '0015_unique_label_names'),
+    ]
+
+    operations = [
+        # Catches the migrations up with Answer.text, which the model already declared as a TextField.
+        migrations.AlterField(
+            model_name='answer',
+            name='text',
+            field=models.TextField(),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:31
+
+from django.db import migrations, models
+
+import quiz.operations
+
+
+class Migration(migrations.Migration):
+    # Leaderboards stay writable on PostgreSQL while the indexes are built and dropped.
+    atomic = False
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0016_leaderboard_order_indexes')]
+
+    dependencies = [
+        ('quiz', '0016_alter_answer_text'),
+    ]
+
+    operations = [
+        quiz.operations.AddIndexConcurrently(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['scope', 'scope_id', '-score', 'end_time', 'participant'], name='leaderboard_order_idx'),
+        ),
+        quiz.operations.AddIndexConcurrently(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['scope', 'scope_id', 'user', '-score', 'end_time', 'participant'], name='leaderboard_user_order_idx'),
+        ),
+        quiz.operations.RemoveIndexConcurrently(
+            model_name='leaderboardentry',
+            name='leaderboard_rank_idx',
+        ),
+        quiz.operations.RemoveIndexConcurrently(
+            model_name='leaderboardentry',
+            name='leaderboard_user_rank_idx',
+        ),
+    ]
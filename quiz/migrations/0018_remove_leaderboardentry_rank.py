@@ -0,0 +1,20 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0017_remove_leaderboardentry_rank')]
+
+    dependencies = [
+        ('quiz', '0017_leaderboard_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='leaderboardentry',
+            name='rank',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Renumbered, databases migrated before keep it as applied.
+    replaces = [('quiz', '0018_scheduledreport_attempts')]
+
+    dependencies = [
+        ('quiz', '0018_remove_leaderboardentry_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledreport',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
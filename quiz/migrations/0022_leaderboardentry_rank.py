@@ -0,0 +1,31 @@
+# Generated by Django 4.2.2 on 2026-10-17 07:49
+
+from django.db import migrations, models
+
+
+def backfill_ranks(apps, schema_editor):
+    # Every leaderboard in one statement, numbered like quiz.leaderboard renumbers a single one.
+    table = schema_editor.quote_name('quiz_leaderboardentry')
+    rank = schema_editor.quote_name('rank')
+    schema_editor.execute(
+        f'UPDATE {table} SET {rank} = ranked.position FROM ('
+        f'  SELECT id, ROW_NUMBER() OVER (PARTITION BY scope, scope_id ORDER BY score DESC, end_time, participant_id)'
+        f'  AS position FROM {table}'
+        f') AS ranked WHERE {table}.id = ranked.id'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0021_quiz_title_trgm_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='rank',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_ranks, migrations.RunPython.noop),
+    ]
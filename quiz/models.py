@@ -1,31 +1,52 @@
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils.translation import gettext_lazy as _
 from django.db import models
+from django.db.models.functions import Lower
 from account.models import UserProfile
 
 
-class Category(models.Model):
+class QuizLabel(models.Model):
     """
-    Represents a category for quizzes.
-    Use Case: Categorizing quizzes based on different topics or subjects.
+    Represents a name quizzes are labelled with, along with the number of quizzes carrying it.
+    Use Case: The common base of categories and tags, the quiz counts back the catalog facets.
     """
 
     name = models.CharField(max_length=255)
+    # Denormalized number of quizzes, kept current by the m2m signals (see quiz.facets).
+    quiz_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        abstract = True
+        constraints = [
+            # Names are unique regardless of case, the index also serves the case-insensitive name lookups.
+            models.UniqueConstraint(Lower('name'), name='unique_%(class)s_lower_name'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Never write back a possibly stale in-memory copy of the denormalized count.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'quiz_count'
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.name
 
 
-class Tag(models.Model):
+class Category(QuizLabel):
     """
-    Represents a tag for quizzes.
-    Use Case: Tagging quizzes with relevant keywords or labels for easier searching and organization.
+    Represents a category for quizzes.
+    Use Case: Categorizing quizzes based on different topics or subjects.
     """
 
-    name = models.CharField(max_length=255)
 
-    def __str__(self):
-        return self.name
+class Tag(QuizLabel):
+    """
+    Represents a tag for quizzes.
+    Use Case: Tagging quizzes with relevant keywords or labels for easier searching and organization.
+    """
 
 
 class Quiz(models.Model):
@@ -42,12 +63,21 @@ class Quiz(models.Model):
     tags = models.ManyToManyField(Tag)
     passing_marks_percentage = models.PositiveIntegerField(default=33,
                                                            validators=[MinValueValidator(1), MaxValueValidator(100)])
+    # Denormalized from the quiz questions, kept current by the question signals (see quiz.signals).
+    total_points = models.IntegerField(default=0, editable=False)
+    question_count = models.PositiveIntegerField(default=0, editable=False)
 
     def get_total_points(self):
-        total_points = 0
-        for question in self.questions.all():
-            total_points += question.points
-        return total_points
+        return self.total_points
+
+    def save(self, *args, **kwargs):
+        # Never write back a possibly stale in-memory copy of the denormalized totals.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('total_points', 'question_count')
+            ]
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.title
@@ -96,7 +126,7 @@ class Answer(models.Model):
 class Participant(models.Model):
     """
     Represents a participant who takes a quiz.
-    Use Case: Managing participants' involvement in quizzes, tracking start and end times, and recording scores.
+    Use Case: Managing participants' involvement in quizzes, with the times, score and result of their best attempt.
     """
 
     user = models.ForeignKey(UserProfile, on_delete=models.CASCADE)
@@ -105,11 +135,98 @@ class Participant(models.Model):
     end_time = models.DateTimeField()
     score = models.IntegerField(null=True, blank=True)
     has_passed = models.BooleanField(default=False)
+    best_attempt = models.ForeignKey('Attempt', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'quiz'], name='unique_quiz_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['-score', 'end_time', 'id'], name='participant_leaderboard_idx',
+                         condition=models.Q(has_passed=True, score__isnull=False)),
+            models.Index(fields=['quiz', '-score', 'end_time', 'id'], name='participant_quiz_board_idx',
+                         condition=models.Q(has_passed=True, score__isnull=False)),
+            models.Index(fields=['user', 'end_time'], name='participant_user_scored_idx',
+                         condition=models.Q(score__isnull=False)),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title}"
 
 
+class Attempt(models.Model):
+    """
+    Represents a single attempt of a participant at a quiz.
+    Use Case: Keeping the history of every start and submission, attempts are appended and never overwritten.
+    """
+
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='attempts')
+    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='+')
+    started_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    submitted_at = models.DateTimeField(null=True, blank=True)
+    score = models.IntegerField(null=True, blank=True)
+    has_passed = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'quiz', 'started_at'], name='attempt_user_quiz_started_idx'),
+            models.Index(fields=['user', 'submitted_at'], name='attempt_user_submitted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.quiz_id} at {self.started_at}"
+
+
+class ScheduledReport(models.Model):
+    """
+    Represents a pending report email for a participant.
+    Use Case: Queueing reports for delivery by the periodic report dispatcher instead of one beat schedule each.
+    """
+
+    participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='scheduled_report')
+    due_at = models.DateTimeField(db_index=True)
+    # Failed deliveries, each one pushes due_at further back.
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"Report for {self.participant_id} due at {self.due_at}"
+
+
+class OutboxEvent(models.Model):
+    """
+    Represents a side effect of a write that is still to be applied.
+    Use Case: Recording leaderboard, statistics and report updates in the same transaction as a quiz submission,
+    for the outbox relay to apply them off the request path.
+    """
+
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Failed relays of the event and the last error, the relay sets it aside once attempts reach OUTBOX_MAX_ATTEMPTS.
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
+
+
+class UserStatistics(models.Model):
+    """
+    Represents the rolled up quiz results of a user.
+    Use Case: Serving a user's pass/fail totals without scanning the user's whole participation history.
+    """
+
+    user = models.OneToOneField(UserProfile, on_delete=models.CASCADE, primary_key=True,
+                                related_name='quiz_statistics')
+    total_attempted = models.PositiveIntegerField(default=0)
+    total_passed = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_passed}/{self.total_attempted} passed"
+
+
 class Feedback(models.Model):
     """
     Represents feedback provided by a participant for a quiz.
@@ -121,5 +238,87 @@ class Feedback(models.Model):
     rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['quiz', '-id'], name='feedback_quiz_idx'),
+        ]
+
     def __str__(self):
         return f"Feedback for Quiz {self.quiz.title} by {self.participant.user.username}"
+
+
+class LeaderboardScope(models.TextChoices):
+    """
+    Represents the leaderboards that are kept precomputed.
+    Use Case: Telling apart the global leaderboard from the per quiz, per category and per tag ones.
+    """
+
+    GLOBAL = 'G', _('Global')
+    QUIZ = 'Q', _('Quiz')
+    CATEGORY = 'C', _('Category')
+    TAG = 'T', _('Tag')
+
+
+class LeaderboardEntry(models.Model):
+    """
+    Represents a passed participant on a precomputed leaderboard.
+    Use Case: Reading leaderboard pages and a user's own rank from an index in leaderboard order instead of sorting
+    every participant. Ranks are stored, and renumbered after the writes to a leaderboard (see quiz.leaderboard).
+    """
+
+    scope = models.CharField(max_length=1, choices=LeaderboardScope.choices)
+    scope_id = models.BigIntegerField(default=0)
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='leaderboard_entries')
+    user = models.ForeignKey(UserProfile, on_delete=models.CASCADE, related_name='+')
+    score = models.IntegerField()
+    end_time = models.DateTimeField()
+    rank = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'scope_id', 'participant'], name='unique_leaderboard_participant'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'scope_id', '-score', 'end_time', 'participant'],
+                         name='leaderboard_order_idx'),
+            models.Index(fields=['scope', 'scope_id', 'user', '-score', 'end_time', 'participant'],
+                         name='leaderboard_user_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_scope_display()} {self.scope_id} - {self.participant_id}: {self.score}"
+
+
+class QuizSearchDocument(models.Model):
+    """
+    Represents the searchable text of a quiz, with the names of its tags and categories denormalized.
+    Use Case: Full-text searching quizzes, through PostgreSQL full-text and trigram indexes (see quiz.search).
+    """
+
+    quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, primary_key=True, related_name='search_document')
+    title = models.CharField(max_length=255)
+    labels = models.TextField()
+    body = models.TextField()
+
+    def __str__(self):
+        return self.title
+
+
+class QuizSearchTerm(models.Model):
+    """
+    Represents a term of the inverted index of quizzes, with the weight of the quiz fields containing it.
+    Use Case: Searching and ranking quizzes by index lookups on databases without full-text search.
+    """
+
+    term = models.CharField(max_length=64)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name='search_terms')
+    weight = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            # Covers the search query, which never reads the table.
+            models.Index(fields=['term', 'quiz', 'weight'], name='quiz_search_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} - {self.quiz_id}"
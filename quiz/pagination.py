@@ -1,4 +1,109 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .leaderboard import LEADERBOARD_ORDERING
+from .models import LeaderboardEntry
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for page number paginations.
+    Requests carrying a `cursor` parameter (empty for the first page) get the rows following the cursor
+    position in `keyset_ordering`, which must end with a unique column. Such pages skip the COUNT query
+    and the OFFSET, and the response only has `next` and `results`.
+    Requests without it keep the page number behaviour and response.
+    """
+
+    cursor_query_param = 'cursor'
+    keyset_ordering = ('-id',)
+    is_keyset = False
+
+    def get_keyset_ordering(self, queryset):
+        return self.keyset_ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.is_keyset = self.cursor_query_param in request.query_params
+        if not self.is_keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_keyset_ordering(queryset)
+
+        position = self.decode_cursor(request, queryset.model, ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(ordering, position))
+
+        rows = list(queryset[:page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last_row = rows[-1]
+            self.next_position = [
+                last_row[field.lstrip('-')] if isinstance(last_row, dict) else getattr(last_row, field.lstrip('-'))
+                for field in ordering
+            ]
+        return rows
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        # (a, b, c) after (x, y, z) is: a > x, or a = x and b > y, or a = x and b = y and c > z.
+        condition = Q()
+        preceding_equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= preceding_equal & Q(**{f'{name}__{lookup}': value})
+            preceding_equal &= Q(**{name: value})
+        return condition
+
+    def decode_cursor(self, request, model, ordering):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            values = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            # Keyset columns are never null, and a null, list or object could not be compared to them.
+            if any(isinstance(value, bool) or not isinstance(value, (str, int, float)) for value in values):
+                raise ValueError
+            return [model._meta.get_field(field.lstrip('-')).to_python(value)
+                    for field, value in zip(ordering, values)]
+        except (binascii.Error, json.JSONDecodeError, ValueError, TypeError, ValidationError):
+            raise NotFound('Invalid cursor')
+
+    def encode_cursor(self, position):
+        values = [value.isoformat() if isinstance(value, datetime) else value for value in position]
+        return urlsafe_b64encode(json.dumps(values).encode('ascii')).decode('ascii')
+
+    def get_next_link(self):
+        if not self.is_keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_paginated_response(self, data):
+        if not self.is_keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
 
 
 class QuestionsSetPagination(PageNumberPagination):
@@ -7,23 +112,28 @@ class QuestionsSetPagination(PageNumberPagination):
     max_page_size = 20
 
 
-class QuizzesSetPagination(PageNumberPagination):
+class QuizzesSetPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'quizzes'
     max_page_size = 15
 
 
-class FeedbackSetPagination(PageNumberPagination):
+class FeedbackSetPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 7
     page_size_query_param = 'feedbacks'
     max_page_size = 15
 
 
-class LeaderboardPagination(PageNumberPagination):
+class LeaderboardPagination(KeysetPaginationMixin, PageNumberPagination):
     page_size = 15
     page_size_query_param = 'participants'
     max_page_size = 50
 
+    def get_keyset_ordering(self, queryset):
+        if queryset.model is LeaderboardEntry:
+            return LEADERBOARD_ORDERING
+        return ('-score', 'end_time', 'id')
+
 
 class GeneralPagination(PageNumberPagination):
     page_size = 15
@@ -0,0 +1,139 @@
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connection
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+
+from quiz.models import Quiz, QuizSearchDocument, QuizSearchTerm
+
+# Inverted index weights of the fields, in the order of the A, B and C weights of the PostgreSQL search vector.
+TITLE_WEIGHT = 4
+LABELS_WEIGHT = 2
+BODY_WEIGHT = 1
+
+SEARCH_CONFIG = 'english'
+MAX_QUERY_TERMS = 8
+MAX_TERM_LENGTH = 64
+INDEX_BATCH_SIZE = 500
+
+_TERM_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Split text into its distinct lowercase terms, in order."""
+    return list(dict.fromkeys(term[:MAX_TERM_LENGTH] for term in _TERM_RE.findall(text.lower())))
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def get_search_vector():
+    """
+    The weighted search vector of a QuizSearchDocument. The GIN index of migration 0012 is built on this exact
+    expression, so any change here needs a migration rebuilding the index.
+    """
+    return (
+        SearchVector('title', weight='A', config=SEARCH_CONFIG) +
+        SearchVector('labels', weight='B', config=SEARCH_CONFIG) +
+        SearchVector('body', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def _load_documents(quiz_ids):
+    labels = defaultdict(list)
+    for quiz_id, name in Quiz.tags.through.objects.filter(quiz_id__in=quiz_ids).values_list('quiz_id', 'tag__name'):
+        labels[quiz_id].append(name)
+    for quiz_id, name in Quiz.categories.through.objects.filter(quiz_id__in=quiz_ids) \
+            .values_list('quiz_id', 'category__name'):
+        labels[quiz_id].append(name)
+
+    quizzes = Quiz.objects.filter(id__in=quiz_ids).values_list('id', 'title', 'description')
+    return [
+        QuizSearchDocument(quiz_id=quiz_id, title=title, labels=' '.join(labels[quiz_id]), body=description)
+        for quiz_id, title, description in quizzes
+    ]
+
+
+def _document_terms(document):
+    weights = defaultdict(int)
+    for text, weight in ((document.title, TITLE_WEIGHT), (document.labels, LABELS_WEIGHT),
+                         (document.body, BODY_WEIGHT)):
+        for term in tokenize(text):
+            weights[term] += weight
+    return [QuizSearchTerm(term=term, quiz_id=document.quiz_id, weight=weight) for term, weight in weights.items()]
+
+
+def index_quizzes(quiz_ids):
+    """
+    Bring the search index of the given quizzes up to date with their title, description, tags and categories.
+    Deleted quizzes leave the index through the cascade.
+    """
+    quiz_ids = list(quiz_ids)
+    if not quiz_ids:
+        return
+
+    documents = _load_documents(quiz_ids)
+    QuizSearchDocument.objects.bulk_create(
+        documents, update_conflicts=True, unique_fields=['quiz'], update_fields=['title', 'labels', 'body'])
+
+    if not uses_postgres_search():
+        # PostgreSQL searches the documents themselves, other databases the inverted index.
+        QuizSearchTerm.objects.filter(quiz_id__in=quiz_ids).delete()
+        QuizSearchTerm.objects.bulk_create(
+            [term for document in documents for term in _document_terms(document)], batch_size=INDEX_BATCH_SIZE)
+
+
+def rebuild_search_index():
+    """Index every quiz, INDEX_BATCH_SIZE at a time. Return the number of quizzes indexed."""
+    indexed = 0
+    batch = []
+    for quiz_id in Quiz.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=INDEX_BATCH_SIZE):
+        batch.append(quiz_id)
+        if len(batch) == INDEX_BATCH_SIZE:
+            index_quizzes(batch)
+            indexed += len(batch)
+            batch = []
+    index_quizzes(batch)
+    return indexed + len(batch)
+
+
+def _postgres_matches(query):
+    search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type='websearch')
+    # Both conditions are served by a GIN index: full-text on the weighted vector, trigrams on the title for
+    # misspelled and partial words.
+    return QuizSearchDocument.objects.annotate(vector=get_search_vector()).filter(
+        Q(vector=search_query) | Q(title__trigram_similar=query)
+    ).annotate(rank=SearchRank(F('vector'), search_query) + TrigramSimilarity('title', query))
+
+
+def _postgres_search(queryset, query):
+    matches = _postgres_matches(query)
+    return queryset.filter(id__in=matches.values('quiz_id')).annotate(
+        search_rank=Subquery(matches.filter(quiz_id=OuterRef('id')).values('rank')[:1]),
+    )
+
+
+def _inverted_index_search(queryset, terms):
+    # Quizzes containing every term, ranked by the weights of the fields containing them. The term rows of the
+    # candidates are aggregated once, in the same query, through the (term, quiz, weight) index.
+    return queryset.filter(search_terms__term__in=terms).annotate(
+        search_rank=Sum('search_terms__weight'), matched_terms=Count('search_terms__term'),
+    ).filter(matched_terms=len(terms))
+
+
+def search_quizzes(queryset, query):
+    """
+    Filter a quiz queryset down to the quizzes matching a search query, most relevant first.
+    Uses PostgreSQL full-text and trigram search when available, the inverted index otherwise.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    if not terms:
+        return queryset
+
+    if uses_postgres_search():
+        queryset = _postgres_search(queryset, query)
+    else:
+        queryset = _inverted_index_search(queryset, terms)
+    return queryset.order_by('-search_rank', '-id')
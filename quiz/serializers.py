@@ -3,34 +3,58 @@ from datetime import timedelta
 from rest_framework import serializers
 from rest_framework.reverse import reverse
 
-from .models import Category, Tag, Quiz, Question, Answer, Participant, Feedback
+from .models import Category, Tag, Quiz, Question, Answer, Participant, Attempt, Feedback
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 
-from .tasks import schedule_report_generation
+from .tasks import record_submission
+from .cache import bump_cache_versions
+from .labels import ensure_labels
+from .utils import create_questions, get_answer_key, get_participant_outcome, select_best_attempt
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class LabelSerializer(serializers.ModelSerializer):
+    """
+    Creates and renames categories and tags. Duplicate names are caught by the unique lower(name) constraint,
+    which also holds against concurrent requests, rather than checked beforehand.
+    """
+    duplicate_name_message = 'Label with this name is already exist'
+
+    def save(self, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            raise serializers.ValidationError({'name': [self.duplicate_name_message]})
+
+
+class CategorySerializer(LabelSerializer):
+    duplicate_name_message = 'Category with this name is already exist'
+
     class Meta:
         model = Category
         fields = ('id', 'name')
 
-    def validate_name(self, value):
-        exists_already = Category.objects.filter(name__iexact=value).exists()
-        if exists_already:
-            raise serializers.ValidationError('Category with this name is already exist')
-        return value
 
+class TagSerializer(LabelSerializer):
+    duplicate_name_message = 'Tag with this name is already exist'
 
-class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ('id', 'name')
 
-    def validate_name(self, value):
-        exists_already = Tag.objects.filter(name__iexact=value).exists()
-        if exists_already:
-            raise serializers.ValidationError('Tag with this name is already exist')
-        return value
+
+class LabelNamesField(serializers.ListField):
+    """The names of the categories or tags of a quiz. Unknown names are created when the quiz is saved."""
+    child = serializers.CharField(max_length=255)
+
+    def to_internal_value(self, data):
+        if isinstance(data, list) and not all(isinstance(name, str) for name in data):
+            raise serializers.ValidationError('Expected a list of names.')
+        return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        return [label.name for label in value.all()]
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -63,10 +87,11 @@ class QuestionSerializer(serializers.ModelSerializer):
         if not quiz:
             raise serializers.ValidationError({'error': 'Invalid quiz ID'})
 
-        question = Question.objects.create(quiz_id=quiz_id, **validated_data)
-        if answers_data is not None:
-            for answer_data in answers_data:
-                Answer.objects.create(question=question, **answer_data)
+        with transaction.atomic():
+            question = Question.objects.create(quiz_id=quiz_id, **validated_data)
+            if answers_data:
+                Answer.objects.bulk_create([Answer(question=question, **answer_data) for answer_data in answers_data])
+                bump_cache_versions(f'quiz:{quiz_id}')
 
         return question
 
@@ -82,18 +107,8 @@ class QuestionSerializer(serializers.ModelSerializer):
 class QuizSerializer(serializers.ModelSerializer):
     questions = QuestionSerializer(many=True, required=False, write_only=True)
     questions_link = serializers.SerializerMethodField()
-    tags = serializers.SlugRelatedField(
-        many=True,
-        read_only=False,
-        slug_field='name',
-        queryset=Tag.objects.all()
-    )
-    categories = serializers.SlugRelatedField(
-        many=True,
-        read_only=False,
-        slug_field='name',
-        queryset=Category.objects.all()
-    )
+    tags = LabelNamesField()
+    categories = LabelNamesField()
 
     class Meta:
         model = Quiz
@@ -107,17 +122,13 @@ class QuizSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags')
         categories = validated_data.pop('categories')
 
-        quiz = Quiz.objects.create(**validated_data)
-        quiz.tags.set(tags)
-        quiz.categories.set(categories)
-
-        if questions_data is not None:
-            for question_data in questions_data:
-                answers_data = question_data.pop('answers')
-                question = Question.objects.create(quiz=quiz, **question_data)
+        with transaction.atomic():
+            quiz = Quiz.objects.create(**validated_data)
+            quiz.tags.set(ensure_labels(Tag, tags).values())
+            quiz.categories.set(ensure_labels(Category, categories).values())
 
-                for answer_data in answers_data:
-                    Answer.objects.create(question=question, **answer_data)
+            if questions_data:
+                create_questions(quiz.id, questions_data)
 
         return quiz
 
@@ -126,13 +137,13 @@ class QuizSerializer(serializers.ModelSerializer):
         instance.description = validated_data.get('description', instance.description)
         instance.time_limit = validated_data.get('time_limit', instance.time_limit)
 
-        tags_data = validated_data.get('tags', instance.tags)
-        instance.tags.set(tags_data)
+        with transaction.atomic():
+            if 'tags' in validated_data:
+                instance.tags.set(ensure_labels(Tag, validated_data['tags']).values())
+            if 'categories' in validated_data:
+                instance.categories.set(ensure_labels(Category, validated_data['categories']).values())
 
-        categories_data = validated_data.get('categories', instance.categories)
-        instance.categories.set(categories_data)
-
-        instance.save()
+            instance.save()
 
         return instance
 
@@ -154,20 +165,6 @@ class SubmitAnswerSerializer(serializers.Serializer):
     question_id = serializers.IntegerField()
     selected_answer = serializers.IntegerField()
 
-    def validate(self, data):
-        question_id = data.get('question_id')
-        selected_answer = data.get('selected_answer')
-
-        try:
-            question = Question.objects.get(id=question_id)
-            Answer.objects.get(id=selected_answer, question=question)
-        except Question.DoesNotExist:
-            raise serializers.ValidationError("Invalid question ID")
-        except Answer.DoesNotExist:
-            raise serializers.ValidationError("Invalid selected answer / answer is not belong to the given question")
-
-        return data
-
 
 class SubmitQuizSerializer(serializers.Serializer):
     quiz_id = serializers.IntegerField()
@@ -175,21 +172,23 @@ class SubmitQuizSerializer(serializers.Serializer):
     score = serializers.IntegerField(read_only=True)
 
     def calculate_score(self, quiz, answers):
+        answer_key = get_answer_key(quiz.id)
+
         score = 0
         for answer_data in answers:
-            serializer = SubmitAnswerSerializer(data=answer_data)
-            serializer.is_valid(raise_exception=True)
-
-            question_id = serializer.validated_data['question_id']
-            selected_answer = serializer.validated_data['selected_answer']
-            try:
-                question = Question.objects.get(id=question_id, quiz=quiz)
-            except Question.DoesNotExist:
+            question_id = answer_data['question_id']
+            selected_answer = answer_data['selected_answer']
+
+            if question_id not in answer_key:
                 raise serializers.ValidationError("question is not belong to the given Quiz")
 
-            correct_answers = Answer.objects.filter(question=question, is_correct=True)
-            if correct_answers.filter(id=selected_answer).exists():
-                score += question.points
+            points, correct_answers, all_answers = answer_key[question_id]
+            if selected_answer not in all_answers:
+                raise serializers.ValidationError(
+                    "Invalid selected answer / answer is not belong to the given question")
+
+            if selected_answer in correct_answers:
+                score += points
 
         return score
 
@@ -197,41 +196,60 @@ class SubmitQuizSerializer(serializers.Serializer):
         quiz_id = data.get('quiz_id')
         answers = data.get('answers')
 
+        question_ids = [answer_data['question_id'] for answer_data in answers]
+        if len(question_ids) != len(set(question_ids)):
+            raise serializers.ValidationError("A question can only be answered once")
+
         try:
             quiz = Quiz.objects.get(id=quiz_id)
-            participant = Participant.objects.get(user=self.context['request'].user, quiz=quiz)
-
-            tolerance_window = timedelta(seconds=30)
-            current_time = timezone.now()
-            if current_time > participant.end_time + tolerance_window:
-                raise serializers.ValidationError("Participant's time is over. Submission not allowed.")
-
         except Quiz.DoesNotExist:
             raise serializers.ValidationError("Invalid quiz ID")
-        except Participant.DoesNotExist:
+
+        attempt = Attempt.objects.filter(user=self.context['request'].user, quiz=quiz).order_by('-started_at').first()
+        if attempt is None:
             raise serializers.ValidationError("Participant not found")
 
+        tolerance_window = timedelta(seconds=30)
+        current_time = timezone.now()
+        if current_time > attempt.ends_at + tolerance_window:
+            raise serializers.ValidationError("Participant's time is over. Submission not allowed.")
+
         score = self.calculate_score(quiz, answers)
         data['score'] = score
+        data['quiz'] = quiz
+        data['attempt'] = attempt
 
         return data
 
     def save(self):
-        user = self.context['request'].user
-        quiz_id = self.validated_data['quiz_id']
         score = self.validated_data['score']
-        quiz = Quiz.objects.get(id=quiz_id)
+        quiz = self.validated_data['quiz']
 
-        participant = Participant.objects.get(user=user, quiz=quiz)
-        participant.score = score
+        attempt = self.validated_data['attempt']
+        attempt.score = score
+        attempt.submitted_at = timezone.now()
 
         if quiz.passing_marks_percentage > 0:
             passing_marks = quiz.get_total_points() * (quiz.passing_marks_percentage / 100)
-            participant.has_passed = score >= passing_marks
+            attempt.has_passed = score >= passing_marks
 
-        participant.save()
+        with transaction.atomic():
+            # Concurrent submissions of the same participant pick its best attempt one at a time.
+            participant = Participant.objects.select_for_update().get(pk=attempt.participant_id)
+            attempt.save(update_fields=['score', 'submitted_at', 'has_passed'])
+            previous_outcome = get_participant_outcome(participant)
 
-        schedule_report_generation(participant.id)
+            best_attempt = select_best_attempt(participant, attempt)
+            if best_attempt is not None:
+                participant.best_attempt = best_attempt
+                participant.start_time = best_attempt.started_at
+                participant.end_time = best_attempt.ends_at
+                participant.score = best_attempt.score
+                participant.has_passed = best_attempt.has_passed
+                participant.save()
+
+            # Leaderboards, statistics and the report are updated by the outbox relay.
+            record_submission(participant, previous_outcome, best_changed=best_attempt is not None)
 
 
 class FeedbackSerializer(serializers.ModelSerializer):
@@ -266,48 +284,36 @@ class FeedbackSerializer(serializers.ModelSerializer):
         return Feedback.objects.create(**validated_data)
 
 
-class ParticipantSerializer(serializers.ModelSerializer):
-    quiz = serializers.SerializerMethodField()
-    quiz_id = serializers.SerializerMethodField()
-    user = serializers.SerializerMethodField()
-
-    class Meta:
-        model = Participant
-        fields = ('quiz_id', 'quiz', 'user', 'score', 'start_time')
+class ParticipantSerializer(serializers.Serializer):
+    quiz_id = serializers.ReadOnlyField()
+    quiz = serializers.ReadOnlyField(source='quiz_title')
+    user = serializers.ReadOnlyField(source='username')
+    score = serializers.ReadOnlyField()
+    start_time = serializers.ReadOnlyField()
 
-    def get_quiz_id(self, obj):
-        return obj.quiz.id
 
-    def get_quiz(self, obj):
-        return obj.quiz.title
+class LeaderboardEntrySerializer(serializers.Serializer):
+    rank = serializers.ReadOnlyField()
+    quiz_id = serializers.ReadOnlyField()
+    quiz = serializers.ReadOnlyField(source='quiz_title')
+    user = serializers.ReadOnlyField(source='username')
+    score = serializers.ReadOnlyField()
+    start_time = serializers.ReadOnlyField()
 
-    def get_user(self, obj):
-        return obj.user.username
 
+class AttemptSerializer(serializers.Serializer):
+    id = serializers.ReadOnlyField()
+    started_at = serializers.ReadOnlyField()
+    ends_at = serializers.ReadOnlyField()
+    submitted_at = serializers.ReadOnlyField()
+    score = serializers.ReadOnlyField()
+    has_passed = serializers.ReadOnlyField()
 
-class UserQuizStatisticsSerializer(serializers.ModelSerializer):
-    quiz_id = serializers.ReadOnlyField(source='quiz.id')
-    quiz_title = serializers.ReadOnlyField(source='quiz.title')
-    quiz_total_marks = serializers.SerializerMethodField()
-    has_passed = serializers.SerializerMethodField()
-    date = serializers.SerializerMethodField()
 
-    class Meta:
-        model = Participant
-        fields = [
-            'quiz_id',
-            'quiz_title',
-            'quiz_total_marks',
-            'score',
-            'date',
-            'has_passed',
-        ]
-
-    def get_quiz_total_marks(self, participant):
-        return participant.quiz.get_total_points()
-
-    def get_has_passed(self, participant):
-        return participant.has_passed
-
-    def get_date(self, participant):
-        return participant.start_time
+class UserQuizStatisticsSerializer(serializers.Serializer):
+    quiz_id = serializers.ReadOnlyField()
+    quiz_title = serializers.ReadOnlyField()
+    quiz_total_marks = serializers.ReadOnlyField()
+    score = serializers.ReadOnlyField()
+    date = serializers.ReadOnlyField()
+    has_passed = serializers.ReadOnlyField()
@@ -0,0 +1,212 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from quiz.cache import bump_cache_versions
+from quiz.facets import adjust_quiz_counts
+from quiz.leaderboard import drop_leaderboard, rebuild_leaderboard, refresh_leaderboard_ranks_on_commit
+from quiz.search import index_quizzes
+from quiz.models import Category, Tag, Quiz, Question, Answer, Participant, Attempt, LeaderboardScope
+from quiz.tasks import discard_pending_submissions
+from quiz.utils import adjust_quiz_totals, update_user_statistics
+
+# Cache groups (see quiz.cache): 'categories' and 'tags' for their lists, 'quizzes' for the quiz list and
+# 'quiz:<id>' for everything cached about a single quiz (detail, questions, answer key).
+# The search index (see quiz.search) follows quiz titles and descriptions and the names of their tags and categories.
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def invalidate_quiz_cache(sender, instance, **kwargs):
+    bump_cache_versions('quizzes', f'quiz:{instance.id}')
+
+
+@receiver([post_save, post_delete], sender=Question)
+def invalidate_question_cache(sender, instance, **kwargs):
+    bump_cache_versions(f'quiz:{instance.quiz_id}')
+
+    previous = getattr(instance, '_previous_totals', None)
+    if previous is not None and previous[0] != instance.quiz_id:
+        bump_cache_versions(f'quiz:{previous[0]}')
+
+
+@receiver([post_save, post_delete], sender=Answer)
+def invalidate_answer_cache(sender, instance, **kwargs):
+    quiz_id = Question.objects.filter(id=instance.question_id).values_list('quiz_id', flat=True).first()
+    if quiz_id is not None:
+        bump_cache_versions(f'quiz:{quiz_id}')
+
+
+@receiver([post_save, pre_delete], sender=Category)
+@receiver([post_save, pre_delete], sender=Tag)
+def invalidate_category_tag_cache(sender, instance, **kwargs):
+    # Quizzes render their category and tag names.
+    group = 'categories' if sender is Category else 'tags'
+    quiz_ids = instance.quiz_set.values_list('id', flat=True)
+    bump_cache_versions(group, 'quizzes', *(f'quiz:{quiz_id}' for quiz_id in quiz_ids))
+
+
+@receiver(m2m_changed, sender=Quiz.categories.through)
+@receiver(m2m_changed, sender=Quiz.tags.through)
+def quiz_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        instance._cleared_quiz_ids = set(instance.quiz_set.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        quiz_ids = {instance.id}
+    elif action == 'post_clear':
+        quiz_ids = getattr(instance, '_cleared_quiz_ids', set())
+    else:
+        quiz_ids = pk_set
+    bump_cache_versions('quizzes', *(f'quiz:{quiz_id}' for quiz_id in quiz_ids))
+    index_quizzes(quiz_ids)
+
+
+@receiver(post_save, sender=Quiz)
+def index_saved_quiz(sender, instance, **kwargs):
+    index_quizzes([instance.id])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Tag)
+def index_renamed_label_quizzes(sender, instance, created, **kwargs):
+    if not created:
+        index_quizzes(instance.quiz_set.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Tag)
+def remember_label_quizzes(sender, instance, **kwargs):
+    instance._indexed_quiz_ids = list(instance.quiz_set.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def index_deleted_label_quizzes(sender, instance, **kwargs):
+    index_quizzes(getattr(instance, '_indexed_quiz_ids', []))
+
+
+@receiver(m2m_changed, sender=Quiz.categories.through)
+@receiver(m2m_changed, sender=Quiz.tags.through)
+def update_label_quiz_counts(sender, instance, action, reverse, pk_set, **kwargs):
+    model = Category if sender is Quiz.categories.through else Tag
+    label_column = 'category_id' if model is Category else 'tag_id'
+
+    if action in ('pre_remove', 'pre_clear'):
+        # Only the links that exist are removed, collect the label of each one.
+        links = sender.objects.filter(**{label_column if reverse else 'quiz_id': instance.id})
+        if action == 'pre_remove':
+            links = links.filter(**{f"{'quiz_id' if reverse else label_column}__in": pk_set})
+        instance._removed_label_ids = list(links.values_list(label_column, flat=True))
+    elif action == 'post_add':
+        # The added pks exclude the links that already existed.
+        adjust_quiz_counts(model, [instance.id] * len(pk_set) if reverse else pk_set, 1)
+    elif action in ('post_remove', 'post_clear'):
+        adjust_quiz_counts(model, getattr(instance, '_removed_label_ids', []), -1)
+
+
+@receiver(pre_delete, sender=Quiz)
+def update_deleted_quiz_label_counts(sender, instance, **kwargs):
+    # The cascade deletes the m2m links without m2m_changed.
+    adjust_quiz_counts(Category, instance.categories.values_list('id', flat=True), -1)
+    adjust_quiz_counts(Tag, instance.tags.values_list('id', flat=True), -1)
+
+
+@receiver(pre_save, sender=Question)
+def remember_question_totals(sender, instance, **kwargs):
+    instance._previous_totals = None
+    if instance.pk is not None:
+        instance._previous_totals = Question.objects.filter(pk=instance.pk).values_list('quiz_id', 'points').first()
+
+
+@receiver(post_save, sender=Question)
+def update_quiz_totals_on_save(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_totals', None)
+    if created or previous is None:
+        adjust_quiz_totals(instance.quiz_id, points=instance.points, questions=1)
+        return
+
+    previous_quiz_id, previous_points = previous
+    if previous_quiz_id != instance.quiz_id:
+        adjust_quiz_totals(previous_quiz_id, points=-previous_points, questions=-1)
+        adjust_quiz_totals(instance.quiz_id, points=instance.points, questions=1)
+    elif previous_points != instance.points:
+        adjust_quiz_totals(instance.quiz_id, points=instance.points - previous_points)
+
+
+@receiver(post_delete, sender=Question)
+def update_quiz_totals_on_delete(sender, instance, **kwargs):
+    adjust_quiz_totals(instance.quiz_id, points=-instance.points, questions=-1)
+
+
+@receiver(post_save, sender=Participant)
+def create_first_attempt(sender, instance, created, **kwargs):
+    if not created:
+        return
+
+    scored = instance.score is not None
+    attempt = Attempt.objects.create(
+        participant=instance,
+        user_id=instance.user_id,
+        quiz_id=instance.quiz_id,
+        started_at=instance.start_time,
+        ends_at=instance.end_time,
+        submitted_at=instance.end_time if scored else None,
+        score=instance.score,
+        has_passed=instance.has_passed,
+    )
+    if scored:
+        instance.best_attempt = attempt
+        Participant.objects.filter(pk=instance.pk).update(best_attempt=attempt)
+
+
+@receiver(pre_delete, sender=Participant)
+def renumber_participant_leaderboards(sender, instance, **kwargs):
+    # The entries go with the cascade, the ranks below them are closed up once the deletion commits.
+    refresh_leaderboard_ranks_on_commit(instance.leaderboard_entries.values_list('scope', 'scope_id'))
+
+
+@receiver(post_delete, sender=Participant)
+def remove_participant_from_user_statistics(sender, instance, **kwargs):
+    update_user_statistics(instance.user_id, discard_pending_submissions(instance), None)
+
+
+def _rebuild_m2m_leaderboards(scope, instance, action, reverse, pk_set):
+    if action == 'pre_clear' and not reverse:
+        related = instance.categories if scope == LeaderboardScope.CATEGORY else instance.tags
+        instance._cleared_leaderboard_ids = set(related.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if reverse:
+        quiz_ids = pk_set
+        scope_ids = {instance.id}
+    else:
+        quiz_ids = {instance.id}
+        scope_ids = getattr(instance, '_cleared_leaderboard_ids', set()) if action == 'post_clear' else pk_set
+
+    # Quizzes nobody has passed yet don't change any leaderboard, which is the common case when authoring.
+    if quiz_ids is not None and not Participant.objects.filter(quiz_id__in=quiz_ids, has_passed=True).exists():
+        return
+
+    for scope_id in sorted(scope_ids or ()):
+        rebuild_leaderboard(scope, scope_id)
+
+
+@receiver(m2m_changed, sender=Quiz.categories.through)
+def rebuild_category_leaderboards(sender, instance, action, reverse, pk_set, **kwargs):
+    _rebuild_m2m_leaderboards(LeaderboardScope.CATEGORY, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Quiz.tags.through)
+def rebuild_tag_leaderboards(sender, instance, action, reverse, pk_set, **kwargs):
+    _rebuild_m2m_leaderboards(LeaderboardScope.TAG, instance, action, reverse, pk_set)
+
+
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def drop_label_leaderboard(sender, instance, **kwargs):
+    # Deleting the label deletes its quiz links without m2m_changed, so its leaderboard is dropped here.
+    drop_leaderboard(LeaderboardScope.CATEGORY if sender is Category else LeaderboardScope.TAG, instance.id)
@@ -4,6 +4,15 @@ from drf_yasg.utils import swagger_auto_schema
 from quiz.serializers import UserQuizStatisticsSerializer
 
 
+def cursor_parameter():
+    return openapi.Parameter(
+        name='cursor',
+        in_=openapi.IN_QUERY,
+        description='Use keyset pagination: empty for the first page, then the cursor of the `next` link',
+        type=openapi.TYPE_STRING
+    )
+
+
 def category_list_swagger_schema():
     return swagger_auto_schema(
         operation_description="Get list of all categories",
@@ -73,6 +82,7 @@ def tag_delete_swagger_schema():
 def quiz_list_swagger_schema():
     return swagger_auto_schema(
         operation_description="Get list of all quizzes",
+        manual_parameters=[cursor_parameter()]
     )
 
 
@@ -183,7 +193,7 @@ def submit_quiz_swagger_schema():
 
 def question_list_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Get a list of questions",
+        operation_description="Get a list of questions. Only staff users get the correct answers",
         manual_parameters=[
             openapi.Parameter(
                 name='id',
@@ -211,7 +221,7 @@ def question_create_swagger_schema():
 
 def question_retrieve_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Retrieve a question",
+        operation_description="Retrieve a question. Only staff users get the correct answers",
     )
 
 
@@ -232,7 +242,7 @@ def question_delete_swagger_schema():
 
 def answer_list_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Get a list of answers",
+        operation_description="Get a list of answers. Only staff users get is_correct",
         manual_parameters=[
             openapi.Parameter(
                 name='id',
@@ -260,7 +270,7 @@ def answer_create_swagger_schema():
 
 def answer_retrieve_swagger_schema():
     return swagger_auto_schema(
-        operation_description="Retrieve a answer",
+        operation_description="Retrieve a answer. Only staff users get is_correct",
     )
 
 
@@ -289,6 +299,7 @@ def feedback_list_swagger_schema():
                 description='ID of the Quiz , to get all its feedbacks',
                 type=openapi.TYPE_INTEGER
             ),
+            cursor_parameter(),
         ]
     )
 
@@ -333,3 +344,93 @@ def quiz_statistics_swagger_schema():
         operation_description="Get statistics of a User",
 
     )
+
+
+def attempt_list_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Get the attempts of the authenticated user at a quiz, latest first",
+    )
+
+
+def leaderboard_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Get the leaderboard of passed participants",
+        manual_parameters=[cursor_parameter()]
+    )
+
+
+def quiz_export_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Download quizzes with their questions and answers as JSON Lines, one quiz per line",
+        manual_parameters=[
+            openapi.Parameter(name=name, in_=openapi.IN_QUERY, type=openapi.TYPE_STRING)
+            for name in ('categories', 'tags', 'match', 'search', 'title', 'time_limit')
+        ],
+        responses={
+            200: "JSON Lines",
+        }
+    )
+
+
+def quiz_facets_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Number of quizzes in each category and with each tag, among the quizzes matching "
+                              "the filters",
+        manual_parameters=[
+            openapi.Parameter(name=name, in_=openapi.IN_QUERY, type=openapi.TYPE_STRING)
+            for name in ('categories', 'tags', 'match', 'search', 'title', 'time_limit')
+        ],
+        responses={
+            200: openapi.Response(
+                description="Facet counts",
+                examples={
+                    'application/json': {
+                        'categories': [{'id': 1, 'name': 'Science', 'count': 12}],
+                        'tags': [{'id': 3, 'name': 'Easy', 'count': 7}],
+                    },
+                }
+            ),
+        }
+    )
+
+
+def quiz_import_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Import quizzes from a JSON Lines body, one quiz per line, in the export format",
+        responses={
+            201: "Number of imported quizzes and questions",
+            400: "First invalid line and its errors",
+        }
+    )
+
+
+def quiz_exam_swagger_schema():
+    return swagger_auto_schema(
+        operation_description="Get a quiz with all of its questions and answers, without the correct answers, to "
+                              "take it. Send the ETag of a previous response in If-None-Match to get a 304 while "
+                              "the quiz is unchanged",
+        responses={
+            200: openapi.Response(
+                description="The quiz to take",
+                examples={
+                    'application/json': {
+                        'id': 1, 'title': 'Science', 'description': 'Basics', 'time_limit': 30,
+                        'passing_marks_percentage': 33, 'total_points': 2, 'question_count': 1,
+                        'questions': [
+                            {'id': 4, 'text': 'Which planet is the largest?', 'type': 'MC', 'points': 2,
+                             'answers': [{'id': 9, 'text': 'Jupiter'}, {'id': 10, 'text': 'Mars'}]},
+                        ],
+                    },
+                }
+            ),
+            304: "The quiz is unchanged since the ETag sent in If-None-Match",
+            404: openapi.Response(
+                description="Invalid quiz ID",
+                examples={
+                    'application/json': {
+                        'error': 'Invalid quiz ID',
+                    },
+                }
+            ),
+        }
+    )
@@ -1,13 +1,24 @@
-import json
-import uuid
-
 from celery import shared_task
 from django_celery_beat.models import PeriodicTask, ClockedSchedule
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
 from datetime import timedelta
 
-from quiz.models import Participant
-from quiz.utils import generate_participant_report, send_participant_report_email
+from quiz.leaderboard import batched_rank_refreshes, record_leaderboard_score
+from quiz.models import Participant, ScheduledReport, OutboxEvent
+from quiz.utils import (
+    SUBMISSION_TOPIC, generate_participant_report, generate_participant_reports, get_participant_outcome,
+    send_participant_report_email, send_participant_report_emails, update_user_statistics
+)
+
+REPORT_DELAY = timedelta(hours=2)
+REPORT_BATCH_SIZE = 500
+REPORT_RETRY_DELAY = timedelta(minutes=10)
+REPORT_MAX_ATTEMPTS = 5
+REPORT_CLAIM_TIMEOUT = timedelta(minutes=15)
+OUTBOX_BATCH_SIZE = 500
+OUTBOX_MAX_ATTEMPTS = 5
 
 
 @shared_task(bind=True)
@@ -26,16 +37,155 @@ def send_participant_report(self, **kwargs):
 
 
 def schedule_report_generation(participant_id):
-    current_datetime = timezone.now()
-    execution_time = current_datetime + timedelta(hours=2)
-    schedule, created = ClockedSchedule.objects.get_or_create(clocked_time=execution_time)
-
-    unique_task_id = uuid.uuid4()
-    PeriodicTask.objects.create(
-        clocked=schedule,
-        name='send report to participant id ' + str(participant_id) + ' at - ' + str(schedule) + " #" + str(
-            unique_task_id),
-        task='quiz.tasks.send_participant_report',
-        kwargs=json.dumps({'participant_id': participant_id}),
-        one_off=True
+    """
+    Queue the report of a participant for delivery by dispatch_due_reports.
+    A participant has at most one pending report, a new submission moves it to REPORT_DELAY from now.
+    """
+    ScheduledReport.objects.bulk_create(
+        [ScheduledReport(participant_id=participant_id, due_at=timezone.now() + REPORT_DELAY)],
+        update_conflicts=True,
+        unique_fields=['participant'],
+        update_fields=['due_at'],
     )
+
+
+@shared_task
+def dispatch_due_reports():
+    """
+    Send every report that is due, REPORT_BATCH_SIZE at a time. Runs periodically from beat.
+    Each batch is generated with a few set-based queries and sent over one mail server connection. Sent reports are
+    deleted, the others are retried later with an exponential backoff and dropped after REPORT_MAX_ATTEMPTS.
+    """
+    sent = 0
+    while True:
+        with transaction.atomic():
+            # Concurrent dispatchers skip the batches claimed by each other. The claimed reports are leased until
+            # claimed_until and committed before anything is sent, a dispatcher that dies leaves them due again then.
+            due_reports = list(
+                ScheduledReport.objects.select_for_update(skip_locked=True).filter(due_at__lte=timezone.now())
+                .select_related('participant__user', 'participant__quiz').order_by('due_at')[:REPORT_BATCH_SIZE]
+            )
+            if not due_reports:
+                return sent
+            claimed_until = timezone.now() + REPORT_CLAIM_TIMEOUT
+            ScheduledReport.objects.filter(id__in=[report.id for report in due_reports]).update(due_at=claimed_until)
+
+        participants = [scheduled_report.participant for scheduled_report in due_reports]
+        reports = generate_participant_reports(participants)
+        delivered = send_participant_report_emails(
+            [(reports[participant.id], participant.user.email) for participant in participants])
+
+        # A submission meanwhile moved its report to a new due_at, that report is kept as it is.
+        claimed = ScheduledReport.objects.filter(due_at=claimed_until)
+        failed = [report for report, is_sent in zip(due_reports, delivered) if not is_sent]
+        retried = [report for report in failed if report.attempts + 1 < REPORT_MAX_ATTEMPTS]
+        for attempts in {report.attempts for report in retried}:
+            claimed.filter(id__in=[report.id for report in retried if report.attempts == attempts]).update(
+                due_at=timezone.now() + REPORT_RETRY_DELAY * 2 ** attempts, attempts=attempts + 1)
+
+        retried_ids = {report.id for report in retried}
+        claimed.filter(id__in=[report.id for report in due_reports if report.id not in retried_ids]).delete()
+        sent += len(due_reports) - len(failed)
+
+
+@shared_task
+def delete_fired_schedules():
+    """
+    Delete the one-off beat schedules that have already run, along with their clocked schedules, so the
+    DatabaseScheduler does not keep re-reading them. Beat disables one-off schedules once they have run.
+    """
+    now = timezone.now()
+    # Saving a disabled task clears its last_run_at, which beat does once a one-off task has run, so a task only
+    # counts as run when its clocked time has passed too. One disabled by hand before its time is kept.
+    deleted, _ = PeriodicTask.objects.filter(
+        Q(last_run_at__isnull=False) | Q(clocked__clocked_time__lt=now), one_off=True, enabled=False,
+    ).delete()
+    # Clocked schedules still ahead may be about to get their task.
+    ClockedSchedule.objects.filter(periodictask__isnull=True, clocked_time__lt=now).delete()
+    return deleted
+
+
+def record_submission(participant, previous_outcome, best_changed):
+    """
+    Record the side effects of a quiz submission in the outbox, to be applied by relay_outbox.
+    Must run in the transaction that saves the submission, so the effects are recorded if and only if it commits.
+    """
+    OutboxEvent.objects.create(topic=SUBMISSION_TOPIC, payload={
+        'participant_id': participant.id,
+        'user_id': participant.user_id,
+        'before': previous_outcome,
+        'after': get_participant_outcome(participant),
+        'best_changed': best_changed,
+    })
+
+
+def apply_submission(payload):
+    participant = Participant.objects.filter(id=payload['participant_id']).first()
+    if participant is None:
+        # Deleting the participant discarded its pending submissions, this one was claimed meanwhile.
+        return
+
+    update_user_statistics(payload['user_id'], payload['before'], payload['after'])
+    if payload['best_changed']:
+        record_leaderboard_score(participant)
+    schedule_report_generation(participant.id)
+
+
+def discard_pending_submissions(participant):
+    """
+    Drop the outbox events of a participant that is being deleted.
+    Return its outcome as the statistics rollup knows it, which predates the pending submissions.
+    """
+    pending = OutboxEvent.objects.filter(topic=SUBMISSION_TOPIC, payload__participant_id=participant.id)
+    first = pending.order_by('id').values_list('payload', flat=True).first()
+    if first is None:
+        return get_participant_outcome(participant)
+
+    pending.delete()
+    return first['before']
+
+
+OUTBOX_HANDLERS = {
+    SUBMISSION_TOPIC: apply_submission,
+}
+
+
+@shared_task
+def relay_outbox():
+    """
+    Apply the recorded outbox events in order, OUTBOX_BATCH_SIZE at a time. Runs periodically from beat.
+    Events are deleted in the transaction that applies them, so each one is applied exactly once. Each event is
+    applied in its own savepoint: a failing one is rolled back alone, counted and retried on the next runs, then set
+    aside after OUTBOX_MAX_ATTEMPTS with its last error, while the others keep being relayed.
+    """
+    relayed = 0
+    failed_ids = set()
+    while True:
+        with transaction.atomic():
+            events = list(
+                OutboxEvent.objects.select_for_update(skip_locked=True).filter(attempts__lt=OUTBOX_MAX_ATTEMPTS)
+                .exclude(id__in=failed_ids).order_by('id')[:OUTBOX_BATCH_SIZE]
+            )
+            if not events:
+                return relayed
+
+            applied_ids = []
+            failed = []
+            # The leaderboards scored on by the batch are renumbered once, at its end.
+            with batched_rank_refreshes():
+                for event in events:
+                    try:
+                        with transaction.atomic():
+                            OUTBOX_HANDLERS[event.topic](event.payload)
+                    except Exception as error:
+                        # Any error of a handler, unknown topics included, must not hold back the other events.
+                        event.attempts += 1
+                        event.last_error = repr(error)
+                        failed.append(event)
+                    else:
+                        applied_ids.append(event.id)
+
+            OutboxEvent.objects.filter(id__in=applied_ids).delete()
+            OutboxEvent.objects.bulk_update(failed, ['attempts', 'last_error'])
+            failed_ids.update(event.id for event in failed)
+            relayed += len(applied_ids)
@@ -1,7 +1,34 @@
+import json
+import os
+import tempfile
+import threading
+from base64 import urlsafe_b64encode
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from unittest.mock import patch
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django_celery_beat.models import ClockedSchedule, PeriodicTask
 from rest_framework import status
-from rest_framework.test import APITestCase
-from .models import Category, Tag, Quiz, Question, Answer, Participant, Feedback
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from .filters import ParticipantFilter, QuizFilter
+from .labels import ensure_labels, get_label_id_map
+from .leaderboard import LEADERBOARD_ORDERING, record_leaderboard_score
+from .tasks import OUTBOX_MAX_ATTEMPTS, REPORT_MAX_ATTEMPTS, delete_fired_schedules, dispatch_due_reports, relay_outbox
+from .transfer import import_quizzes
+from .cache import get_cache_version
+from .utils import build_answer_key, get_answer_key, get_user_statistics
+from .models import (
+    Category, Tag, Quiz, Question, Answer, Participant, Feedback, LeaderboardEntry, LeaderboardScope, UserStatistics,
+    ScheduledReport, OutboxEvent, QuizSearchDocument, QuizSearchTerm
+)
 from .serializers import (
     CategorySerializer, TagSerializer, QuizSerializer
 )
@@ -12,6 +39,7 @@ from datetime import timedelta
 
 class CategoryListCreateViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = UserProfile.objects.create(username='admin', is_staff=True)
         self.client.force_authenticate(user=self.user)
 
@@ -65,6 +93,7 @@ class CategoryRetrieveUpdateDeleteViewTest(APITestCase):
 
 class TagListCreateViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = UserProfile.objects.create(username='admin', is_staff=True)
         self.client.force_authenticate(user=self.user)
 
@@ -118,6 +147,7 @@ class TagRetrieveUpdateDeleteViewTest(APITestCase):
 
 class QuizListCreateViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.url = reverse('quiz:quiz-list-create')
         self.user = UserProfile.objects.create(username='admin', is_staff=True)
         self.client.force_authenticate(user=self.user)
@@ -187,8 +217,60 @@ class QuizListCreateViewTest(APITestCase):
         self.assertEqual(response.data, serializer_data)
 
 
+    def test_create_quiz_with_many_questions(self):
+        def create(num_questions):
+            data = {
+                'title': 'Bulk Quiz',
+                'description': 'Bulk Description',
+                'time_limit': 30,
+                'tags': [self.tag.name],
+                'categories': [self.category.name],
+                'questions': [
+                    {
+                        'text': f'Question {index}',
+                        'type': 'MC',
+                        'points': index + 1,
+                        'answers': [
+                            {'text': f'Answer {index}.{answer}', 'is_correct': answer == index % 3}
+                            for answer in range(3)
+                        ]
+                    }
+                    for index in range(num_questions)
+                ]
+            }
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            return Quiz.objects.get(id=response.data['id']), len(context.captured_queries)
+
+        quiz, few_queries = create(2)
+        quiz, many_queries = create(12)
+        self.assertEqual(few_queries, many_queries)
+
+        self.assertEqual((quiz.total_points, quiz.question_count), (78, 12))
+        for question in quiz.questions.all():
+            index = int(question.text.split()[1])
+            self.assertEqual(question.points, index + 1)
+            answers = question.answers.order_by('id')
+            self.assertEqual([answer.text for answer in answers], [f'Answer {index}.{answer}' for answer in range(3)])
+            self.assertEqual([answer.is_correct for answer in answers], [answer == index % 3 for answer in range(3)])
+
+    def test_list_quizzes_with_cursor(self):
+        quizzes = [Quiz.objects.create(title=f'Quiz {index}', created_by=self.user, time_limit=30)
+                   for index in range(12)]
+
+        response = self.client.get(self.url, {'cursor': ''})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([quiz['id'] for quiz in response.data['results']], [quiz.id for quiz in quizzes[:1:-1]])
+
+        response = self.client.get(response.data['next'])
+        self.assertEqual([quiz['id'] for quiz in response.data['results']], [quizzes[1].id, quizzes[0].id])
+        self.assertIsNone(response.data['next'])
+
+
 class QuizRetrieveUpdateDeleteViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = UserProfile.objects.create(username='admin', is_staff=True)
         self.client.force_authenticate(user=self.user)
 
@@ -310,6 +392,113 @@ class StartQuizViewTest(APITestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_restart_quiz_keeps_best_attempt(self):
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+        answer = Answer.objects.create(question=question, text='Answer', is_correct=True)
+        submit_url = reverse('quiz:submit-quiz')
+        correct = {'quiz_id': self.quiz.id, 'answers': [{'question_id': question.id, 'selected_answer': answer.id}]}
+
+        self.client.post(self.url, {'quiz_id': self.quiz.id})
+        self.client.post(submit_url, correct, format='json')
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(participant.score, 1)
+
+        response = self.client.post(self.url, {'quiz_id': self.quiz.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client.post(submit_url, {'quiz_id': self.quiz.id, 'answers': []}, format='json')
+        relay_outbox()
+
+        restarted = Participant.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(restarted.id, participant.id)
+        self.assertEqual((restarted.score, restarted.best_attempt_id), (1, participant.best_attempt_id))
+        self.assertEqual(get_user_statistics(self.user.id).total_passed, 1)
+        self.assertEqual(LeaderboardEntry.objects.get(participant=participant, scope=LeaderboardScope.GLOBAL).score, 1)
+
+        response = self.client.get(reverse('quiz:attempt-list', args=[self.quiz.id]))
+        self.assertEqual([attempt['score'] for attempt in response.data['results']], [0, 1])
+
+    def test_better_attempt_becomes_best(self):
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+        answer = Answer.objects.create(question=question, text='Answer', is_correct=True)
+        submit_url = reverse('quiz:submit-quiz')
+
+        self.client.post(self.url, {'quiz_id': self.quiz.id})
+        self.client.post(submit_url, {'quiz_id': self.quiz.id, 'answers': []}, format='json')
+        relay_outbox()
+        self.assertFalse(LeaderboardEntry.objects.exists())
+
+        self.client.post(self.url, {'quiz_id': self.quiz.id})
+        self.client.post(submit_url, {
+            'quiz_id': self.quiz.id, 'answers': [{'question_id': question.id, 'selected_answer': answer.id}]
+        }, format='json')
+        relay_outbox()
+
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        latest = participant.attempts.order_by('-started_at', '-id').first()
+        self.assertEqual(participant.best_attempt_id, latest.id)
+        self.assertTrue(participant.has_passed)
+        self.assertEqual(participant.attempts.count(), 2)
+        self.assertTrue(LeaderboardEntry.objects.filter(participant=participant).exists())
+
+    def test_participant_is_unique_per_quiz(self):
+        self.client.post(self.url, {'quiz_id': self.quiz.id})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Participant.objects.create(user=self.user, quiz=self.quiz, start_time=timezone.now(),
+                                       end_time=timezone.now())
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class StartQuizConcurrencyTest(APITransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='user', email='user@example.com')
+        self.quiz = Quiz.objects.create(title='Quiz', time_limit=30, created_by=self.user)
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+        self.answer = Answer.objects.create(question=question, text='Answer', is_correct=True)
+
+    def run_in_parallel(self, requests):
+        barrier = threading.Barrier(len(requests))
+        responses = []
+
+        def send(url, data):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            try:
+                barrier.wait()
+                responses.append(client.post(url, data, format='json'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send, args=request) for request in requests]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(responses), len(requests))
+        return responses
+
+    def test_parallel_starts_and_submits(self):
+        start = (reverse('quiz:start-quiz'), {'quiz_id': self.quiz.id})
+        submit = (reverse('quiz:submit-quiz'), {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': self.answer.question_id, 'selected_answer': self.answer.id}],
+        })
+        get_user_statistics(self.user.id)
+
+        for requests in ([start] * 4, [start, submit] * 4):
+            for response in self.run_in_parallel(requests):
+                self.assertIn(response.status_code, (status.HTTP_200_OK, status.HTTP_400_BAD_REQUEST))
+            self.assertEqual(Participant.objects.filter(user=self.user, quiz=self.quiz).count(), 1)
+        relay_outbox()
+
+        participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+        attempted = participant.score is not None
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual(statistics.total_attempted, int(attempted))
+        self.assertEqual(statistics.total_passed, int(attempted and participant.has_passed))
+        self.assertEqual(LeaderboardEntry.objects.filter(scope=LeaderboardScope.GLOBAL).count(), int(attempted))
+
 
 class SubmitQuizViewTest(APITestCase):
     def setUp(self):
@@ -354,7 +543,6 @@ class SubmitQuizViewTest(APITestCase):
         }
 
         response = self.client.post(self.url, data, format='json')
-        print(response.data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         self.participant.refresh_from_db()
@@ -367,9 +555,81 @@ class SubmitQuizViewTest(APITestCase):
         response = self.client.post(self.url, data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_submit_quiz_answer_from_another_question(self):
+        data = {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': self.question1.id, 'selected_answer': self.answer3.id}]
+        }
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_submit_quiz_repeated_question(self):
+        data = {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': self.question1.id, 'selected_answer': self.answer2.id}] * 5
+        }
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.participant.refresh_from_db()
+        self.assertIsNone(self.participant.score)
+
+    def test_submit_quiz_after_answer_key_change(self):
+        data = {
+            'quiz_id': self.quiz.id,
+            'answers': [{'question_id': self.question1.id, 'selected_answer': self.answer1.id}]
+        }
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.data['data']['score'], 0)
+
+        self.answer1.is_correct = True
+        self.answer1.save()
+
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.data['data']['score'], 3)
+
+    def test_answer_key_cached_before_commit_is_invalidated(self):
+        stale_answer_key = build_answer_key(self.quiz.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.answer1.is_correct = True
+            self.answer1.save()
+            # A concurrent request, still reading the committed answers, caches them under the bumped version.
+            version = get_cache_version(f'quiz:{self.quiz.id}')
+            cache.set(f'quiz:{self.quiz.id}:answer-key:{version}', stale_answer_key)
+
+        points, correct_answers, all_answers = get_answer_key(self.quiz.id)[self.question1.id]
+        self.assertEqual(correct_answers, {self.answer1.id, self.answer2.id})
+
+    def test_submit_quiz_query_count_is_constant(self):
+        def submit(answers):
+            data = {'quiz_id': self.quiz.id, 'answers': answers}
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries)
+
+        submit([])
+        few = submit([
+            {'question_id': self.question1.id, 'selected_answer': self.answer2.id},
+            {'question_id': self.question2.id, 'selected_answer': self.answer3.id},
+            {'question_id': self.question3.id, 'selected_answer': self.answer5.id},
+        ])
+        for index in range(20):
+            question = Question.objects.create(quiz=self.quiz, text=f'Extra {index}', type='MC', points=1)
+            Answer.objects.create(question=question, text='Right', is_correct=True)
+        submit([])
+        many = submit([
+            {'question_id': answer.question_id, 'selected_answer': answer.id}
+            for answer in Answer.objects.filter(question__quiz=self.quiz, is_correct=True)
+        ])
+
+        self.assertEqual(few, many)
+
 
 class QuestionListCreateViewTest(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = UserProfile.objects.create(username='admin', is_staff=True)
         self.client.force_authenticate(user=self.user)
         self.quiz = Quiz.objects.create(title='Test Quiz', description='Test Description', time_limit=20,
@@ -645,3 +905,1041 @@ class FeedbackRetrieveUpdateDeleteViewTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
 
         self.assertFalse(Feedback.objects.filter(pk=self.feedback.pk).exists())
+
+
+class QuizTotalsTest(APITestCase):
+    def setUp(self):
+        self.user = UserProfile.objects.create(username='admin', is_staff=True)
+        self.quiz = Quiz.objects.create(title='Test Quiz', time_limit=30, created_by=self.user)
+
+    def test_totals_follow_question_changes(self):
+        question1 = Question.objects.create(quiz=self.quiz, text='Question 1', type='MC', points=3)
+        question2 = Question.objects.create(quiz=self.quiz, text='Question 2', type='MC', points=5)
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.total_points, self.quiz.question_count), (8, 2))
+
+        question1.points = 4
+        question1.save()
+        question2.delete()
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.total_points, self.quiz.question_count), (4, 1))
+
+        other_quiz = Quiz.objects.create(title='Other Quiz', time_limit=30, created_by=self.user)
+        question1.quiz = other_quiz
+        question1.save()
+        self.quiz.refresh_from_db()
+        other_quiz.refresh_from_db()
+        self.assertEqual((self.quiz.total_points, self.quiz.question_count), (0, 0))
+        self.assertEqual((other_quiz.total_points, other_quiz.question_count), (4, 1))
+
+    def test_saving_stale_quiz_keeps_totals(self):
+        Question.objects.create(quiz=self.quiz, text='Question 1', type='MC', points=3)
+        self.quiz.title = 'Renamed'
+        self.quiz.save()
+
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.title, 'Renamed')
+        self.assertEqual(self.quiz.total_points, 3)
+
+    def test_sync_quiz_totals_command(self):
+        Question.objects.create(quiz=self.quiz, text='Question 1', type='MC', points=3)
+        Quiz.objects.filter(id=self.quiz.id).update(total_points=0, question_count=0)
+
+        call_command('sync_quiz_totals', '--check', stdout=StringIO())
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.total_points, 0)
+
+        call_command('sync_quiz_totals', stdout=StringIO())
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.total_points, self.quiz.question_count), (3, 1))
+
+
+class LeaderboardViewTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('quiz:leaderboard')
+        self.author = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.category = Category.objects.create(name='Science')
+        self.quiz1 = Quiz.objects.create(title='Quiz 1', time_limit=30, created_by=self.author)
+        self.quiz2 = Quiz.objects.create(title='Quiz 2', time_limit=30, created_by=self.author)
+        self.quiz1.categories.add(self.category)
+
+    def record(self, username, quiz, score, has_passed=True):
+        user, _ = UserProfile.objects.get_or_create(username=username, email=f'{username}@example.com')
+        now = timezone.now()
+        participant = Participant.objects.create(user=user, quiz=quiz, start_time=now, end_time=now,
+                                                 score=score, has_passed=has_passed)
+        record_leaderboard_score(participant)
+        return participant
+
+    def ranks(self, scope, scope_id=0):
+        entries = LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id).order_by(*LEADERBOARD_ORDERING)
+        return list(entries.values_list('participant__user__username', 'rank'))
+
+    def test_incremental_ranks(self):
+        self.record('alice', self.quiz1, 5)
+        bob = self.record('bob', self.quiz2, 9)
+        self.record('carol', self.quiz1, 7)
+        self.record('dave', self.quiz1, 10, has_passed=False)
+
+        self.assertEqual(self.ranks(LeaderboardScope.GLOBAL), [('bob', 1), ('carol', 2), ('alice', 3)])
+        self.assertEqual(self.ranks(LeaderboardScope.QUIZ, self.quiz1.id), [('carol', 1), ('alice', 2)])
+        self.assertEqual(self.ranks(LeaderboardScope.CATEGORY, self.category.id), [('carol', 1), ('alice', 2)])
+
+        bob.score = 1
+        bob.save()
+        record_leaderboard_score(bob)
+        self.assertEqual(self.ranks(LeaderboardScope.GLOBAL), [('carol', 1), ('alice', 2), ('bob', 3)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Participant.objects.get(user__username='carol').delete()
+        self.assertEqual(self.ranks(LeaderboardScope.GLOBAL), [('alice', 1), ('bob', 2)])
+
+    def test_deleted_label_drops_its_leaderboard(self):
+        tag = Tag.objects.create(name='Physics')
+        self.quiz1.tags.add(tag)
+        self.record('alice', self.quiz1, 5)
+        self.assertEqual(self.ranks(LeaderboardScope.TAG, tag.id), [('alice', 1)])
+
+        tag_id, category_id = tag.id, self.category.id
+        tag.delete()
+        self.category.delete()
+        self.assertEqual(self.ranks(LeaderboardScope.TAG, tag_id), [])
+        self.assertEqual(self.ranks(LeaderboardScope.CATEGORY, category_id), [])
+
+    def test_category_change_rebuilds_leaderboard(self):
+        self.record('alice', self.quiz2, 5)
+        self.assertEqual(self.ranks(LeaderboardScope.CATEGORY, self.category.id), [])
+
+        self.quiz2.categories.add(self.category)
+        self.assertEqual(self.ranks(LeaderboardScope.CATEGORY, self.category.id), [('alice', 1)])
+
+        self.quiz2.categories.clear()
+        self.assertEqual(self.ranks(LeaderboardScope.CATEGORY, self.category.id), [])
+
+    def test_list_leaderboard_pages(self):
+        for index in range(20):
+            self.record(f'user{index}', self.quiz1, index)
+
+        response = self.client.get(self.url, {'categories': 'science', 'page': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 20)
+        self.assertEqual([row['rank'] for row in response.data['results']], [16, 17, 18, 19, 20])
+        self.assertEqual(response.data['results'][0]['user'], 'user4')
+        self.assertEqual(response.data['results'][0]['quiz'], 'Quiz 1')
+
+    def test_list_leaderboard_with_several_filters(self):
+        self.record('alice', self.quiz1, 5)
+        self.quiz1.tags.add(Tag.objects.create(name='Physics'))
+
+        response = self.client.get(self.url, {'categories': 'science', 'tags': 'physics'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['user'] for row in response.data['results']], ['alice'])
+
+    def test_list_leaderboard_with_cursor(self):
+        for index in range(20):
+            self.record(f'user{index}', self.quiz1, index % 4)
+
+        response = self.client.get(self.url, {'cursor': '', 'participants': 6})
+        self.assertNotIn('count', response.data)
+        rows = response.data['results']
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            rows += response.data['results']
+
+        self.assertEqual([(row['user'], row['rank']) for row in rows], self.ranks(LeaderboardScope.GLOBAL))
+        self.assertEqual(len(rows), 20)
+
+    def test_list_leaderboard_fallback_with_cursor(self):
+        tag = Tag.objects.create(name='Physics')
+        self.quiz1.tags.add(tag)
+        for index in range(8):
+            self.record(f'user{index}', self.quiz1, index % 3)
+
+        response = self.client.get(self.url, {'categories': 'science', 'tags': 'physics', 'cursor': '',
+                                              'participants': 3})
+        users = [row['user'] for row in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            users += [row['user'] for row in response.data['results']]
+
+        expected = Participant.objects.filter(has_passed=True).order_by('-score', 'end_time', 'id')
+        self.assertEqual(users, [participant.user.username for participant in expected])
+
+    def test_list_leaderboard_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        for values in (['x', 'y', 'z'], [1], 5, None, [None, None, None], [[5], {}, True]):
+            cursor = urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(self.url, {'cursor': cursor, 'quiz': self.quiz1.id, 'tags': 'x'})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        # Precomputed leaderboards and the quiz list.
+        for url, values in ((self.url, [None, None, None]), (reverse('quiz:quiz-list-create'), [None])):
+            cursor = urlsafe_b64encode(json.dumps(values).encode()).decode()
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_own_rank(self):
+        self.record('alice', self.quiz1, 5)
+        bob = self.record('bob', self.quiz1, 7)
+        self.client.force_authenticate(user=bob.user)
+
+        response = self.client.get(reverse('quiz:leaderboard-rank'), {'quiz': self.quiz1.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['rank'], 1)
+
+        self.client.force_authenticate(user=UserProfile.objects.get(username='alice'))
+        response = self.client.get(reverse('quiz:leaderboard-rank'), {'quiz': self.quiz1.id})
+        self.assertEqual((response.data['user'], response.data['rank']), ('alice', 2))
+        self.client.force_authenticate(user=bob.user)
+
+        response = self.client.get(reverse('quiz:leaderboard-rank'), {'quiz': self.quiz2.id})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ListQueryCountTest(APITestCase):
+    """Pins every list endpoint to a number of queries that does not grow with the page size."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Science')
+        self.tag = Tag.objects.create(name='Physics')
+        self.quiz = Quiz.objects.create(title='Quiz', time_limit=30, created_by=self.user)
+        self.quiz.categories.add(self.category)
+        self.quiz.tags.add(self.tag)
+        self.question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+
+    def seed(self, index):
+        user = UserProfile.objects.create(username=f'user{index}', email=f'user{index}@example.com')
+        quiz = Quiz.objects.create(title=f'Quiz {index}', time_limit=30, created_by=self.user)
+        quiz.categories.add(self.category)
+        quiz.tags.add(self.tag)
+        question = Question.objects.create(quiz=self.quiz, text=f'Question {index}', type='MC', points=1)
+        Answer.objects.create(question=question, text='Answer', is_correct=True)
+        Answer.objects.create(question=self.question, text=f'Answer {index}', is_correct=False)
+
+        now = timezone.now()
+        for participant_user, participant_quiz in ((user, self.quiz), (self.user, quiz)):
+            participant = Participant.objects.create(user=participant_user, quiz=participant_quiz, start_time=now,
+                                                     end_time=now, score=index, has_passed=True)
+            record_leaderboard_score(participant)
+            Feedback.objects.create(participant=participant, quiz=self.quiz, rating=4, comment='Good quiz')
+
+    def assertListQueries(self, expected, url, params=None):
+        for rows in (2, 8):
+            while Participant.objects.filter(user=self.user).count() < rows:
+                self.seed(Participant.objects.count())
+            cache.clear()
+            with self.assertNumQueries(expected):
+                response = self.client.get(url, params or {})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_catalog_lists(self):
+        self.assertListQueries(1, reverse('quiz:category-list-create'))
+        self.assertListQueries(1, reverse('quiz:tag-list-create'))
+        self.assertListQueries(4, reverse('quiz:quiz-list-create'))
+        self.assertListQueries(3, reverse('quiz:question-list-create', args=[self.quiz.id]))
+        self.assertListQueries(1, reverse('quiz:answer-list-create', args=[self.question.id]))
+
+    def test_feedback_list(self):
+        self.assertListQueries(2, reverse('quiz:feedback-list-create', args=[self.quiz.id]))
+        self.assertListQueries(1, reverse('quiz:feedback-list-create', args=[self.quiz.id]), {'cursor': ''})
+
+    def test_leaderboard_lists(self):
+        url = reverse('quiz:leaderboard')
+        self.assertListQueries(2, url)
+        self.assertListQueries(1, url, {'cursor': ''})
+        # The cleared cache also drops the category and tag name maps, one query each to reload.
+        self.assertListQueries(3, url, {'categories': 'science'})
+        self.assertListQueries(4, url, {'categories': 'science', 'tags': 'physics'})
+        self.assertListQueries(3, url, {'categories': 'science', 'tags': 'physics', 'cursor': ''})
+
+    def test_statistics_list(self):
+        self.client.get(reverse('quiz:user-attempts-statistics'))
+        self.assertListQueries(3, reverse('quiz:user-attempts-statistics'))
+
+
+class QueryPlanTest(APITestCase):
+    def test_hot_queries_are_index_scans(self):
+        out = StringIO()
+        call_command('benchmark_query_plans', participants=500, quizzes=10, stdout=out)
+        self.assertNotIn('NO INDEX SCAN', out.getvalue())
+        self.assertFalse(Participant.objects.exists())
+
+
+class UserQuizStatisticsViewTest(APITestCase):
+    def setUp(self):
+        self.url = reverse('quiz:user-attempts-statistics')
+        self.user = UserProfile.objects.create(username='admin')
+        self.client.force_authenticate(user=self.user)
+
+        now = timezone.now()
+        for index, (score, has_passed) in enumerate(((5, True), (1, False), (7, True), (None, True))):
+            quiz = Quiz.objects.create(title=f'Quiz {index}', time_limit=30, created_by=self.user)
+            Participant.objects.create(user=self.user, quiz=quiz, start_time=now, end_time=now + timedelta(minutes=30),
+                                       score=score, has_passed=has_passed)
+
+    def test_statistics(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        results = response.data['results']
+        self.assertEqual(results['pass_rate'], 66.67)
+        self.assertEqual(results['total_passed'], 2)
+        self.assertEqual(results['total_failed'], 1)
+        self.assertEqual(len(results['data']), 3)
+
+    def test_rollup_follows_submissions(self):
+        self.client.get(self.url)
+        participant = Participant.objects.get(quiz__title='Quiz 1')
+        question = Question.objects.create(quiz=participant.quiz, text='Question', type='MC', points=1)
+        answer = Answer.objects.create(question=question, text='Answer', is_correct=True)
+
+        data = {'quiz_id': participant.quiz_id, 'answers': [{'question_id': question.id, 'selected_answer': answer.id}]}
+        self.client.post(reverse('quiz:submit-quiz'), data, format='json')
+        relay_outbox()
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (3, 3))
+
+        # Restarting keeps the best attempt.
+        self.client.post(reverse('quiz:start-quiz'), {'quiz_id': participant.quiz_id})
+        statistics.refresh_from_db()
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (3, 3))
+
+        Participant.objects.get(quiz__title='Quiz 0').delete()
+        statistics.refresh_from_db()
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (2, 2))
+
+
+class CatalogCacheTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='admin', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Science')
+        self.quiz = Quiz.objects.create(title='Quiz', time_limit=30, created_by=self.user)
+        self.quiz.categories.add(self.category)
+
+    def test_quiz_list_is_cached_until_changed(self):
+        url = reverse('quiz:quiz-list-create')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['categories'], ['Science'])
+
+        self.category.name = 'Physics'
+        self.category.save()
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['categories'], ['Physics'])
+
+        response = self.client.get(url, {'title': 'nothing'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_responses_cached_before_commit_are_invalidated(self):
+        url = reverse('quiz:quiz-list-create')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.title = 'Renamed'
+            self.quiz.save()
+            Tag.objects.create(name='Easy')
+            # Cached under the bumped versions, as a concurrent request could from the rows committed before.
+            self.client.get(url)
+            get_label_id_map(Tag)
+
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        self.assertTrue(context.captured_queries)
+        with self.assertNumQueries(1):
+            get_label_id_map(Tag)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+            get_label_id_map(Tag)
+
+    def test_questions_are_invalidated_per_quiz(self):
+        other_quiz = Quiz.objects.create(title='Other', time_limit=30, created_by=self.user)
+        url = reverse('quiz:question-list-create', args=[self.quiz.id])
+        other_url = reverse('quiz:question-list-create', args=[other_quiz.id])
+        self.client.get(url)
+        self.client.get(other_url)
+
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+        Answer.objects.create(question=question, text='Answer', is_correct=True)
+        with self.assertNumQueries(0):
+            self.client.get(other_url)
+        response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['answers'][0]['text'], 'Answer')
+
+    def test_cache_metrics(self):
+        url = reverse('quiz:category-list-create')
+        self.client.get(url)
+        self.client.get(url)
+
+        response = self.client.get(reverse('quiz:cache-metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['CategoryListCreateView'], {'hits': 1, 'misses': 1, 'hit_rate': 50.0})
+
+
+class QuizTransferTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.category = Category.objects.create(name='Science')
+        self.tag = Tag.objects.create(name='Easy')
+        self.quiz = Quiz.objects.create(title='Quiz', description='Description', time_limit=30, created_by=self.user)
+        self.quiz.categories.add(self.category)
+        self.quiz.tags.add(self.tag)
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=3)
+        Answer.objects.create(question=question, text='Right', is_correct=True)
+        Answer.objects.create(question=question, text='Wrong', is_correct=False)
+
+    def export(self):
+        response = self.client.get(reverse('quiz:quiz-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content)
+
+    def test_export_and_import_round_trip(self):
+        body = self.export()
+        self.assertEqual(len(body.splitlines()), 1)
+
+        response = self.client.post(reverse('quiz:quiz-import'), data=body * 3, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data, {'quizzes': 3, 'questions': 3})
+
+        imported = Quiz.objects.exclude(id=self.quiz.id)
+        self.assertEqual(imported.count(), 3)
+        self.assertEqual(Category.objects.count(), 1)
+        self.assertEqual(Tag.objects.count(), 1)
+        for quiz in imported:
+            self.assertEqual(quiz.created_by, self.user)
+            self.assertEqual((quiz.total_points, quiz.question_count), (3, 1))
+            self.assertEqual(list(quiz.categories.values_list('name', flat=True)), ['Science'])
+            self.assertEqual(sorted(Answer.objects.filter(question__quiz=quiz).values_list('text', flat=True)),
+                             ['Right', 'Wrong'])
+
+        self.assertEqual(self.client.get(reverse('quiz:quiz-list-create')).data['count'], 4)
+
+    def test_import_without_bulk_insert_primary_keys(self):
+        body = self.export()
+        with patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            self.assertEqual(import_quizzes(body.splitlines() * 2, self.user.id), {'quizzes': 2, 'questions': 2})
+
+        for quiz in Quiz.objects.exclude(id=self.quiz.id):
+            self.assertEqual((quiz.total_points, quiz.question_count), (3, 1))
+            self.assertEqual(sorted(Answer.objects.filter(question__quiz=quiz).values_list('text', flat=True)),
+                             ['Right', 'Wrong'])
+
+    def test_import_rolls_back_on_invalid_line(self):
+        body = self.export() + b'{"title": "Broken"}\n'
+
+        response = self.client.post(reverse('quiz:quiz-import'), data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error']['line'], 2)
+        self.assertEqual(Quiz.objects.count(), 1)
+
+    def test_transfer_requires_staff(self):
+        self.client.force_authenticate(user=UserProfile.objects.create(username='user', email='user@example.com'))
+        self.assertEqual(self.client.get(reverse('quiz:quiz-export')).status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(reverse('quiz:quiz-import'), data=b'', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_export_and_import_commands(self):
+        out = StringIO()
+        call_command('export_quizzes', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+
+        self.quiz.delete()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'quizzes.jsonl')
+            with open(path, 'w') as bank:
+                bank.write('\n'.join(lines * 2))
+            call_command('import_quizzes', path, created_by='admin', stdout=StringIO())
+        self.assertEqual(Quiz.objects.count(), 2)
+        self.assertEqual(Question.objects.count(), 2)
+
+
+class RefusingEmailBackend(EmailBackend):
+    """Locmem backend whose mail server refuses the recipients at example.org."""
+
+    def send_messages(self, messages):
+        for message in messages:
+            refused = [address for address in message.to if address.endswith('@example.org')]
+            if refused:
+                raise SMTPRecipientsRefused({address: (550, b'Mailbox unavailable') for address in refused})
+        return super().send_messages(messages)
+
+
+class UnreachableEmailBackend(EmailBackend):
+    """Locmem backend whose mail server can't be connected to."""
+
+    def open(self):
+        raise ConnectionRefusedError(111, 'Connection refused')
+
+
+class ReportSchedulingTest(APITestCase):
+    def setUp(self):
+        self.user = UserProfile.objects.create(username='user', email='user@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', time_limit=30, created_by=self.user)
+        self.client.post(reverse('quiz:start-quiz'), {'quiz_id': self.quiz.id})
+        self.participant = Participant.objects.get(user=self.user, quiz=self.quiz)
+
+    def submit(self):
+        response = self.client.post(reverse('quiz:submit-quiz'), {'quiz_id': self.quiz.id, 'answers': []},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        relay_outbox()
+
+    def test_submissions_queue_one_report(self):
+        self.submit()
+        self.submit()
+
+        self.assertEqual(ScheduledReport.objects.filter(participant=self.participant).count(), 1)
+        self.assertFalse(PeriodicTask.objects.filter(task='quiz.tasks.send_participant_report').exists())
+
+    def test_dispatch_sends_due_reports(self):
+        self.submit()
+        other_user = UserProfile.objects.create(username='other', email='other@example.com')
+        now = timezone.now()
+        other = Participant.objects.create(user=other_user, quiz=self.quiz, start_time=now, end_time=now, score=0)
+        ScheduledReport.objects.create(participant=other, due_at=now + timedelta(hours=1))
+        ScheduledReport.objects.filter(participant=self.participant).update(due_at=now)
+
+        self.assertEqual(dispatch_due_reports(), 1)
+        self.assertEqual([message.to for message in mail.outbox], [['user@example.com']])
+        self.assertEqual(list(ScheduledReport.objects.values_list('participant_id', flat=True)), [other.id])
+
+    @override_settings(EMAIL_BACKEND='quiz.tests.RefusingEmailBackend')
+    def test_refused_report_is_retried_alone(self):
+        now = timezone.now()
+        for username, domain in (('first', 'example.com'), ('refused', 'example.org'), ('last', 'example.com')):
+            user = UserProfile.objects.create(username=username, email=f'{username}@{domain}')
+            participant = Participant.objects.create(user=user, quiz=self.quiz, start_time=now, end_time=now, score=0)
+            ScheduledReport.objects.create(participant=participant, due_at=now)
+
+        self.assertEqual(dispatch_due_reports(), 2)
+        self.assertEqual([message.to for message in mail.outbox], [['first@example.com'], ['last@example.com']])
+        report = ScheduledReport.objects.get()
+        self.assertEqual((report.participant.user.username, report.attempts), ('refused', 1))
+        self.assertGreater(report.due_at, timezone.now())
+
+        # Nothing is due until the backoff has passed, then the report is dropped after its last attempt.
+        self.assertEqual(dispatch_due_reports(), 0)
+        for attempts in range(2, REPORT_MAX_ATTEMPTS + 1):
+            ScheduledReport.objects.update(due_at=now)
+            self.assertEqual(dispatch_due_reports(), 0)
+            self.assertEqual(ScheduledReport.objects.filter(attempts=attempts).exists(),
+                             attempts < REPORT_MAX_ATTEMPTS)
+        self.assertFalse(ScheduledReport.objects.exists())
+        self.assertEqual(len(mail.outbox), 2)
+
+    @override_settings(EMAIL_BACKEND='quiz.tests.UnreachableEmailBackend')
+    def test_unreachable_mail_server_retries_reports(self):
+        self.submit()
+        ScheduledReport.objects.update(due_at=timezone.now())
+
+        self.assertEqual(dispatch_due_reports(), 0)
+        report = ScheduledReport.objects.get()
+        self.assertEqual(report.attempts, 1)
+        self.assertGreater(report.due_at, timezone.now())
+
+    def test_delete_fired_schedules(self):
+        now = timezone.now()
+        fired = ClockedSchedule.objects.create(clocked_time=now - timedelta(hours=1))
+        pending = ClockedSchedule.objects.create(clocked_time=now + timedelta(hours=1))
+        paused = ClockedSchedule.objects.create(clocked_time=now + timedelta(hours=2))
+        unused = ClockedSchedule.objects.create(clocked_time=now + timedelta(hours=1))
+        # Beat disables a one-off task after its run, which clears its last_run_at.
+        PeriodicTask.objects.create(name='fired', task='quiz.tasks.send_participant_report', clocked=fired,
+                                    one_off=True, enabled=False)
+        PeriodicTask.objects.create(name='pending', task='quiz.tasks.send_participant_report', clocked=pending,
+                                    one_off=True)
+        PeriodicTask.objects.create(name='paused', task='quiz.tasks.send_participant_report', clocked=paused,
+                                    one_off=True, enabled=False)
+
+        self.assertEqual(delete_fired_schedules(), 1)
+        self.assertEqual(set(PeriodicTask.objects.filter(one_off=True).values_list('name', flat=True)),
+                         {'pending', 'paused'})
+        self.assertEqual(set(ClockedSchedule.objects.values_list('id', flat=True)), {pending.id, paused.id, unused.id})
+
+    def test_dispatch_queries_do_not_grow_with_reports(self):
+        now = timezone.now()
+
+        def queue_reports(count):
+            for index in range(count):
+                user = UserProfile.objects.create(username=f'user-{count}-{index}',
+                                                  email=f'{count}-{index}@example.com')
+                quiz = Quiz.objects.create(title=f'History {count}-{index}', time_limit=30, created_by=self.user)
+                participant = Participant.objects.create(user=user, quiz=quiz, start_time=now, end_time=now, score=1)
+                ScheduledReport.objects.create(participant=participant, due_at=now)
+
+        queue_reports(2)
+        with CaptureQueriesContext(connection) as few:
+            dispatch_due_reports()
+        queue_reports(6)
+        mail.outbox = []
+        with CaptureQueriesContext(connection) as many:
+            dispatch_due_reports()
+
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertIn('History 6-0', mail.outbox[0].body)
+
+
+class SubmissionOutboxTest(APITestCase):
+    def setUp(self):
+        self.user = UserProfile.objects.create(username='user', email='user@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', time_limit=30, created_by=self.user)
+        question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=1)
+        answer = Answer.objects.create(question=question, text='Answer', is_correct=True)
+        self.data = {'quiz_id': self.quiz.id, 'answers': [{'question_id': question.id, 'selected_answer': answer.id}]}
+        self.client.post(reverse('quiz:start-quiz'), {'quiz_id': self.quiz.id})
+        get_user_statistics(self.user.id)
+
+    def test_side_effects_are_applied_by_the_relay(self):
+        response = self.client.post(reverse('quiz:submit-quiz'), self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(Participant.objects.get(user=self.user).score, 1)
+        self.assertEqual(OutboxEvent.objects.count(), 1)
+        self.assertFalse(LeaderboardEntry.objects.exists())
+        self.assertFalse(ScheduledReport.objects.exists())
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_passed, 0)
+
+        self.assertEqual(relay_outbox(), 1)
+        self.assertFalse(OutboxEvent.objects.exists())
+        entries = LeaderboardEntry.objects.filter(scope=LeaderboardScope.GLOBAL)
+        self.assertEqual(list(entries.values_list('rank', flat=True)), [1])
+        self.assertTrue(ScheduledReport.objects.exists())
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_passed, 1)
+
+    def test_statistics_first_read_before_the_relay(self):
+        UserStatistics.objects.all().delete()
+        response = self.client.post(reverse('quiz:submit-quiz'), self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        statistics = get_user_statistics(self.user.id)
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (0, 0))
+
+        relay_outbox()
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (1, 1))
+
+    def test_failing_event_is_set_aside(self):
+        failing = OutboxEvent.objects.create(topic='quiz.unknown', payload={})
+        self.client.post(reverse('quiz:submit-quiz'), self.data, format='json')
+
+        self.assertEqual(relay_outbox(), 1)
+        self.assertEqual(UserStatistics.objects.get(user=self.user).total_passed, 1)
+        self.assertEqual(list(OutboxEvent.objects.values_list('id', 'attempts')), [(failing.id, 1)])
+        self.assertIn('quiz.unknown', OutboxEvent.objects.get().last_error)
+
+        for _ in range(OUTBOX_MAX_ATTEMPTS):
+            self.assertEqual(relay_outbox(), 0)
+        self.assertEqual(OutboxEvent.objects.get().attempts, OUTBOX_MAX_ATTEMPTS)
+
+    def test_relay_after_participant_deletion(self):
+        self.client.post(reverse('quiz:submit-quiz'), self.data, format='json')
+        Participant.objects.get(user=self.user).delete()
+        self.assertFalse(OutboxEvent.objects.exists())
+
+        relay_outbox()
+        statistics = UserStatistics.objects.get(user=self.user)
+        self.assertEqual((statistics.total_attempted, statistics.total_passed), (0, 0))
+        self.assertFalse(ScheduledReport.objects.exists())
+
+
+class QuizSearchTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('quiz:quiz-list-create')
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+
+        self.tag = Tag.objects.create(name='Python')
+        self.category = Category.objects.create(name='Programming')
+        self.python = Quiz.objects.create(title='Python basics', description='Loops and functions', time_limit=30,
+                                          created_by=self.user)
+        self.python.tags.add(self.tag)
+        self.loops = Quiz.objects.create(title='Loops', description='Python loops in depth', time_limit=30,
+                                         created_by=self.user)
+        self.loops.categories.add(self.category)
+        self.history = Quiz.objects.create(title='History', description='Dates', time_limit=30, created_by=self.user)
+
+    def search(self, query):
+        response = self.client.get(self.url, {'search': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [quiz['id'] for quiz in response.data['results']]
+
+    def test_search_ranks_title_matches_first(self):
+        self.assertEqual(self.search('python'), [self.python.id, self.loops.id])
+        self.assertEqual(self.search('LOOPS'), [self.loops.id, self.python.id])
+        self.assertEqual(self.search('python dates'), [])
+        self.assertEqual(self.search('!!'), [self.history.id, self.loops.id, self.python.id])
+
+    def test_title_parameter_matches_part_of_the_title(self):
+        for title, expected in (('history', [self.history.id]), ('pyth', [self.python.id]), ('ASIC', [self.python.id]),
+                                ('o', [self.history.id, self.loops.id, self.python.id])):
+            response = self.client.get(self.url, {'title': title})
+            self.assertEqual(sorted(quiz['id'] for quiz in response.data['results']), sorted(expected))
+
+    def test_index_follows_quiz_and_label_changes(self):
+        self.history.description = 'Dates of the python releases'
+        self.history.save()
+        self.assertIn(self.history.id, self.search('python'))
+
+        self.category.name = 'Software'
+        self.category.save()
+        self.assertEqual(self.search('software'), [self.loops.id])
+
+        self.category.delete()
+        self.assertEqual(self.search('software'), [])
+
+        self.python.tags.clear()
+        self.python.tags.add(Tag.objects.create(name='Beginner'))
+        self.assertEqual(self.search('beginner'), [self.python.id])
+
+        self.history.delete()
+        self.assertFalse(QuizSearchTerm.objects.filter(quiz_id=self.history.id).exists())
+
+    def test_rebuild_search_index(self):
+        QuizSearchDocument.objects.all().delete()
+        QuizSearchTerm.objects.all().delete()
+
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(QuizSearchDocument.objects.count(), 3)
+        self.assertEqual(self.search('programming'), [self.loops.id])
+
+
+class QuizFacetsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('quiz:quiz-facets')
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.science = Category.objects.create(name='Science')
+        self.history = Category.objects.create(name='History')
+        self.easy = Tag.objects.create(name='Easy')
+        self.hard = Tag.objects.create(name='Hard')
+        self.quizzes = [
+            Quiz.objects.create(title=f'Quiz {index}', description='', time_limit=30, created_by=self.user)
+            for index in range(3)
+        ]
+
+    def counts(self, model):
+        return dict(model.objects.values_list('name', 'quiz_count'))
+
+    def test_counts_follow_m2m_changes(self):
+        first, second, third = self.quizzes
+        first.categories.add(self.science, self.history)
+        first.categories.add(self.science)
+        second.categories.set([self.science])
+        self.science.quiz_set.add(third, first)
+        self.assertEqual(self.counts(Category), {'Science': 3, 'History': 1})
+
+        first.categories.remove(self.history, self.history)
+        second.categories.remove(self.history)
+        self.history.quiz_set.add(second, third)
+        self.science.quiz_set.remove(first, second)
+        self.assertEqual(self.counts(Category), {'Science': 1, 'History': 2})
+
+        third.categories.clear()
+        self.history.quiz_set.clear()
+        self.assertEqual(self.counts(Category), {'Science': 0, 'History': 0})
+
+        first.tags.set([self.easy, self.hard])
+        second.tags.set([self.easy])
+        second.tags.set([self.hard])
+        self.assertEqual(self.counts(Tag), {'Easy': 1, 'Hard': 2})
+
+        first.delete()
+        self.assertEqual(self.counts(Tag), {'Easy': 0, 'Hard': 1})
+
+    def test_rename_keeps_count(self):
+        self.quizzes[0].categories.add(self.science)
+        stale = Category.objects.get(id=self.science.id)
+        self.quizzes[1].categories.add(self.science)
+
+        stale.name = 'Physics'
+        stale.save()
+        self.assertEqual(self.counts(Category), {'Physics': 2, 'History': 0})
+
+    def test_facets(self):
+        first, second, third = self.quizzes
+        first.categories.add(self.science)
+        first.tags.add(self.easy)
+        second.categories.add(self.science, self.history)
+        second.tags.add(self.hard)
+        third.tags.add(self.hard)
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # One read of the maintained counts per facet, whatever the size of the catalog.
+        self.assertEqual(len([query for query in context.captured_queries if 'quiz_count' in query['sql']]), 2)
+        self.assertEqual(response.data, {
+            'categories': [
+                {'id': self.science.id, 'name': 'Science', 'count': 2},
+                {'id': self.history.id, 'name': 'History', 'count': 1},
+            ],
+            'tags': [
+                {'id': self.hard.id, 'name': 'Hard', 'count': 2},
+                {'id': self.easy.id, 'name': 'Easy', 'count': 1},
+            ],
+        })
+
+        response = self.client.get(self.url, {'tags': 'hard'})
+        self.assertEqual(response.data, {
+            'categories': [
+                {'id': self.history.id, 'name': 'History', 'count': 1},
+                {'id': self.science.id, 'name': 'Science', 'count': 1},
+            ],
+            'tags': [{'id': self.hard.id, 'name': 'Hard', 'count': 2}],
+        })
+
+    def test_import_counts(self):
+        line = json.dumps({
+            'title': 'Imported', 'description': '', 'time_limit': 30, 'passing_marks_percentage': 33,
+            'categories': ['Science', 'Geology'], 'tags': ['Easy'], 'questions': [],
+        })
+        import_quizzes([line, line], self.user.id)
+
+        self.assertEqual(self.counts(Category), {'Science': 2, 'History': 0, 'Geology': 2})
+        self.assertEqual(self.counts(Tag), {'Easy': 2, 'Hard': 0})
+
+
+class LabelFilterTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('quiz:quiz-list-create')
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+
+        self.tags = [Tag.objects.create(name=f'Tag {index}') for index in range(20)]
+        self.science = Category.objects.create(name='Science')
+        self.history = Category.objects.create(name='History')
+        self.both = Quiz.objects.create(title='Both', description='', time_limit=30, created_by=self.user)
+        self.both.tags.set(self.tags)
+        self.both.categories.add(self.science, self.history)
+        self.first = Quiz.objects.create(title='First', description='', time_limit=30, created_by=self.user)
+        self.first.tags.add(self.tags[0])
+        self.first.categories.add(self.science)
+        self.other = Quiz.objects.create(title='Other', description='', time_limit=30, created_by=self.user)
+
+    def filter_quizzes(self, **params):
+        return set(QuizFilter(params, queryset=Quiz.objects.all()).qs.values_list('id', flat=True))
+
+    def test_all_and_any(self):
+        self.assertEqual(self.filter_quizzes(tags='tag 0, TAG 1'), {self.both.id})
+        self.assertEqual(self.filter_quizzes(tags='tag 0,tag 1', match='any'), {self.both.id, self.first.id})
+        self.assertEqual(self.filter_quizzes(categories='science', tags='tag 1', match='any'), {self.both.id})
+        self.assertEqual(self.filter_quizzes(tags='tag 0,unknown'), set())
+        self.assertEqual(self.filter_quizzes(tags='tag 0,unknown', match='any'), {self.both.id, self.first.id})
+        self.assertEqual(self.filter_quizzes(tags=' , '), {self.both.id, self.first.id, self.other.id})
+
+        response = self.client.get(self.url, {'categories': 'history,Science'})
+        self.assertEqual([quiz['id'] for quiz in response.data['results']], [self.both.id])
+        response = self.client.get(self.url, {'tags': 'tag 0', 'match': 'some'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_query_count_does_not_grow_with_values(self):
+        get_label_id_map(Tag)
+        for match in ('all', 'any'):
+            for count in (1, 5, 20):
+                names = ','.join(tag.name for tag in self.tags[:count])
+                with self.assertNumQueries(1):
+                    quiz_ids = self.filter_quizzes(tags=names, match=match)
+                self.assertEqual(quiz_ids, {self.both.id, self.first.id} if count == 1 or match == 'any'
+                                 else {self.both.id})
+
+    def test_map_follows_label_changes(self):
+        self.assertEqual(self.filter_quizzes(categories='science'), {self.both.id, self.first.id})
+        self.science.name = 'Physics'
+        self.science.save()
+        self.assertEqual(self.filter_quizzes(categories='science'), set())
+        self.assertEqual(self.filter_quizzes(categories='physics'), {self.both.id, self.first.id})
+
+    def test_participant_filter(self):
+        participants = [
+            Participant.objects.create(user=self.user, quiz=quiz, start_time=timezone.now(),
+                                       end_time=timezone.now())
+            for quiz in (self.both, self.first, self.other)
+        ]
+        filterset = ParticipantFilter({'tags': 'tag 0,tag 1', 'match': 'any'}, queryset=Participant.objects.all())
+        self.assertEqual(set(filterset.qs), set(participants[:2]))
+        filterset = ParticipantFilter({'tags': 'tag 0,tag 1'}, queryset=Participant.objects.all())
+        self.assertEqual(list(filterset.qs), [participants[0]])
+
+
+class LabelNameTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(user=self.user)
+        self.science = Category.objects.create(name='Science')
+        self.easy = Tag.objects.create(name='Easy')
+
+    def test_names_are_unique_regardless_of_case(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tag.objects.create(name='EASY')
+
+        response = self.client.post(reverse('quiz:category-list-create'), {'name': 'science'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'name': ['Category with this name is already exist']})
+
+        hard = Tag.objects.create(name='Hard')
+        response = self.client.put(reverse('quiz:tag-retrieve-update-delete', args=[hard.id]), {'name': 'easy'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'name': ['Tag with this name is already exist']})
+        response = self.client.put(reverse('quiz:tag-retrieve-update-delete', args=[hard.id]), {'name': 'HARD'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ensure_labels(self):
+        with CaptureQueriesContext(connection) as context:
+            ids = ensure_labels(Tag, ['easy', 'Python', 'PYTHON', ' Django ', ''])
+        self.assertEqual(len([query for query in context.captured_queries
+                              if query['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(ids, {name.lower(): tag.id for tag in Tag.objects.all() for name in [tag.name]})
+        self.assertEqual(sorted(Tag.objects.values_list('name', flat=True)), ['Django', 'Easy', 'Python'])
+
+        with self.assertNumQueries(1):
+            self.assertEqual(ensure_labels(Tag, ['django', 'EASY']), {'django': ids['django'], 'easy': self.easy.id})
+
+    def test_quiz_creates_missing_labels(self):
+        data = {
+            'title': 'Quiz', 'description': 'Description', 'time_limit': 30,
+            'tags': ['EASY', 'New tag', 'new TAG'], 'categories': ['science'],
+        }
+        response = self.client.post(reverse('quiz:quiz-list-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(sorted(response.data['tags']), ['Easy', 'New tag'])
+        self.assertEqual(response.data['categories'], ['Science'])
+        self.assertEqual(Category.objects.count(), 1)
+        self.assertEqual(dict(Tag.objects.values_list('name', 'quiz_count')), {'Easy': 1, 'New tag': 1})
+
+        data['tags'] = [1]
+        response = self.client.post(reverse('quiz:quiz-list-create'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_import_reuses_labels_regardless_of_case(self):
+        line = json.dumps({'title': 'Imported', 'time_limit': 30, 'categories': ['SCIENCE'], 'tags': ['easy', 'Easy']})
+        import_quizzes([line], self.user.id)
+        quiz = Quiz.objects.get()
+        self.assertEqual(list(quiz.categories.all()), [self.science])
+        self.assertEqual(list(quiz.tags.all()), [self.easy])
+
+
+class QuizExamViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = UserProfile.objects.create(username='user', email='user@example.com')
+        self.client.force_authenticate(user=self.user)
+        self.quiz = Quiz.objects.create(title='Quiz', description='Description', time_limit=30, created_by=self.user)
+        self.url = reverse('quiz:quiz-exam', args=[self.quiz.id])
+
+        self.questions = [
+            Question.objects.create(quiz=self.quiz, text=f'Question {index}', type='MC', points=index + 1)
+            for index in range(3)
+        ]
+        self.answers = [
+            Answer.objects.create(question=question, text=f'Answer {index}', is_correct=index == 0)
+            for question in self.questions[:2] for index in range(2)
+        ]
+
+    def test_exam_payload(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'Quiz')
+        self.assertEqual(response.data['total_points'], 6)
+        self.assertEqual(response.data['questions'], [
+            {'id': self.questions[0].id, 'text': 'Question 0', 'type': 'MC', 'points': 1, 'answers': [
+                {'id': self.answers[0].id, 'text': 'Answer 0'}, {'id': self.answers[1].id, 'text': 'Answer 1'},
+            ]},
+            {'id': self.questions[1].id, 'text': 'Question 1', 'type': 'MC', 'points': 2, 'answers': [
+                {'id': self.answers[2].id, 'text': 'Answer 0'}, {'id': self.answers[3].id, 'text': 'Answer 1'},
+            ]},
+            {'id': self.questions[2].id, 'text': 'Question 2', 'type': 'MC', 'points': 3, 'answers': []},
+        ])
+        self.assertNotIn('is_correct', response.content.decode())
+
+        response = self.client.get(reverse('quiz:quiz-exam', args=[self.quiz.id + 1]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_exam_is_cached_with_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response['ETag'], etag)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+
+        self.answers[0].text = 'Changed'
+        self.answers[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['questions'][0]['answers'][0]['text'], 'Changed')
+
+
+class ParticipantQuestionViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.staff = UserProfile.objects.create(username='admin', email='admin@example.com', is_staff=True)
+        self.user = UserProfile.objects.create(username='user', email='user@example.com')
+        self.quiz = Quiz.objects.create(title='Quiz', description='Description', time_limit=30, created_by=self.staff)
+        self.question = Question.objects.create(quiz=self.quiz, text='Question', type='MC', points=2)
+        self.empty_question = Question.objects.create(quiz=self.quiz, text='Empty', type='OE', points=1)
+        self.right = Answer.objects.create(question=self.question, text='Right', is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, text='Wrong', is_correct=False)
+        self.url = reverse('quiz:question-list-create', args=[self.quiz.id])
+
+    def test_question_list_hides_answer_key(self):
+        self.client.force_authenticate(user=self.user)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['results'], [
+            {'id': self.question.id, 'text': 'Question', 'type': 'MC', 'points': 2, 'answers': [
+                {'id': self.right.id, 'text': 'Right'}, {'id': self.wrong.id, 'text': 'Wrong'},
+            ]},
+            {'id': self.empty_question.id, 'text': 'Empty', 'type': 'OE', 'points': 1, 'answers': []},
+        ])
+
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get(self.url).data, response.data)
+
+        # Staff get the full questions, cached separately.
+        self.client.force_authenticate(user=self.staff)
+        response = self.client.get(self.url)
+        self.assertEqual(response.data['results'][0]['answers'][0]['is_correct'], True)
+        self.client.force_authenticate(user=self.user)
+        self.assertNotIn('is_correct', self.client.get(self.url).content.decode())
+
+    def test_question_and_answers_hide_answer_key(self):
+        self.client.force_authenticate(user=self.user)
+        urls = [
+            reverse('quiz:question-retrieve-update-delete', args=[self.question.id]),
+            reverse('quiz:answer-list-create', args=[self.question.id]),
+            reverse('quiz:answer-retrieve-update-delete', args=[self.right.id]),
+        ]
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertIn('Right', response.content.decode())
+            self.assertNotIn('is_correct', response.content.decode())
+
+        response = self.client.get(reverse('quiz:question-retrieve-update-delete', args=[self.question.id + 10]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+        self.client.force_authenticate(user=self.staff)
+        for url in urls:
+            self.assertIn('is_correct', self.client.get(url).content.decode())
@@ -0,0 +1,197 @@
+import json
+
+from django.db import connection, transaction
+from rest_framework import serializers
+
+from quiz.cache import bump_cache_versions
+from quiz.facets import adjust_quiz_counts
+from quiz.labels import ensure_labels
+from quiz.models import Category, Tag, Quiz, QuestionType, Question, Answer
+from quiz.search import index_quizzes
+
+EXPORT_CHUNK_SIZE = 100
+IMPORT_BATCH_SIZE = 1000
+
+
+class AnswerTransferSerializer(serializers.Serializer):
+    text = serializers.CharField()
+    is_correct = serializers.BooleanField()
+
+
+class QuestionTransferSerializer(serializers.Serializer):
+    text = serializers.CharField()
+    type = serializers.ChoiceField(choices=QuestionType.choices)
+    points = serializers.IntegerField(default=1)
+    answers = AnswerTransferSerializer(many=True, default=list)
+
+
+class QuizTransferSerializer(serializers.Serializer):
+    """One line of a quiz bank: a quiz with its questions, answers, tag and category names."""
+    title = serializers.CharField(max_length=255)
+    description = serializers.CharField(allow_blank=True, default='')
+    time_limit = serializers.IntegerField(min_value=1, max_value=240)
+    passing_marks_percentage = serializers.IntegerField(min_value=1, max_value=100, default=33)
+    tags = serializers.ListField(child=serializers.CharField(max_length=255), default=list)
+    categories = serializers.ListField(child=serializers.CharField(max_length=255), default=list)
+    questions = QuestionTransferSerializer(many=True, default=list)
+
+
+class QuizImportError(Exception):
+    def __init__(self, line_number, errors):
+        super().__init__(f'Line {line_number}: {errors}')
+        self.line_number = line_number
+        self.errors = errors
+
+
+def export_quizzes(queryset=None):
+    """
+    Yield the quizzes as JSON Lines.
+    Quizzes are read in chunks through a server-side cursor (where the database supports it), with their
+    questions, answers, tags and categories prefetched per chunk.
+    """
+    if queryset is None:
+        queryset = Quiz.objects.all()
+
+    quizzes = queryset.order_by('id').prefetch_related('tags', 'categories', 'questions__answers')
+    for quiz in quizzes.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        data = {
+            'title': quiz.title,
+            'description': quiz.description,
+            'time_limit': quiz.time_limit,
+            'passing_marks_percentage': quiz.passing_marks_percentage,
+            'tags': [tag.name for tag in quiz.tags.all()],
+            'categories': [category.name for category in quiz.categories.all()],
+            'questions': [
+                {
+                    'text': question.text,
+                    'type': question.type,
+                    'points': question.points,
+                    'answers': [
+                        {'text': answer.text, 'is_correct': answer.is_correct} for answer in question.answers.all()
+                    ],
+                }
+                for question in quiz.questions.all()
+            ],
+        }
+        yield json.dumps(data) + '\n'
+
+
+def _insert(model, objects, bulk_insert):
+    if bulk_insert:
+        model.objects.bulk_create(objects)
+    else:
+        for obj in objects:
+            obj.save()
+
+
+class _QuizBankImporter:
+    def __init__(self, created_by_id):
+        self.created_by_id = created_by_id
+        self.tag_ids = {}
+        self.category_ids = {}
+        self.pending = []
+        self.pending_questions = 0
+        self.imported_quizzes = 0
+        self.imported_questions = 0
+
+    def add(self, data):
+        self.pending.append(data)
+        self.pending_questions += len(data['questions'])
+        if self.pending_questions >= IMPORT_BATCH_SIZE:
+            self.flush()
+
+    def resolve_names(self, model, known_ids, names):
+        missing = [name for name in names if name.lower() not in known_ids]
+        if missing:
+            known_ids.update(ensure_labels(model, missing))
+        return list(dict.fromkeys(known_ids[name.lower()] for name in names))
+
+    def flush(self):
+        if not self.pending:
+            return
+
+        # Questions and answers are linked through the primary keys of the inserted rows, which PostgreSQL and
+        # SQLite 3.35+ return from bulk inserts. Elsewhere rows are saved one at a time, and the question signals
+        # count the quiz totals.
+        bulk_insert = connection.features.can_return_rows_from_bulk_insert
+        quizzes = [
+            Quiz(
+                title=data['title'],
+                description=data['description'],
+                time_limit=data['time_limit'],
+                passing_marks_percentage=data['passing_marks_percentage'],
+                created_by_id=self.created_by_id,
+                total_points=sum(question['points'] for question in data['questions']) if bulk_insert else 0,
+                question_count=len(data['questions']) if bulk_insert else 0,
+            )
+            for data in self.pending
+        ]
+        _insert(Quiz, quizzes, bulk_insert)
+
+        tag_links = Quiz.tags.through.objects.bulk_create([
+            Quiz.tags.through(quiz_id=quiz.id, tag_id=tag_id)
+            for quiz, data in zip(quizzes, self.pending)
+            for tag_id in self.resolve_names(Tag, self.tag_ids, data['tags'])
+        ])
+        category_links = Quiz.categories.through.objects.bulk_create([
+            Quiz.categories.through(quiz_id=quiz.id, category_id=category_id)
+            for quiz, data in zip(quizzes, self.pending)
+            for category_id in self.resolve_names(Category, self.category_ids, data['categories'])
+        ])
+        # Bulk inserts skip the signals that keep the quiz counts and the search index current.
+        adjust_quiz_counts(Tag, [link.tag_id for link in tag_links], 1)
+        adjust_quiz_counts(Category, [link.category_id for link in category_links], 1)
+        index_quizzes([quiz.id for quiz in quizzes])
+
+        questions_data = [
+            (quiz, question_data) for quiz, data in zip(quizzes, self.pending) for question_data in data['questions']
+        ]
+        questions = [
+            Question(quiz_id=quiz.id, text=question_data['text'], type=question_data['type'],
+                     points=question_data['points'])
+            for quiz, question_data in questions_data
+        ]
+        _insert(Question, questions, bulk_insert)
+        Answer.objects.bulk_create([
+            Answer(question_id=question.id, text=answer_data['text'], is_correct=answer_data['is_correct'])
+            for question, (quiz, question_data) in zip(questions, questions_data)
+            for answer_data in question_data['answers']
+        ])
+
+        self.imported_quizzes += len(quizzes)
+        self.imported_questions += len(questions)
+        self.pending = []
+        self.pending_questions = 0
+
+
+def import_quizzes(lines, created_by_id):
+    """
+    Import quizzes from JSON Lines, in one transaction.
+    Quizzes are inserted in batches of about IMPORT_BATCH_SIZE questions, so memory use does not grow with the
+    size of the bank. Missing tags and categories are created. Raises QuizImportError on the first invalid line.
+    """
+    importer = _QuizBankImporter(created_by_id)
+
+    with transaction.atomic():
+        for line_number, line in enumerate(lines, start=1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if not line.strip():
+                continue
+
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                raise QuizImportError(line_number, f'Invalid JSON: {e}')
+
+            serializer = QuizTransferSerializer(data=data)
+            if not serializer.is_valid():
+                raise QuizImportError(line_number, serializer.errors)
+            importer.add(serializer.validated_data)
+
+        importer.flush()
+
+    # Bulk inserts skip the model signals that invalidate the cached catalog.
+    bump_cache_versions('quizzes', 'categories', 'tags')
+
+    return {'quizzes': importer.imported_quizzes, 'questions': importer.imported_questions}
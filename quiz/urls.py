@@ -6,7 +6,8 @@ from .views import (
     QuestionListCreateView, QuestionRetrieveUpdateDeleteView,
     AnswerListCreateView, AnswerRetrieveUpdateDeleteView,
     FeedbackListCreateView, FeedbackRetrieveUpdateDeleteView, SubmitQuizView, StartQuizView, LeaderboardView,
-    UserQuizStatisticsView
+    UserQuizStatisticsView, LeaderboardRankView, CacheMetricsView,
+    QuizExportView, QuizImportView, AttemptListView, QuizFacetsView, QuizExamView
 )
 
 app_name = 'quiz'
@@ -20,8 +21,13 @@ urlpatterns = [
     path('quizzes/tags/<int:pk>/', TagRetrieveUpdateDeleteView.as_view(), name='tag-retrieve-update-delete'),
 
     path('quizzes/', QuizListCreateView.as_view(), name='quiz-list-create'),
+    path('quizzes/facets/', QuizFacetsView.as_view(), name='quiz-facets'),
+    path('quizzes/export/', QuizExportView.as_view(), name='quiz-export'),
+    path('quizzes/import/', QuizImportView.as_view(), name='quiz-import'),
     path('quizzes/<int:pk>/', QuizRetrieveUpdateDeleteView.as_view(), name='quiz-retrieve-update-delete'),
     path('quizzes/<int:pk>/questions/', QuestionListCreateView.as_view(), name='question-list-create'),
+    path('quizzes/<int:pk>/exam/', QuizExamView.as_view(), name='quiz-exam'),
+    path('quizzes/<int:pk>/attempts/', AttemptListView.as_view(), name='attempt-list'),
     path('quizzes/start/', StartQuizView.as_view(), name='start-quiz'),
     path('quizzes/submit/', SubmitQuizView.as_view(), name='submit-quiz'),
 
@@ -34,5 +40,7 @@ urlpatterns = [
     path('feedback/<int:pk>/', FeedbackRetrieveUpdateDeleteView.as_view(), name='feedback-retrieve-update-delete'),
 
     path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    path('leaderboard/rank/', LeaderboardRankView.as_view(), name='leaderboard-rank'),
     path('user-attempts-statistics/', UserQuizStatisticsView.as_view(), name='user-attempts-statistics'),
+    path('cache-metrics/', CacheMetricsView.as_view(), name='cache-metrics'),
 ]
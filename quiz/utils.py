@@ -1,56 +1,296 @@
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Count, Q, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from datetime import timedelta
+from contextlib import suppress
 
-from quiz.models import Participant
+from quiz.cache import get_cache_version, bump_cache_versions
+from quiz.models import Quiz, Participant, Attempt, Question, Answer, UserStatistics, OutboxEvent
 
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import get_template
 from django.conf import settings
 
 
-def generate_participant_report(participant):
-    user = participant.user
-
-    report_content = {
-        'full_name': user.first_name + " " + user.last_name,
-        'quiz_title': participant.quiz.title,
-        'quiz_total_point': participant.quiz.get_total_points(),
-        'score': participant.score,
-        'has_passed': participant.has_passed,
-        'attempted_quiz': []
+def build_answer_key(quiz_id):
+    """
+    Load the answer key of a quiz in two queries, whatever its size.
+    Returns a dict mapping question id to (points, correct answer ids, all answer ids).
+    """
+    answer_key = {
+        question_id: (points, set(), set())
+        for question_id, points in Question.objects.filter(quiz_id=quiz_id).values_list('id', 'points')
+    }
+
+    answers = Answer.objects.filter(question__quiz_id=quiz_id).values_list('id', 'question_id', 'is_correct')
+    for answer_id, question_id, is_correct in answers:
+        points, correct_answers, all_answers = answer_key[question_id]
+        all_answers.add(answer_id)
+        if is_correct:
+            correct_answers.add(answer_id)
+
+    return {
+        question_id: (points, frozenset(correct_answers), frozenset(all_answers))
+        for question_id, (points, correct_answers, all_answers) in answer_key.items()
     }
-    current_datetime = timezone.now()
-    last_week_start = current_datetime - timedelta(days=7)
-
-    # Filter participants based on their end_time within the last week
-    participants_last_week = Participant.objects.filter(user=user, end_time__gte=last_week_start)[:7]
-
-    for participant_history in participants_last_week:
-        quiz = participant_history.quiz
-        attempted_quiz = {
-            'quiz_title': quiz.title,
-            'quiz_total_point': quiz.get_total_points(),
-            'score': participant_history.score,
-            'has_passed': participant_history.has_passed,
+
+
+# Fields of the participant facing read model of questions and answers, which leaves out the answer key.
+PARTICIPANT_QUESTION_FIELDS = ('id', 'text', 'type', 'points')
+PARTICIPANT_ANSWER_FIELDS = ('id', 'text')
+
+
+def add_participant_answers(questions):
+    """
+    Attach their answers, without is_correct, to question rows read with values(PARTICIPANT_QUESTION_FIELDS),
+    in one query. Plain rows skip the per object field introspection of the model serializers.
+    """
+    answers = {question['id']: [] for question in questions}
+    rows = Answer.objects.filter(question_id__in=answers).order_by('id')
+    for answer in rows.values('question_id', *PARTICIPANT_ANSWER_FIELDS):
+        answers[answer.pop('question_id')].append(answer)
+
+    for question in questions:
+        question['answers'] = answers[question['id']]
+    return questions
+
+
+def build_exam(quiz_id):
+    """
+    Load a quiz with all of its questions and answers, without the correct answers, in two queries whatever its
+    size: one for the quiz, one joining the questions to their answers. Returns None for an unknown quiz.
+    """
+    exam = Quiz.objects.filter(id=quiz_id).values(
+        'id', 'title', 'description', 'time_limit', 'passing_marks_percentage', 'total_points', 'question_count',
+    ).first()
+    if exam is None:
+        return None
+
+    questions = {}
+    rows = Question.objects.filter(quiz_id=quiz_id).order_by('id', 'answers__id').values_list(
+        'id', 'text', 'type', 'points', 'answers__id', 'answers__text')
+    for question_id, text, question_type, points, answer_id, answer_text in rows:
+        if question_id not in questions:
+            questions[question_id] = {'id': question_id, 'text': text, 'type': question_type, 'points': points,
+                                      'answers': []}
+        if answer_id is not None:
+            questions[question_id]['answers'].append({'id': answer_id, 'text': answer_text})
+
+    exam['questions'] = list(questions.values())
+    return exam
+
+
+def adjust_quiz_totals(quiz_id, points=0, questions=0):
+    """Apply a delta to the denormalized total_points / question_count of a quiz in a single UPDATE."""
+    Quiz.objects.filter(id=quiz_id).update(
+        total_points=F('total_points') + points,
+        question_count=F('question_count') + questions,
+    )
+
+
+def create_questions(quiz_id, questions_data):
+    """
+    Insert questions with their answers in one INSERT per model.
+    Bulk inserts skip the model signals, so the quiz totals and cache versions are updated here.
+    """
+    questions_data = [dict(question_data) for question_data in questions_data]
+    answers_data = [question_data.pop('answers', None) or [] for question_data in questions_data]
+    questions = [Question(quiz_id=quiz_id, **question_data) for question_data in questions_data]
+
+    if connection.features.can_return_rows_from_bulk_insert:
+        # PostgreSQL and SQLite 3.35+ return the primary keys of bulk inserted rows.
+        Question.objects.bulk_create(questions)
+        adjust_quiz_totals(quiz_id, points=sum(question.points for question in questions), questions=len(questions))
+    else:
+        for question in questions:
+            question.save()
+
+    Answer.objects.bulk_create([
+        Answer(question=question, **answer_data)
+        for question, question_answers in zip(questions, answers_data)
+        for answer_data in question_answers
+    ])
+    bump_cache_versions(f'quiz:{quiz_id}')
+
+    return questions
+
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_answer_key(quiz_id):
+    """
+    Return the answer key of a quiz from the cache, building it on a miss.
+    Keys are stored under the version of the quiz cache group, which the quiz, question and answer signals bump.
+    """
+    cache_key = f'quiz:{quiz_id}:answer-key:{get_cache_version(f"quiz:{quiz_id}")}'
+    answer_key = cache.get(cache_key)
+    if answer_key is None:
+        answer_key = build_answer_key(quiz_id)
+        cache.set(cache_key, answer_key, ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+
+# Outbox topic of quiz submissions, see quiz.tasks.record_submission.
+SUBMISSION_TOPIC = 'quiz.submitted'
+
+
+def get_participant_outcome(participant):
+    """Return None while a participant has no score, otherwise whether it passed."""
+    if participant.score is None:
+        return None
+    return participant.has_passed
+
+
+def select_best_attempt(participant, attempt):
+    """
+    Return the best attempt of a participant after the given attempt has been scored, or None when its current
+    best attempt stays. Attempts rank like the leaderboard: by score, then the earliest one.
+    """
+    if participant.best_attempt_id == attempt.id and attempt.score < participant.score:
+        return participant.attempts.filter(score__isnull=False).order_by('-score', 'ends_at', 'id').first()
+    if participant.best_attempt_id in (None, attempt.id) or attempt.score > participant.score:
+        return attempt
+    return None
+
+
+def update_user_statistics(user_id, before, after):
+    """
+    Apply the change of one participant outcome (see get_participant_outcome) to the statistics rollup of its user.
+    Users without a rollup row are skipped, their row is built from their history on first read.
+    """
+    if before == after:
+        return
+
+    attempted, passed = get_outcome_change(before, after)
+    UserStatistics.objects.filter(user_id=user_id).update(
+        total_attempted=F('total_attempted') + attempted,
+        total_passed=F('total_passed') + passed,
+    )
+
+
+def get_outcome_change(before, after):
+    """Return the (attempted, passed) change of the statistics of a user when a participant outcome changes."""
+    return (after is not None) - (before is not None), (after is True) - (before is True)
+
+
+def get_user_statistics(user_id):
+    """
+    Return the statistics rollup of a user, built from the user's participants on first read.
+    Participants already reflect the submissions the outbox relay has yet to apply, so those are left out of the
+    new row and added when relayed.
+    """
+    statistics = UserStatistics.objects.filter(user_id=user_id).first()
+    if statistics is not None:
+        return statistics
+
+    with transaction.atomic():
+        # Submissions of the user wait until the row exists and the relay skips the pending ones locked here, so
+        # each submission is counted exactly once: by the participants below or by the relay, not both.
+        list(Participant.objects.select_for_update().filter(user_id=user_id).values_list('id', flat=True))
+        pending = OutboxEvent.objects.select_for_update().filter(topic=SUBMISSION_TOPIC, payload__user_id=user_id)
+
+        totals = Participant.objects.filter(user_id=user_id, score__isnull=False).aggregate(
+            total_attempted=Count('id'),
+            total_passed=Count('id', filter=Q(has_passed=True)),
+        )
+        for payload in pending.values_list('payload', flat=True):
+            attempted, passed = get_outcome_change(payload['before'], payload['after'])
+            totals['total_attempted'] -= attempted
+            totals['total_passed'] -= passed
+
+        statistics, created = UserStatistics.objects.get_or_create(user_id=user_id, defaults=totals)
+
+    return statistics
+
+
+REPORT_HISTORY_LENGTH = 7
+
+
+def generate_participant_reports(participants):
+    """
+    Build the report content of many participants at once, keyed by participant id.
+    Participants need their user and quiz loaded (select_related). The history of every user comes from one
+    query, whatever the number of participants.
+    """
+    last_week_start = timezone.now() - timedelta(days=7)
+    user_ids = {participant.user_id for participant in participants}
+
+    # The latest attempts submitted within the last week by each user, repeated attempts at a quiz included
+    attempts_last_week = Attempt.objects.filter(user_id__in=user_ids, submitted_at__gte=last_week_start).annotate(
+        position=Window(RowNumber(), partition_by=[F('user_id')], order_by=F('submitted_at').desc())
+    ).filter(position__lte=REPORT_HISTORY_LENGTH).order_by('user_id', 'position').values(
+        'user_id', 'score', 'has_passed', quiz_title=F('quiz__title'), quiz_total_point=F('quiz__total_points'))
+
+    history = {user_id: [] for user_id in user_ids}
+    for attempt in attempts_last_week:
+        user_id = attempt.pop('user_id')
+        history[user_id].append(attempt)
+
+    reports = {}
+    for participant in participants:
+        user = participant.user
+        reports[participant.id] = {
+            'full_name': user.first_name + " " + user.last_name,
+            'quiz_title': participant.quiz.title,
+            'quiz_total_point': participant.quiz.get_total_points(),
+            'score': participant.score,
+            'has_passed': participant.has_passed,
+            'attempted_quiz': history[participant.user_id],
         }
-        report_content['attempted_quiz'].append(attempted_quiz)
+    return reports
 
-    return report_content
 
+def generate_participant_report(participant):
+    return generate_participant_reports([participant])[participant.id]
 
-def send_participant_report_email(report_content, email):
+
+def build_participant_report_email(report_content, email, template=None):
     subject = "Quiz Report"
     email_from = settings.EMAIL_HOST_USER
 
-    html_template = 'sent_participant_analytics.html'
-    html_message = render_to_string(html_template, context={'report': report_content})
+    if template is None:
+        template = get_template('sent_participant_analytics.html')
+    html_message = template.render({'report': report_content})
 
-    recipient_list = [email]
+    message = EmailMessage(subject, html_message, email_from, [email])
+    message.content_subtype = 'html'
+    return message
 
+
+def send_participant_report_email(report_content, email):
     try:
-        message = EmailMessage(subject, html_message, email_from, recipient_list)
-        message.content_subtype = 'html'
-        message.send()
+        build_participant_report_email(report_content, email).send()
         return {"is_sent": True}
     except Exception as e:
         return {"is_sent": False, "message": f"An error occurred while sending the email: {str(e)}"}
+
+
+def send_participant_report_emails(reports):
+    """
+    Render and send many (report_content, email) pairs over a single mail server connection.
+    Messages are sent one at a time, so a refused recipient doesn't fail the others. Return whether each was sent.
+    """
+    template = get_template('sent_participant_analytics.html')
+    connection = get_connection()
+    try:
+        connection.open()
+    except OSError:
+        # SMTP errors included. The mail server can't be reached, so none of them is sent.
+        return [False] * len(reports)
+
+    sent = []
+    try:
+        for report_content, email in reports:
+            try:
+                connection.send_messages([build_participant_report_email(report_content, email, template)])
+            except OSError:
+                sent.append(False)
+            else:
+                sent.append(True)
+    finally:
+        with suppress(OSError):
+            connection.close()
+    return sent
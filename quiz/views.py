@@ -1,33 +1,49 @@
 from datetime import timedelta
 
+from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .cache import CachedResponseMixin, get_cache_metrics
+from .facets import get_quiz_facets
 from .filters import ParticipantFilter, QuizFilter
-from .models import Category, Tag, Quiz, Question, Answer, Participant, Feedback
+from .labels import get_label_ids, parse_label_names
+from .leaderboard import LEADERBOARD_ORDERING
+from .models import (
+    Category, Tag, Quiz, Question, Answer, Participant, Attempt, Feedback, LeaderboardEntry, LeaderboardScope
+)
 from .pagination import QuestionsSetPagination, QuizzesSetPagination, FeedbackSetPagination, LeaderboardPagination, \
     GeneralPagination
 from .permissions import IsStaffOrReadOnly, IsAuthenticatedOrReadOnly, IsFeedbackOwner
 from .serializers import (
     CategorySerializer, TagSerializer, QuizSerializer,
     QuestionSerializer, AnswerSerializer, FeedbackSerializer, SubmitQuizSerializer, ParticipantSerializer,
-    UserQuizStatisticsSerializer
+    UserQuizStatisticsSerializer, LeaderboardEntrySerializer, AttemptSerializer
 )
 from .swagger import *
+from .transfer import QuizImportError, export_quizzes, import_quizzes
+from .utils import (
+    PARTICIPANT_ANSWER_FIELDS, PARTICIPANT_QUESTION_FIELDS, add_participant_answers, build_exam, get_user_statistics
+)
 
 
 @method_decorator(name='get', decorator=category_list_swagger_schema())
 @method_decorator(name='post', decorator=category_create_swagger_schema())
-class CategoryListCreateView(generics.ListCreateAPIView):
+class CategoryListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     permission_classes = (IsStaffOrReadOnly,)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def get_cache_groups(self):
+        return ['categories']
+
 
 @method_decorator(name='get', decorator=category_retrieve_swagger_schema())
 @method_decorator(name='put', decorator=category_update_swagger_schema())
@@ -40,11 +56,14 @@ class CategoryRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
 @method_decorator(name='get', decorator=tag_list_swagger_schema())
 @method_decorator(name='post', decorator=tag_create_swagger_schema())
-class TagListCreateView(generics.ListCreateAPIView):
+class TagListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsStaffOrReadOnly,)
 
+    def get_cache_groups(self):
+        return ['tags']
+
 
 @method_decorator(name='get', decorator=tag_retrieve_swagger_schema())
 @method_decorator(name='put', decorator=tag_update_swagger_schema())
@@ -57,14 +76,17 @@ class TagRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
 
 @method_decorator(name='get', decorator=quiz_list_swagger_schema())
 @method_decorator(name='post', decorator=quiz_create_swagger_schema())
-class QuizListCreateView(generics.ListCreateAPIView):
-    queryset = Quiz.objects.all().order_by('-id')
+class QuizListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
+    queryset = Quiz.objects.prefetch_related('tags', 'categories').order_by('-id')
     serializer_class = QuizSerializer
     pagination_class = QuizzesSetPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = QuizFilter
     permission_classes = (IsStaffOrReadOnly,)
 
+    def get_cache_groups(self):
+        return ['quizzes']
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
 
@@ -72,11 +94,33 @@ class QuizListCreateView(generics.ListCreateAPIView):
 @method_decorator(name='get', decorator=quiz_retrieve_swagger_schema())
 @method_decorator(name='put', decorator=quiz_update_swagger_schema())
 @method_decorator(name='delete', decorator=quiz_delete_swagger_schema())
-class QuizRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
+class QuizRetrieveUpdateDeleteView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = (IsStaffOrReadOnly,)
 
+    def get_cache_groups(self):
+        return [f"quiz:{self.kwargs['pk']}"]
+
+
+class QuizFacetCountsView(APIView):
+
+    def get(self, request, *args, **kwargs):
+        filterset = QuizFilter(request.query_params, queryset=Quiz.objects.all())
+        if not filterset.is_valid():
+            return Response({'error': filterset.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Unfiltered facets come from the maintained counts, filtered ones are counted over the matching quizzes.
+        filtered = any(request.query_params.get(name) for name in filterset.filters)
+        return Response(get_quiz_facets(filterset.qs if filtered else None), status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=quiz_facets_swagger_schema())
+class QuizFacetsView(CachedResponseMixin, QuizFacetCountsView):
+
+    def get_cache_groups(self):
+        return ['quizzes', 'categories', 'tags']
+
 
 @method_decorator(name='post', decorator=start_quiz_swagger_schema())
 class StartQuizView(APIView):
@@ -96,19 +140,35 @@ class StartQuizView(APIView):
         time_limit = quiz.time_limit
         end_time = start_time + timedelta(minutes=time_limit)
 
-        try:
-            participant = Participant.objects.get(user=user, quiz=quiz)
-            participant.start_time = start_time
-            participant.end_time = end_time
-            participant.score = None
-            participant.save()
-
-        except Participant.DoesNotExist:
-            Participant.objects.create(user=user, quiz=quiz, start_time=start_time, end_time=end_time, score=None)
+        with transaction.atomic():
+            # The unique (user, quiz) constraint makes concurrent first starts resolve to a single participant,
+            # whose first attempt is recorded when it is created. Restarts only append a new attempt.
+            participant, created = Participant.objects.get_or_create(
+                user=user, quiz=quiz, defaults={'start_time': start_time, 'end_time': end_time})
+            if not created:
+                Attempt.objects.create(participant=participant, user=user, quiz=quiz, started_at=start_time,
+                                       ends_at=end_time)
 
         return Response({'message': 'Quiz started successfully'}, status=status.HTTP_200_OK)
 
 
+class QuizExamPayloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        exam = build_exam(self.kwargs['pk'])
+        if exam is None:
+            return Response({'error': 'Invalid quiz ID'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(exam, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=quiz_exam_swagger_schema())
+class QuizExamView(CachedResponseMixin, QuizExamPayloadView):
+
+    def get_cache_groups(self):
+        return [f"quiz:{self.kwargs['pk']}"]
+
+
 @method_decorator(name='post', decorator=submit_quiz_swagger_schema())
 class SubmitQuizView(APIView):
     permission_classes = [IsAuthenticated]
@@ -123,14 +183,30 @@ class SubmitQuizView(APIView):
 
 @method_decorator(name='get', decorator=question_list_swagger_schema())
 @method_decorator(name='post', decorator=question_create_swagger_schema())
-class QuestionListCreateView(generics.ListCreateAPIView):
+class QuestionListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     serializer_class = QuestionSerializer
     permission_classes = (IsStaffOrReadOnly,)
     pagination_class = QuestionsSetPagination
 
+    def get_cache_groups(self):
+        return [f"quiz:{self.kwargs['pk']}"]
+
+    def get_cache_key(self, request):
+        # Staff and participants get different representations of the questions.
+        return f'{super().get_cache_key(request)}:{"staff" if request.user.is_staff else "participant"}'
+
     def get_queryset(self):
         pk = self.kwargs['pk']
-        return Question.objects.filter(quiz_id=pk)
+        return Question.objects.filter(quiz_id=pk).prefetch_related('answers').order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+
+        # Participants get the questions without the answer key.
+        questions = Question.objects.filter(quiz_id=self.kwargs['pk']).order_by('id')
+        page = self.paginate_queryset(questions.values(*PARTICIPANT_QUESTION_FIELDS))
+        return self.get_paginated_response(add_participant_answers(page))
 
 
 @method_decorator(name='get', decorator=question_retrieve_swagger_schema())
@@ -141,6 +217,13 @@ class QuestionRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = QuestionSerializer
     permission_classes = (IsStaffOrReadOnly,)
 
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().retrieve(request, *args, **kwargs)
+
+        question = generics.get_object_or_404(Question.objects.values(*PARTICIPANT_QUESTION_FIELDS), pk=kwargs['pk'])
+        return Response(add_participant_answers([question])[0])
+
 
 @method_decorator(name='get', decorator=answer_list_swagger_schema())
 @method_decorator(name='post', decorator=answer_create_swagger_schema())
@@ -153,6 +236,11 @@ class AnswerListCreateView(generics.ListCreateAPIView):
         pk = self.kwargs['pk']
         return Answer.objects.filter(question_id=pk)
 
+    def list(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().list(request, *args, **kwargs)
+        return Response(list(self.get_queryset().order_by('id').values(*PARTICIPANT_ANSWER_FIELDS)))
+
 
 @method_decorator(name='get', decorator=answer_retrieve_swagger_schema())
 @method_decorator(name='put', decorator=answer_update_swagger_schema())
@@ -162,6 +250,11 @@ class AnswerRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = AnswerSerializer
     permission_classes = (IsStaffOrReadOnly,)
 
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(generics.get_object_or_404(Answer.objects.values(*PARTICIPANT_ANSWER_FIELDS), pk=kwargs['pk']))
+
 
 @method_decorator(name='get', decorator=feedback_list_swagger_schema())
 @method_decorator(name='post', decorator=feedback_create_swagger_schema())
@@ -173,7 +266,7 @@ class FeedbackListCreateView(generics.ListCreateAPIView):
 
     def get_queryset(self):
         pk = self.kwargs['pk']
-        return Feedback.objects.filter(quiz_id=pk).order_by('-id')
+        return Feedback.objects.filter(quiz_id=pk).select_related('participant__user').order_by('-id')
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -195,14 +288,97 @@ class FeedbackRetrieveUpdateDeleteView(generics.RetrieveUpdateDestroyAPIView):
         return context
 
 
-class LeaderboardView(generics.ListAPIView):
-    serializer_class = ParticipantSerializer
+class LeaderboardScopeMixin:
+
+    def get_leaderboard_scope(self):
+        """
+        Return the (scope, scope_id) of the precomputed leaderboard matching the quiz/categories/tags filters.
+        Returns None when the filters combine several of them, as only single scopes are precomputed.
+        """
+        if not hasattr(self, '_leaderboard_scope'):
+            self._leaderboard_scope = self._resolve_leaderboard_scope()
+        return self._leaderboard_scope
+
+    def _resolve_leaderboard_scope(self):
+        params = self.request.query_params
+        quiz = params.get('quiz', '').strip()
+        categories = parse_label_names(params.get('categories', ''))
+        tags = parse_label_names(params.get('tags', ''))
+
+        if len(categories) + len(tags) + bool(quiz) > 1:
+            return None
+        if quiz:
+            return (LeaderboardScope.QUIZ, int(quiz)) if quiz.isdigit() else None
+        if categories:
+            return LeaderboardScope.CATEGORY, get_label_ids(Category, categories)[0]
+        if tags:
+            return LeaderboardScope.TAG, get_label_ids(Tag, tags)[0]
+        return LeaderboardScope.GLOBAL, 0
+
+    def get_leaderboard_entries(self):
+        scope, scope_id = self.get_leaderboard_scope()
+        if scope_id is None:
+            entries = LeaderboardEntry.objects.none()
+        else:
+            entries = LeaderboardEntry.objects.filter(scope=scope, scope_id=scope_id)
+
+        # The ordering columns make the keyset cursors.
+        return entries.values('rank', 'score', 'end_time', 'participant_id',
+                              quiz_id=F('participant__quiz_id'), quiz_title=F('participant__quiz__title'),
+                              username=F('user__username'), start_time=F('participant__start_time'))
+
+
+@method_decorator(name='get', decorator=leaderboard_swagger_schema())
+class LeaderboardView(LeaderboardScopeMixin, generics.ListAPIView):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ParticipantFilter
     pagination_class = LeaderboardPagination
 
     def get_queryset(self):
-        return Participant.objects.filter(has_passed=True).order_by('-score', 'end_time')
+        # Schema generation introspects the filters against the participants queryset.
+        if getattr(self, 'swagger_fake_view', False) or self.get_leaderboard_scope() is None:
+            participants = Participant.objects.filter(has_passed=True, score__isnull=False)
+            return participants.order_by('-score', 'end_time', 'id').values(
+                'id', 'quiz_id', 'score', 'start_time', 'end_time',
+                quiz_title=F('quiz__title'), username=F('user__username'))
+        return self.get_leaderboard_entries().order_by(*LEADERBOARD_ORDERING)
+
+    def filter_queryset(self, queryset):
+        # Precomputed leaderboards are already filtered by their scope.
+        if self.get_leaderboard_scope() is None:
+            return super().filter_queryset(queryset)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.get_leaderboard_scope() is None:
+            return ParticipantSerializer
+        return LeaderboardEntrySerializer
+
+
+class LeaderboardRankView(LeaderboardScopeMixin, APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        if self.get_leaderboard_scope() is None:
+            return Response({'error': 'Rank is available for a single quiz, category or tag only'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        entry = self.get_leaderboard_entries().filter(user=request.user).order_by(*LEADERBOARD_ORDERING).first()
+        if entry is None:
+            return Response({'detail': 'You are not on this leaderboard'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(LeaderboardEntrySerializer(entry).data, status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=attempt_list_swagger_schema())
+class AttemptListView(generics.ListAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = AttemptSerializer
+    pagination_class = GeneralPagination
+
+    def get_queryset(self):
+        attempts = Attempt.objects.filter(user=self.request.user, quiz_id=self.kwargs['pk']).order_by('-started_at')
+        return attempts.values('id', 'started_at', 'ends_at', 'submitted_at', 'score', 'has_passed')
 
 
 @method_decorator(name='get', decorator=quiz_statistics_swagger_schema())
@@ -213,28 +389,28 @@ class UserQuizStatisticsView(generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return Participant.objects.filter(user=user, score__isnull=False).order_by('end_time')
+        participants = Participant.objects.filter(user=user, score__isnull=False).order_by('end_time')
+        return participants.values('quiz_id', 'score', 'has_passed', quiz_title=F('quiz__title'),
+                                   quiz_total_marks=F('quiz__total_points'), date=F('start_time'))
 
-    def get_pass_rate(self, queryset):
-        total_passed = queryset.filter(has_passed=True).count()
-        total_participants = queryset.count()
+    def get_statistics(self):
+        statistics = get_user_statistics(self.request.user.id)
+        total_attempted = statistics.total_attempted
+        total_passed = statistics.total_passed
 
-        if total_participants > 0:
-            pass_rate = (total_passed / total_participants) * 100
-            return round(pass_rate, 2)
-        return 0
+        pass_rate = 0
+        if total_attempted > 0:
+            pass_rate = round((total_passed / total_attempted) * 100, 2)
 
-    def get_total_passed(self, queryset):
-        return queryset.filter(has_passed=True).count()
-
-    def get_total_failed(self, queryset):
-        return queryset.filter(has_passed=False).count()
+        return {
+            'pass_rate': pass_rate,
+            'total_passed': total_passed,
+            'total_failed': total_attempted - total_passed,
+        }
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        pass_rate = self.get_pass_rate(queryset)
-        total_passed = self.get_total_passed(queryset)
-        total_failed = self.get_total_failed(queryset)
+        statistics = self.get_statistics()
 
         # Paginate the queryset
         page = self.paginate_queryset(queryset)
@@ -243,11 +419,42 @@ class UserQuizStatisticsView(generics.ListAPIView):
             data = serializer.data
 
             statistics_data = {
-                'pass_rate': pass_rate,
-                'total_passed': total_passed,
-                'total_failed': total_failed,
+                **statistics,
                 'data': data,
             }
             return self.get_paginated_response(statistics_data)
 
         return Response([{'data': 'No data found'}], status=status.HTTP_200_OK)
+
+
+class CacheMetricsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_cache_metrics(), status=status.HTTP_200_OK)
+
+
+@method_decorator(name='get', decorator=quiz_export_swagger_schema())
+class QuizExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        quizzes = QuizFilter(request.query_params, queryset=Quiz.objects.all()).qs
+        response = StreamingHttpResponse(export_quizzes(quizzes), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="quizzes.jsonl"'
+        return response
+
+
+@method_decorator(name='post', decorator=quiz_import_swagger_schema())
+class QuizImportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        # The body is read line by line from the request stream instead of being parsed as a whole.
+        try:
+            imported = import_quizzes(request.stream or [], request.user.id)
+        except QuizImportError as e:
+            return Response({'error': {'line': e.line_number, 'errors': e.errors}},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(imported, status=status.HTTP_201_CREATED)